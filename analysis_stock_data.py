@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 from pathlib import Path
 
+from app.features import add_moving_averages, add_return, add_rsi, add_volatility
+from range_stats import RangeStats
+
 DATA_DIR = Path("data/stocks")
 
 
@@ -9,9 +12,9 @@ DATA_DIR = Path("data/stocks")
 # Chargement des données
 # ---------------------------------------------------------------------
 
-@st.cache_data(show_spinner=False)
-def load_data(ticker: str) -> pd.DataFrame:
-    csv_path = DATA_DIR / f"{ticker}.csv"
+def read_stock_csv(ticker: str, data_dir: Path = DATA_DIR) -> pd.DataFrame:
+    """Lecture brute du CSV d'un ticker (sans cache Streamlit, utilisable en multiprocessus)."""
+    csv_path = Path(data_dir) / f"{ticker}.csv"
     if not csv_path.exists():
         raise FileNotFoundError(f"Fichier introuvable pour le ticker {ticker}: {csv_path}")
     df = pd.read_csv(csv_path, parse_dates=["Date"])
@@ -19,58 +22,54 @@ def load_data(ticker: str) -> pd.DataFrame:
     return df
 
 
+@st.cache_data(show_spinner=False)
+def load_data(ticker: str) -> pd.DataFrame:
+    return read_stock_csv(ticker)
+
+
+@st.cache_resource(show_spinner=False)
+def load_data_with_indicators(ticker: str) -> pd.DataFrame:
+    """
+    Historique complet + indicateurs, calculé une seule fois par ticker.
+    cache_resource : objet partagé (pas de copie à chaque appel), ne pas le modifier.
+    """
+    return compute_indicators(read_stock_csv(ticker))
+
+
+def slice_by_dates(df: pd.DataFrame, start_date=None, end_date=None) -> pd.DataFrame:
+    """Fenêtre [start_date, end_date] d'un DataFrame trié par Date (recherche dichotomique)."""
+    dates = df["Date"].to_numpy()
+    lo = dates.searchsorted(pd.to_datetime(start_date).to_datetime64(), side="left") if start_date else 0
+    hi = dates.searchsorted(pd.to_datetime(end_date).to_datetime64(), side="right") if end_date else len(df)
+    return df.iloc[lo:hi].copy()
+
+
 # ---------------------------------------------------------------------
 # Indicateurs
 # ---------------------------------------------------------------------
+# Formules (rendement, MA 20/50, RSI, volatilité) définies dans app.features :
+# les indicateurs affichés et les features du modèle sont les mêmes calculs.
 
 def add_basic_indicators(stock_df: pd.DataFrame,
                          window_short: int = 7,
                          window_long: int = 30) -> pd.DataFrame:
     """Rendement simple, moyennes mobiles, volatilité 30 jours."""
-    df = stock_df.copy()
-    df["Return"] = df["Close"].pct_change()
+    df = add_return(stock_df)
     df["MA_short"] = df["Close"].rolling(window_short).mean()
     df["MA_long"] = df["Close"].rolling(window_long).mean()
     df["Volatility_30d"] = df["Return"].rolling(30).std()
     return df
 
 
-def add_moving_averages(df: pd.DataFrame,
-                        short_window: int = 20,
-                        long_window: int = 50) -> pd.DataFrame:
-    """Moyennes mobiles supplémentaires sur Close."""
-    df = df.copy()
-    df["MA_short_20"] = df["Close"].rolling(window=short_window,
-                                            min_periods=short_window).mean()
-    df["MA_long_50"] = df["Close"].rolling(window=long_window,
-                                           min_periods=long_window).mean()
-    return df
-
-
-def add_rsi(df: pd.DataFrame, periods: int = 14) -> pd.DataFrame:
-    """Ajoute un RSI(14) sur la colonne Close."""
-    df = df.copy()
-    delta = df["Close"].diff()
-
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-
-    avg_gain = gain.rolling(window=periods, min_periods=periods).mean()
-    avg_loss = loss.rolling(window=periods, min_periods=periods).mean()
-
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-
-    df["RSI_14"] = rsi
-    return df
-
+def compute_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """Pipeline complet d'indicateurs utilisé par l'application et le backtest."""
+    # Indicateurs de base (Return, MA_short, MA_long, Volatility_30d)
+    df = add_basic_indicators(df)
 
-def add_volatility(df: pd.DataFrame, window: int = 30) -> pd.DataFrame:
-    """Volatilité glissante basée sur les rendements journaliers."""
-    df = df.copy()
-    returns = df["Close"].pct_change()
-    df["Volatility_30d"] = returns.rolling(window=window,
-                                           min_periods=window).std()
+    # Indicateurs techniques avancés
+    df = add_moving_averages(df, short_window=20, long_window=50)
+    df = add_rsi(df, periods=14)
+    df = add_volatility(df, window=30)  # écrase Volatility_30d si déjà là
     return df
 
 
@@ -97,6 +96,28 @@ def summarize_stock(stock_df: pd.DataFrame) -> dict:
     return summary
 
 
+@st.cache_resource(show_spinner=False)
+def get_range_stats(ticker: str) -> RangeStats:
+    """Structure de requêtes par plage (précalculée une fois par ticker)."""
+    return RangeStats(load_data_with_indicators(ticker))
+
+
+def summarize_ranges(queries) -> pd.DataFrame:
+    """
+    Résumés pour plusieurs requêtes (ticker, start_date, end_date) à la fois.
+    Retourne un DataFrame (une ligne par requête, dans l'ordre d'entrée).
+    """
+    queries = pd.DataFrame(list(queries), columns=["ticker", "start_date", "end_date"])
+    parts = []
+    for ticker, group in queries.groupby("ticker", sort=False):
+        res = get_range_stats(ticker).summarize_many(group["start_date"], group["end_date"])
+        res.index = group.index
+        parts.append(res)
+    if not parts:
+        return queries
+    return queries.join(pd.concat(parts))
+
+
 def generate_text_summary(ticker: str, summary: dict) -> str:
     if not summary:
         return f"Aucune donnée disponible pour l'action {ticker} sur la période sélectionnée."
@@ -121,30 +142,38 @@ def generate_text_summary(ticker: str, summary: dict) -> str:
 # Fonction principale appelée par app.py
 # ---------------------------------------------------------------------
 
-def get_stock_with_indicators(ticker: str, start_date=None, end_date=None):
+def get_stock_with_indicators(ticker: str, start_date=None, end_date=None,
+                              warmup: bool = False):
     """
     Charge les données, filtre par dates, ajoute indicateurs et résumés.
     Retourne (df_with_indicators, summary_dict).
+
+    warmup=True : les indicateurs sont calculés une fois sur tout l'historique
+    (mis en cache par ticker) puis la période demandée est découpée. Les MA/RSI
+    du début de période sont alors corrects (pas de NaN de préchauffage) et
+    changer de période ne relance aucun calcul d'indicateur.
     """
-    df = load_data(ticker)
+    if warmup:
+        df = slice_by_dates(load_data_with_indicators(ticker), start_date, end_date)
+        if df.empty:
+            return df, {}
+    else:
+        df = load_data(ticker)
 
-    if start_date:
-        df = df[df["Date"] >= pd.to_datetime(start_date)]
-    if end_date:
-        df = df[df["Date"] <= pd.to_datetime(end_date)]
+        if start_date:
+            df = df[df["Date"] >= pd.to_datetime(start_date)]
+        if end_date:
+            df = df[df["Date"] <= pd.to_datetime(end_date)]
 
-    if df.empty:
-        return df, {}
+        if df.empty:
+            return df, {}
 
-    # Indicateurs de base (Return, MA_short, MA_long, Volatility_30d)
-    df = add_basic_indicators(df)
-
-    # Indicateurs techniques avancés
-    df = add_moving_averages(df, short_window=20, long_window=50)
-    df = add_rsi(df, periods=14)
-    df = add_volatility(df, window=30)  # écrase Volatility_30d si déjà là
+        df = compute_indicators(df)
 
-    summary = summarize_stock(df)
+    if warmup:
+        summary = get_range_stats(ticker).summary(start_date, end_date)
+    else:
+        summary = summarize_stock(df)
     tech_text = interpret_technical_signals(df)
     summary["technical_text"] = tech_text
     summary["technical_score"] = technical_score(df)
@@ -209,6 +238,43 @@ def interpret_technical_signals(df: pd.DataFrame) -> str:
 
     return rsi_comment + " " + ma_comment
 
+def _ma_signal(df: pd.DataFrame) -> pd.Series:
+    """+1 si MA_short_20 > MA_long_50, -1 si l'inverse, 0 sinon (ou si manquant)."""
+    if "MA_short_20" not in df.columns or "MA_long_50" not in df.columns:
+        return pd.Series(0, index=df.index, dtype="int64")
+    ma_short = df["MA_short_20"]
+    ma_long = df["MA_long_50"]
+    return (ma_short > ma_long).astype("int64") - (ma_short < ma_long).astype("int64")
+
+
+def _rsi_signal(df: pd.DataFrame) -> pd.Series:
+    """+1 si RSI < 30 (potentiel rebond), -1 si RSI > 70, 0 sinon (ou si manquant)."""
+    if "RSI_14" not in df.columns:
+        return pd.Series(0, index=df.index, dtype="int64")
+    rsi = df["RSI_14"]
+    return (rsi < 30).astype("int64") - (rsi > 70).astype("int64")
+
+
+def technical_score_series(df: pd.DataFrame) -> pd.Series:
+    """
+    Version vectorisée de technical_score : un score (entre -2 et +2) par ligne.
+    Mêmes règles que technical_score, les valeurs manquantes comptent pour 0.
+    """
+    return _ma_signal(df) + _rsi_signal(df)
+
+
+def add_technical_signals(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajoute les signaux techniques barre par barre :
+    Signal_MA (+1/-1/0), Signal_RSI (+1/-1/0) et Technical_Score (somme).
+    """
+    df = df.copy()
+    df["Signal_MA"] = _ma_signal(df)
+    df["Signal_RSI"] = _rsi_signal(df)
+    df["Technical_Score"] = df["Signal_MA"] + df["Signal_RSI"]
+    return df
+
+
 def technical_score(df: pd.DataFrame) -> int:
     """
     Renvoie un score technique simple basé sur RSI et MA (entre -2 et +2).
@@ -218,27 +284,7 @@ def technical_score(df: pd.DataFrame) -> int:
     if df.empty:
         return 0
 
-    last = df.iloc[-1]
-    score = 0
-
-    # MA
-    ma_short = last.get("MA_short_20")
-    ma_long = last.get("MA_long_50")
-    if ma_short is not None and ma_long is not None and pd.notna(ma_short) and pd.notna(ma_long):
-        if ma_short > ma_long:
-            score += 1
-        elif ma_short < ma_long:
-            score -= 1
-
-    # RSI [web:103][web:111]
-    rsi = last.get("RSI_14")
-    if rsi is not None and pd.notna(rsi):
-        if rsi < 30:
-            score += 1
-        elif rsi > 70:
-            score -= 1
-
-    return score
+    return int(technical_score_series(df.iloc[[-1]]).iloc[0])
 
 
 # ---------------------------------------------------------------------
@@ -1,23 +1,319 @@
-import random
-from typing import Dict, Any
+import json
+import re
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
 
-def detect_drift(reference_file: str, production_file: str, threshold: float = 0.05) -> Dict[str, Any]:
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# DÉTECTION DE DRIFT PAR HISTOGRAMMES
+# ============================================================
+# Les fichiers sont lus par morceaux : la mémoire ne dépend que de la taille
+# d'un morceau et du nombre de bins, pas de la taille des logs de production.
+# 1) référence : échantillon uniforme (réservoir) -> bornes de bins aux quantiles,
+#    puis histogramme complet de la référence sur ces bornes
+# 2) production : un seul passage, histogramme sur les mêmes bornes
+# 3) KS, PSI et Wasserstein se déduisent des deux histogrammes
+# Le profil de référence peut être calculé une fois à l'entraînement et
+# sauvegardé à côté du modèle (save_reference_profile / load_reference_profile).
+
+# Features typiques d'un dataset boursier (noms du pipeline app.features)
+FEATURES = ["Open", "High", "Low", "Close", "Volume", "Adj_Close"]
+COLUMN_ALIASES = {"Adj Close": "Adj_Close"}
+
+CHUNK_SIZE = 500_000
+N_BINS = 1000          # bins fins (KS, Wasserstein)
+PSI_BINS = 10          # déciles de la référence (PSI)
+SAMPLE_SIZE = 200_000  # réservoir servant à placer les bornes
+PSI_EPS = 1e-4
+
+
+# ------------------------------------------------------------
+# Lecture par morceaux
+# ------------------------------------------------------------
+
+def _data_files(path: str) -> List[Path]:
+    """Un fichier CSV / Parquet ou un dossier (ex: data/stocks, journal des prédictions)."""
+    path = Path(path)
+    if path.is_dir():
+        files = sorted(path.glob("*.csv")) + sorted(path.glob("*.parquet"))
+    else:
+        files = [path]
+    missing = [str(p) for p in files if not p.exists()]
+    if missing or not files:
+        raise FileNotFoundError(f"Fichier introuvable : {missing or str(path)}")
+    return files
+
+
+def iter_feature_chunks(path: str, features: List[str] = FEATURES,
+                        chunksize: int = CHUNK_SIZE) -> Iterator[Dict[str, np.ndarray]]:
+    """Morceaux {feature: valeurs float64 non manquantes} ; colonnes absentes ignorées."""
+    wanted = set(features) | {raw for raw, name in COLUMN_ALIASES.items() if name in features}
+    for data_path in _data_files(path):
+        if data_path.suffix == ".parquet":
+            reader = _parquet_chunks(data_path, wanted, chunksize)
+        else:
+            reader = pd.read_csv(data_path, usecols=lambda c: c in wanted, chunksize=chunksize)
+        for chunk in reader:
+            chunk = chunk.rename(columns=COLUMN_ALIASES)
+            out = {}
+            for feature in features:
+                if feature in chunk.columns:
+                    values = pd.to_numeric(chunk[feature], errors="coerce").to_numpy(dtype=np.float64)
+                    out[feature] = values[np.isfinite(values)]
+            yield out
+
+
+def _parquet_chunks(path: Path, wanted, chunksize: int) -> Iterator[pd.DataFrame]:
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    columns = [c for c in parquet.schema_arrow.names if c in wanted]
+    for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
+
+
+# ------------------------------------------------------------
+# Histogrammes
+# ------------------------------------------------------------
+
+class _Reservoir:
+    """Échantillon uniforme de taille fixe sur un flux (clés aléatoires, k plus petites)."""
+
+    def __init__(self, size: int, seed: int = 0):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.values = np.empty(0)
+        self.keys = np.empty(0)
+
+    def add(self, values: np.ndarray):
+        keys = np.concatenate([self.keys, self.rng.random(len(values))])
+        values = np.concatenate([self.values, values])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size)[: self.size]
+            keys, values = keys[keep], values[keep]
+        self.keys, self.values = keys, values
+
+
+def quantile_edges(sample: np.ndarray, n_bins: int = N_BINS) -> np.ndarray:
+    """Bornes intérieures (strictement croissantes) aux quantiles de l'échantillon."""
+    if not len(sample):
+        return np.empty(0)
+    return np.unique(np.quantile(sample, np.linspace(0, 1, n_bins + 1)[1:-1]))
+
+
+def histogram_counts(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Comptes sur len(edges) + 1 bins : ]-inf, e0[, [e0, e1[, ..., [e_last, +inf[."""
+    return np.bincount(np.searchsorted(edges, values, side="right"),
+                       minlength=len(edges) + 1).astype(np.int64)
+
+
+class StreamingHistogram:
+    """Histogramme à bornes fixes alimenté morceau par morceau (+ min / max observés)."""
+
+    def __init__(self, edges: np.ndarray):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.min = np.inf
+        self.max = -np.inf
+        self.sum = 0.0
+        self.sum_sq = 0.0
+
+    @property
+    def n(self) -> int:
+        return int(self.counts.sum())
+
+    def add(self, values: np.ndarray):
+        if len(values):
+            self.counts += histogram_counts(values, self.edges)
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self.sum += float(values.sum())
+            self.sum_sq += float(np.dot(values, values))
+
+    def moments(self) -> Dict[str, float]:
+        n = self.n
+        mean = self.sum / n if n else float("nan")
+        var = max(self.sum_sq / n - mean**2, 0.0) if n else float("nan")
+        return {"n": n, "mean": mean, "std": float(np.sqrt(var)), "min": self.min, "max": self.max,
+                "sum": self.sum, "sum_sq": self.sum_sq}
+
+
+# ------------------------------------------------------------
+# Statistiques
+# ------------------------------------------------------------
+
+def ks_pvalue(statistic: float, n: int, m: int) -> float:
+    """p-value asymptotique du test KS à deux échantillons (série de Kolmogorov)."""
+    if n == 0 or m == 0:
+        return 1.0
+    en = np.sqrt(n * m / (n + m))
+    lam = (en + 0.12 + 0.11 / en) * statistic
+    # Série de Kolmogorov non convergée sur 100 termes en dessous de ~0.2,
+    # où la p-value vaut 1 à la précision machine (Q(0.2) = 1 - 1e-10)
+    if lam < 0.2:
+        return 1.0
+    k = np.arange(1, 101)
+    p = 2 * np.sum((-1.0) ** (k - 1) * np.exp(-2 * k**2 * lam**2))
+    return float(np.clip(p, 0.0, 1.0))
+
+
+def compare_histograms(reference: StreamingHistogram, production: StreamingHistogram,
+                       psi_bins: int = PSI_BINS) -> Dict[str, float]:
+    """KS (sur les bornes), PSI (bins regroupés en quantiles de référence) et Wasserstein-1."""
+    n, m = reference.n, production.n
+    cdf_ref = np.cumsum(reference.counts) / max(n, 1)
+    cdf_prod = np.cumsum(production.counts) / max(m, 1)
+
+    # KS : écart maximal entre les fonctions de répartition aux bornes des bins
+    statistic = float(np.max(np.abs(cdf_ref[:-1] - cdf_prod[:-1]))) if len(reference.edges) else 0.0
+
+    # PSI : on regroupe les bins fins de façon à obtenir ~psi_bins classes équiprobables
+    groups = np.minimum((cdf_ref * psi_bins).astype(np.int64), psi_bins - 1)
+    groups = np.concatenate(([0], groups[:-1]))
+    p = np.bincount(groups, weights=reference.counts, minlength=psi_bins) / max(n, 1)
+    q = np.bincount(groups, weights=production.counts, minlength=psi_bins) / max(m, 1)
+    p, q = np.clip(p, PSI_EPS, None), np.clip(q, PSI_EPS, None)
+    psi = float(np.sum((q - p) * np.log(q / p)))
+
+    # Wasserstein-1 : intégrale de |F_ref - F_prod| (trapèzes sur chaque bin),
+    # bins extrêmes bornés par les min / max observés
+    lo = min(reference.min, production.min)
+    hi = max(reference.max, production.max)
+    points = np.concatenate(([lo], reference.edges, [hi]))
+    widths = np.clip(np.diff(points), 0, None)
+    gap = np.abs(cdf_ref - cdf_prod)
+    wasserstein = float(np.sum((np.concatenate(([0.0], gap[:-1])) + gap) / 2 * widths))
+
+    return {
+        "statistic": round(statistic, 4),
+        "p_value": round(ks_pvalue(statistic, n, m), 4),
+        "psi": round(psi, 4),
+        "wasserstein": round(wasserstein, 6),
+    }
+
+
+# ------------------------------------------------------------
+# Point d'entrée
+# ------------------------------------------------------------
+
+def reference_histograms(reference_file: str, features: List[str] = FEATURES,
+                         n_bins: int = N_BINS, chunksize: int = CHUNK_SIZE,
+                         sample_size: int = SAMPLE_SIZE) -> Dict[str, StreamingHistogram]:
+    """Deux passages sur la référence : bornes aux quantiles, puis histogramme complet."""
+    reservoirs = {f: _Reservoir(sample_size, seed=i) for i, f in enumerate(features)}
+    for chunk in iter_feature_chunks(reference_file, features, chunksize):
+        for feature, values in chunk.items():
+            reservoirs[feature].add(values)
+
+    histograms = {f: StreamingHistogram(quantile_edges(r.values, n_bins))
+                  for f, r in reservoirs.items() if len(r.values)}
+    for chunk in iter_feature_chunks(reference_file, list(histograms), chunksize):
+        for feature, values in chunk.items():
+            histograms[feature].add(values)
+    return histograms
+
+
+def reference_histograms_from_matrix(X: np.ndarray, features: List[str],
+                                     n_bins: int = N_BINS, chunk_rows: int = CHUNK_SIZE,
+                                     sample_size: int = SAMPLE_SIZE) -> Dict[str, StreamingHistogram]:
+    """Même profil que reference_histograms, à partir d'une matrice (memmap) d'entraînement."""
+    reservoirs = {f: _Reservoir(sample_size, seed=i) for i, f in enumerate(features)}
+    for start in range(0, len(X), chunk_rows):
+        block = np.asarray(X[start:start + chunk_rows], dtype=np.float64)
+        for j, f in enumerate(features):
+            values = block[:, j]
+            reservoirs[f].add(values[np.isfinite(values)])
+
+    histograms = {f: StreamingHistogram(quantile_edges(r.values, n_bins))
+                  for f, r in reservoirs.items() if len(r.values)}
+    for start in range(0, len(X), chunk_rows):
+        block = np.asarray(X[start:start + chunk_rows], dtype=np.float64)
+        for j, f in enumerate(features):
+            if f in histograms:
+                values = block[:, j]
+                histograms[f].add(values[np.isfinite(values)])
+    return histograms
+
+
+# ------------------------------------------------------------
+# Profil de référence persistant
+# ------------------------------------------------------------
+# reference/profile.json       features, fichiers, moments (n, moyenne, écart-type, min, max)
+# reference/<feature>.edges.npy  bornes des bins (quantiles de la référence)
+# reference/<feature>.counts.npy histogramme de la référence
+
+PROFILE_FILE = "profile.json"
+
+
+def _file_stem(feature: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", feature)
+
+
+def save_reference_profile(histograms: Dict[str, StreamingHistogram], directory) -> Path:
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    profile = {"features": {}}
+    for feature, hist in histograms.items():
+        stem = _file_stem(feature)
+        np.save(directory / f"{stem}.edges.npy", np.asarray(hist.edges, dtype=np.float64))
+        np.save(directory / f"{stem}.counts.npy", np.asarray(hist.counts, dtype=np.int64))
+        profile["features"][feature] = {"file": stem, **hist.moments()}
+    with open(directory / PROFILE_FILE, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    return directory
+
+
+def load_reference_profile(directory, mmap: bool = True) -> Optional[Dict[str, StreamingHistogram]]:
+    """Recharge un profil (tableaux en mémoire partagée si mmap). None si absent."""
+    directory = Path(directory)
+    if not (directory / PROFILE_FILE).exists():
+        return None
+    with open(directory / PROFILE_FILE, encoding="utf-8") as f:
+        profile = json.load(f)
+    mode = "r" if mmap else None
+    histograms = {}
+    for feature, info in profile["features"].items():
+        hist = StreamingHistogram(np.load(directory / f"{info['file']}.edges.npy", mmap_mode=mode))
+        hist.counts = np.load(directory / f"{info['file']}.counts.npy", mmap_mode=mode)
+        hist.min, hist.max = info["min"], info["max"]
+        hist.sum, hist.sum_sq = info["sum"], info["sum_sq"]
+        histograms[feature] = hist
+    return histograms
+
+
+def detect_drift(reference_file: str, production_file: str, threshold: float = 0.05,
+                 chunksize: int = CHUNK_SIZE,
+                 reference: Optional[Dict[str, StreamingHistogram]] = None) -> Dict[str, Any]:
     """
-    Mock implementation of drift detection for STOCK MARKET data.
+    Drift par feature entre données de référence et de production (fichiers CSV
+    ou dossiers de CSV). drift_detected si la p-value du test KS < threshold ;
+    PSI et distance de Wasserstein sont fournis en complément.
+    Si un profil de référence précalculé est fourni, reference_file n'est pas
+    relu : seul le fichier de production est parcouru.
+    Les features absentes de l'un des deux jeux ne sont pas rapportées.
     """
-    # Features typiques d'un dataset boursier
-    features = ["Open", "High", "Low", "Close", "Volume", "Adj Close"]
+    reference = reference or reference_histograms(reference_file, chunksize=chunksize)
+    production = {f: StreamingHistogram(h.edges) for f, h in reference.items()}
+    for chunk in iter_feature_chunks(production_file, list(production), chunksize):
+        for feature, values in chunk.items():
+            production[feature].add(values)
+
     results = {}
-    
-    for feature in features:
-        # Simulation d'un drift aléatoire
-        is_drift = random.random() < 0.15 
-        
+    for feature, ref_hist in reference.items():
+        prod_hist = production[feature]
+        if prod_hist.n == 0:
+            continue
+        stats = compare_histograms(ref_hist, prod_hist)
         results[feature] = {
-            "drift_detected": is_drift,
-            "p_value": round(random.random(), 4),
-            "statistic": round(random.uniform(0, 1), 4),
-            "type": "ks_test"
+            "drift_detected": bool(stats["p_value"] < threshold),
+            "p_value": stats["p_value"],
+            "statistic": stats["statistic"],
+            "type": "ks_test",
+            "psi": stats["psi"],
+            "wasserstein": stats["wasserstein"],
+            "n_reference": ref_hist.n,
+            "n_production": prod_hist.n,
         }
-    
     return results
@@ -0,0 +1,107 @@
+import threading
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.drift_detect import StreamingHistogram, compare_histograms, histogram_counts
+
+# ============================================================
+# SUIVI DU DRIFT EN CONTINU
+# ============================================================
+# Chaque prédiction alimente, pour chaque feature, l'histogramme du seau de
+# temps courant (mêmes bornes que la référence). Les seaux forment un anneau :
+# la mémoire est fixe (n_buckets x features x bins) quel que soit le trafic,
+# et la fenêtre glissante est la somme des seaux encore valides.
+
+
+class DriftMonitor:
+    def __init__(self,
+                 reference: Dict[str, StreamingHistogram],
+                 window_seconds: int = 3600,
+                 n_buckets: int = 12,
+                 clock=time.time):
+        self.reference = reference
+        self.features = list(reference)
+        self.n_buckets = n_buckets
+        self.bucket_seconds = max(window_seconds / n_buckets, 1e-9)
+        self.clock = clock
+        self._lock = threading.Lock()
+
+        self._bucket_ids = np.full(n_buckets, -1, dtype=np.int64)
+        self._counts = {f: np.zeros((n_buckets, len(h.edges) + 1), dtype=np.int64)
+                        for f, h in reference.items()}
+        self._mins = {f: np.full(n_buckets, np.inf) for f in self.features}
+        self._maxs = {f: np.full(n_buckets, -np.inf) for f in self.features}
+
+    @property
+    def window_seconds(self) -> float:
+        return self.bucket_seconds * self.n_buckets
+
+    def _current_slot(self) -> int:
+        bucket_id = int(self.clock() // self.bucket_seconds)
+        slot = bucket_id % self.n_buckets
+        if self._bucket_ids[slot] != bucket_id:
+            # seau expiré : on le recycle pour la période courante
+            self._bucket_ids[slot] = bucket_id
+            for f in self.features:
+                self._counts[f][slot] = 0
+                self._mins[f][slot] = np.inf
+                self._maxs[f][slot] = -np.inf
+        return slot
+
+    def update(self, X: np.ndarray, columns: List[str]):
+        """Ajoute les lignes d'entrée du modèle (colonnes nommées) au seau courant."""
+        if not len(X):
+            return
+        position = {c: j for j, c in enumerate(columns)}
+        values_by_feature = {}
+        for f in self.features:
+            if f in position:
+                values = np.asarray(X[:, position[f]], dtype=np.float64)
+                values_by_feature[f] = values[np.isfinite(values)]
+
+        with self._lock:
+            slot = self._current_slot()
+            for f, values in values_by_feature.items():
+                if len(values):
+                    self._counts[f][slot] += histogram_counts(values, self.reference[f].edges)
+                    self._mins[f][slot] = min(self._mins[f][slot], float(values.min()))
+                    self._maxs[f][slot] = max(self._maxs[f][slot], float(values.max()))
+
+    def window(self) -> Dict[str, StreamingHistogram]:
+        """Histogrammes de la fenêtre glissante (somme des seaux non expirés)."""
+        with self._lock:
+            current = int(self.clock() // self.bucket_seconds)
+            live = (self._bucket_ids > current - self.n_buckets) & (self._bucket_ids >= 0)
+            out = {}
+            for f in self.features:
+                hist = StreamingHistogram(self.reference[f].edges)
+                hist.counts = self._counts[f][live].sum(axis=0)
+                if live.any():
+                    hist.min = float(self._mins[f][live].min())
+                    hist.max = float(self._maxs[f][live].max())
+                out[f] = hist
+            return out
+
+    def check(self, threshold: float = 0.05, min_rows: int = 30) -> Dict[str, Any]:
+        """Compare la fenêtre courante à la référence (même format que detect_drift)."""
+        results = {}
+        rows_in_window = 0
+        for f, hist in self.window().items():
+            rows_in_window = max(rows_in_window, hist.n)
+            if hist.n < min_rows:
+                continue
+            stats = compare_histograms(self.reference[f], hist)
+            results[f] = {
+                "drift_detected": bool(stats["p_value"] < threshold),
+                "p_value": stats["p_value"],
+                "statistic": stats["statistic"],
+                "type": "ks_test",
+                "psi": stats["psi"],
+                "wasserstein": stats["wasserstein"],
+                "n_reference": self.reference[f].n,
+                "n_production": hist.n,
+            }
+        return {"window_seconds": self.window_seconds, "rows_in_window": rows_in_window, "features": results}
+
@@ -0,0 +1,196 @@
+import hashlib
+import json
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# PIPELINE DE FEATURES (ENTRAÎNEMENT + SERVICE)
+# ============================================================
+# Source unique des features du modèle :
+# - entraînement : compute_feature_frame() sur l'historique d'un ticker
+# - service     : latest_feature_payload() côté dashboard (même fonction),
+#                 puis feature_matrix() dans l'API sur les payloads reçus
+# Toute modification des formules doit incrémenter FEATURE_SPEC_VERSION
+# (invalide le cache des matrices d'entraînement).
+
+FEATURE_SPEC_VERSION = 1
+
+BASE_COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Adj_Close"]
+INDICATOR_COLUMNS = ["Return", "MA_short_20", "MA_long_50", "RSI_14", "Volatility_30d"]
+DERIVED_COLUMNS = ["MA_ratio", "Close_to_MA50", "Range_pct", "Log_volume"]
+FEATURE_COLUMNS = BASE_COLUMNS + INDICATOR_COLUMNS + DERIVED_COLUMNS
+# Colonnes de base / indicateurs utilisées par chaque feature dérivée
+DERIVED_INPUTS = {
+    "MA_ratio": ["MA_short_20", "MA_long_50"],
+    "Close_to_MA50": ["Close", "MA_long_50"],
+    "Range_pct": ["High", "Low", "Close"],
+    "Log_volume": ["Volume"],
+}
+
+# Lignes d'historique nécessaires avant que tous les indicateurs soient définis
+WARMUP_ROWS = 51
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Harmonise les colonnes brutes (Adj Close -> Adj_Close, Close par défaut)."""
+    if "Adj Close" in df.columns:
+        df = df.rename(columns={"Adj Close": "Adj_Close"})
+    if "Adj_Close" not in df.columns and "Close" in df.columns:
+        df = df.assign(Adj_Close=df["Close"])
+    missing = [c for c in BASE_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes: {missing}")
+    return df
+
+
+# Formules des indicateurs : seule définition du projet, utilisée aussi par
+# analysis_stock_data (dashboard, backtest).
+
+def add_return(df: pd.DataFrame) -> pd.DataFrame:
+    """Rendement journalier simple de Close."""
+    df = df.copy()
+    df["Return"] = df["Close"].pct_change()
+    return df
+
+
+def add_moving_averages(df: pd.DataFrame,
+                        short_window: int = 20,
+                        long_window: int = 50) -> pd.DataFrame:
+    """Moyennes mobiles supplémentaires sur Close."""
+    df = df.copy()
+    df["MA_short_20"] = df["Close"].rolling(window=short_window,
+                                            min_periods=short_window).mean()
+    df["MA_long_50"] = df["Close"].rolling(window=long_window,
+                                           min_periods=long_window).mean()
+    return df
+
+
+def add_rsi(df: pd.DataFrame, periods: int = 14) -> pd.DataFrame:
+    """Ajoute un RSI(14) sur la colonne Close."""
+    df = df.copy()
+    delta = df["Close"].diff()
+
+    gain = delta.clip(lower=0)
+    loss = -delta.clip(upper=0)
+
+    avg_gain = gain.rolling(window=periods, min_periods=periods).mean()
+    avg_loss = loss.rolling(window=periods, min_periods=periods).mean()
+
+    rs = avg_gain / avg_loss
+    rsi = 100 - (100 / (1 + rs))
+
+    df["RSI_14"] = rsi
+    return df
+
+
+def add_volatility(df: pd.DataFrame, window: int = 30) -> pd.DataFrame:
+    """Volatilité glissante basée sur les rendements journaliers."""
+    df = df.copy()
+    returns = df["Close"].pct_change()
+    df["Volatility_30d"] = returns.rolling(window=window,
+                                           min_periods=window).std()
+    return df
+
+
+def add_indicator_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Indicateurs sur l'historique trié d'un ticker : mêmes fonctions que
+    analysis_stock_data.compute_indicators (MA 20/50, RSI(14) à moyennes
+    simples, volatilité 30 j).
+    """
+    df = add_return(df)
+    df = add_moving_averages(df, short_window=20, long_window=50)
+    df = add_rsi(df, periods=14)
+    return add_volatility(df, window=30)
+
+
+def add_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Features sans échelle calculées à partir des colonnes de base et des indicateurs."""
+    df = df.copy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        df["MA_ratio"] = df["MA_short_20"] / df["MA_long_50"] - 1
+        df["Close_to_MA50"] = df["Close"] / df["MA_long_50"] - 1
+        df["Range_pct"] = (df["High"] - df["Low"]) / df["Close"]
+        df["Log_volume"] = np.log1p(df["Volume"].clip(lower=0))
+    return df
+
+
+def compute_feature_frame(history: pd.DataFrame) -> pd.DataFrame:
+    """Historique brut d'un ticker (trié par Date) -> DataFrame avec FEATURE_COLUMNS."""
+    return add_derived_columns(add_indicator_columns(normalize_columns(history)))
+
+
+# ============================================================
+# SERVICE
+# ============================================================
+
+def latest_feature_payload(history: pd.DataFrame) -> Dict[str, float]:
+    """
+    Payload /predict pour la dernière ligne d'un historique : base + indicateurs,
+    calculés par la même fonction que pour l'entraînement. JSON n'accepte pas
+    NaN : les prix manquants valent 0.0 (champs obligatoires de StockFeatures),
+    les indicateurs manquants None (l'API refuse alors la requête si le
+    modèle en a besoin, voir feature_matrix).
+    """
+    last = compute_feature_frame(history).iloc[-1]
+    payload = {}
+    for col in BASE_COLUMNS:
+        payload[col] = float(last[col]) if pd.notna(last[col]) else 0.0
+    for col in INDICATOR_COLUMNS:
+        payload[col] = float(last[col]) if pd.notna(last[col]) else None
+    return payload
+
+
+class MissingFeatures(ValueError):
+    """Payload sans une valeur nécessaire au modèle (l'API répond 422)."""
+
+    def __init__(self, missing: Dict[str, List[int]]):
+        self.missing = missing
+        detail = ", ".join(f"{col} (lignes {rows})" for col, rows in missing.items())
+        super().__init__(f"Features manquantes pour ce modèle : {detail}")
+
+
+def required_inputs(feature_order: List[str]) -> List[str]:
+    """Colonnes de payload (base + indicateurs) dont dépendent les features du modèle."""
+    needed = set()
+    for col in feature_order:
+        needed.update(DERIVED_INPUTS.get(col, [col]))
+    return [c for c in BASE_COLUMNS + INDICATOR_COLUMNS if c in needed]
+
+
+def feature_matrix(rows: Iterable[Dict[str, float]], feature_order: List[str]) -> np.ndarray:
+    """
+    Payloads reçus par l'API (base + indicateurs éventuels) -> matrice dans
+    l'ordre feature_order du modèle. Les features dérivées sont recalculées
+    avec add_derived_columns, comme à l'entraînement. Un indicateur absent
+    (ou None) dont le modèle a besoin lève MissingFeatures : le modèle n'a
+    jamais vu de NaN à l'entraînement, une valeur remplie par défaut
+    dégraderait la prédiction sans le signaler.
+    """
+    frame = pd.DataFrame(list(rows))
+    missing = {}
+    for col in required_inputs(feature_order):
+        absent = frame[col].isna().to_numpy() if col in frame.columns else np.ones(len(frame), dtype=bool)
+        if absent.any():
+            missing[col] = np.flatnonzero(absent).tolist()
+    if missing:
+        raise MissingFeatures(missing)
+
+    # colonnes restantes (inutilisées par le modèle) : NaN, pour add_derived_columns
+    frame = frame.reindex(columns=BASE_COLUMNS + INDICATOR_COLUMNS).astype(np.float64)
+    if any(c in DERIVED_COLUMNS for c in feature_order):
+        frame = add_derived_columns(frame)
+    return frame[feature_order].to_numpy(dtype=np.float32)
+
+
+# ============================================================
+# CACHE DES MATRICES D'ENTRAÎNEMENT
+# ============================================================
+
+def feature_cache_key(data_fingerprint: str, **params) -> str:
+    """Clé de cache : empreinte des données + version des features + paramètres de construction."""
+    payload = json.dumps({"data": data_fingerprint, "spec": FEATURE_SPEC_VERSION,
+                          "features": FEATURE_COLUMNS, **params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
@@ -0,0 +1,154 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# ============================================================
+# TÂCHES DE FOND (DRIFT)
+# ============================================================
+# - exécuteur borné : un nombre fixe de threads et une file d'attente limitée
+# - identifiant de tâche renvoyé immédiatement, statut / résultat consultables
+# - regroupement : une demande identique à une tâche en cours réutilise cette tâche
+# - planification périodique optionnelle dans le processus de l'API
+
+
+class JobQueueFull(Exception):
+    """Trop de tâches en attente ou en cours."""
+
+
+class Job:
+    def __init__(self, key: str, name: str):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.name = name
+        self.status = "queued"
+        self.submitted_at = datetime.now().isoformat(timespec="seconds")
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.duration_seconds: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.exception: Optional[BaseException] = None
+        self.future: Optional[Future] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        out = {
+            "job_id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_seconds": self.duration_seconds,
+            "error": self.error,
+        }
+        if include_result:
+            out["result"] = self.result
+        return out
+
+
+class JobManager:
+    def __init__(self, max_workers: int = 1, max_pending: int = 8, history: int = 100):
+        self.max_pending = max_pending
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active_by_key: Dict[str, Job] = {}
+        self._stop = threading.Event()
+        self._timers: List[threading.Thread] = []
+
+    # -----------------------------------------------------------------
+    # Soumission
+    # -----------------------------------------------------------------
+
+    def submit(self, key: str, fn: Callable, *args, name: str = None, **kwargs):
+        """
+        Renvoie (job, coalesced). Si une tâche de même clé est en attente ou en
+        cours, elle est renvoyée telle quelle au lieu d'en lancer une seconde.
+        """
+        with self._lock:
+            active = self._active_by_key.get(key)
+            if active is not None:
+                return active, True
+            if len(self._active_by_key) >= self.max_pending:
+                raise JobQueueFull(f"{len(self._active_by_key)} tâches déjà en cours")
+
+            job = Job(key, name or key)
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job
+            self._trim()
+            job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+            return job, False
+
+    def _run(self, job: Job, fn: Callable, args, kwargs):
+        job.status = "running"
+        job.started_at = datetime.now().isoformat(timespec="seconds")
+        t0 = time.perf_counter()
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = "succeeded"
+        except BaseException as e:
+            job.exception = e
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = "failed"
+        finally:
+            job.duration_seconds = round(time.perf_counter() - t0, 3)
+            job.finished_at = datetime.now().isoformat(timespec="seconds")
+            with self._lock:
+                if self._active_by_key.get(job.key) is job:
+                    del self._active_by_key[job.key]
+        return job.result
+
+    def _trim(self):
+        """Oublie les plus anciennes tâches terminées au-delà de l'historique."""
+        excess = len(self._jobs) - self.history
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].done:
+                del self._jobs[job_id]
+                excess -= 1
+
+    # -----------------------------------------------------------------
+    # Consultation
+    # -----------------------------------------------------------------
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, name: str = None) -> List[Job]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [j for j in reversed(jobs) if name is None or j.name == name]
+
+    # -----------------------------------------------------------------
+    # Planification périodique
+    # -----------------------------------------------------------------
+
+    def schedule_every(self, interval_seconds: float, key: str, fn: Callable, *args,
+                       name: str = None, on_error: Callable = None, **kwargs):
+        """Soumet fn toutes les interval_seconds (thread démon, arrêté par shutdown)."""
+        def loop():
+            while not self._stop.wait(interval_seconds):
+                try:
+                    self.submit(key, fn, *args, name=name, **kwargs)
+                except JobQueueFull as e:
+                    if on_error:
+                        on_error(e)
+
+        thread = threading.Thread(target=loop, name=f"schedule-{key}", daemon=True)
+        thread.start()
+        self._timers.append(thread)
+
+    def shutdown(self, wait: bool = False):
+        self._stop.set()
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
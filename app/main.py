@@ -1,4 +1,5 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List
 import joblib
@@ -13,7 +14,12 @@ from contextlib import asynccontextmanager
 from opencensus.ext.azure.log_exporter import AzureLogHandler
 
 from app.models import StockFeatures, PredictionResponse, HealthResponse
-from app.drift_detect import detect_drift
+from app.drift_detect import detect_drift, reference_histograms
+from app.drift_monitor import DriftMonitor
+from app.jobs import JobManager, JobQueueFull
+from app.prediction_log import PredictionLog
+from app.registry import ModelRegistry
+from app.features import MissingFeatures, feature_matrix
 
 # ============================================================
 # LOGGING & APPLICATION INSIGHTS
@@ -45,17 +51,56 @@ else:
 # ============================================================
 
 MODEL_PATH = os.getenv("MODEL_PATH", "model/finance_model.pkl")
+DRIFT_REFERENCE_PATH = os.getenv("DRIFT_REFERENCE_PATH", "data/stocks")
+PREDICTION_LOG_DIR = os.getenv("PREDICTION_LOG_DIR", "data/production_log")
+PREDICTION_LOG_FLUSH_SECONDS = float(os.getenv("PREDICTION_LOG_FLUSH_SECONDS", "5"))
+PREDICTION_LOG_ROTATE_ROWS = int(os.getenv("PREDICTION_LOG_ROTATE_ROWS", "1000000"))
+PREDICTION_LOG_ROTATE_SECONDS = float(os.getenv("PREDICTION_LOG_ROTATE_SECONDS", "3600"))
+DRIFT_PRODUCTION_PATH = os.getenv("DRIFT_PRODUCTION_PATH", PREDICTION_LOG_DIR)
+DRIFT_WINDOW_SECONDS = int(os.getenv("DRIFT_WINDOW_SECONDS", "3600"))
+DRIFT_WINDOW_BUCKETS = int(os.getenv("DRIFT_WINDOW_BUCKETS", "12"))
+DRIFT_JOB_WORKERS = int(os.getenv("DRIFT_JOB_WORKERS", "1"))
+DRIFT_JOB_MAX_PENDING = int(os.getenv("DRIFT_JOB_MAX_PENDING", "8"))
+DRIFT_CHECK_INTERVAL_SECONDS = float(os.getenv("DRIFT_CHECK_INTERVAL_SECONDS", "0"))
+DEFAULT_FEATURES = ["Open", "High", "Low", "Close", "Volume", "Adj_Close"]
 model = None
+model_metadata = None
+feature_order = DEFAULT_FEATURES
+drift_reference = None
+drift_monitor = None
+jobs = None
+prediction_log = None
+
+def load_active_model():
+    """Version active du registre, sinon l'artefact historique MODEL_PATH."""
+    registry = ModelRegistry()
+    loaded, metadata = registry.load()
+    if loaded is not None:
+        return loaded, metadata, str(registry.artifact_path(metadata["version"]))
+    return joblib.load(MODEL_PATH), None, MODEL_PATH
+
+def load_drift_reference(metadata):
+    """
+    Profil de référence enregistré avec la version active (memmap, aucun calcul),
+    sinon histogrammes recalculés une fois depuis DRIFT_REFERENCE_PATH.
+    """
+    if metadata is not None:
+        reference = ModelRegistry().load_reference(metadata["version"])
+        if reference:
+            return reference, "registry"
+    return reference_histograms(DRIFT_REFERENCE_PATH), DRIFT_REFERENCE_PATH
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global model
+    global model, model_metadata, feature_order, drift_reference, drift_monitor, jobs, prediction_log
     try:
-        model = joblib.load(MODEL_PATH)
+        model, model_metadata, model_path = load_active_model()
+        feature_order = model_metadata["features"] if model_metadata else DEFAULT_FEATURES
         logger.info("model_loaded", extra={
             "custom_dimensions": {
                 "event_type": "model_load",
-                "model_path": MODEL_PATH,
+                "model_path": model_path,
+                "model_version": model_metadata["version"] if model_metadata else "unversioned",
                 "status": "success"
             }
         })
@@ -67,7 +112,49 @@ async def lifespan(app: FastAPI):
             }
         })
         model = None
+
+    try:
+        drift_reference, source = load_drift_reference(model_metadata)
+        drift_monitor = DriftMonitor(drift_reference, window_seconds=DRIFT_WINDOW_SECONDS,
+                                     n_buckets=DRIFT_WINDOW_BUCKETS)
+        logger.info("drift_reference_loaded", extra={
+            "custom_dimensions": {
+                "event_type": "drift_monitor",
+                "source": source,
+                "features": len(drift_reference)
+            }
+        })
+    except Exception as e:
+        logger.warning("drift_monitor_disabled", extra={
+            "custom_dimensions": {
+                "event_type": "drift_monitor",
+                "error": str(e)
+            }
+        })
+        drift_reference = drift_monitor = None
+
+    jobs = JobManager(max_workers=DRIFT_JOB_WORKERS, max_pending=DRIFT_JOB_MAX_PENDING)
+    if DRIFT_CHECK_INTERVAL_SECONDS > 0:
+        jobs.schedule_every(DRIFT_CHECK_INTERVAL_SECONDS, drift_job_key(0.05), run_drift_check, 0.05,
+                            name="drift_check", on_error=log_scheduled_drift_skipped)
+
+    try:
+        prediction_log = PredictionLog(PREDICTION_LOG_DIR,
+                                       flush_seconds=PREDICTION_LOG_FLUSH_SECONDS,
+                                       rotate_rows=PREDICTION_LOG_ROTATE_ROWS,
+                                       rotate_seconds=PREDICTION_LOG_ROTATE_SECONDS)
+    except Exception as e:
+        logger.warning("prediction_log_disabled", extra={
+            "custom_dimensions": {
+                "event_type": "prediction_log",
+                "error": str(e)
+            }
+        })
+        prediction_log = None
     yield
+    jobs.shutdown(wait=False)
+    if prediction_log is not None:
+        prediction_log.close()
 
 app = FastAPI(
     title="Assistant Financier IA",
@@ -103,29 +190,63 @@ def health():
         raise HTTPException(status_code=503, detail="Model not loaded")
     return {"status": "healthy", "model_loaded": True}
 
+@app.get("/model/info", tags=["General"])
+def model_info():
+    if model is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    if model_metadata is None:
+        return {"version": None, "features": feature_order, "model_path": MODEL_PATH}
+    return model_metadata
+
 # ============================================================
 # PREDICTION ENDPOINTS
 # ============================================================
 
+def to_input_matrix(payloads: List[dict]) -> np.ndarray:
+    """
+    Matrice d'entrée dans l'ordre des features enregistré avec le modèle
+    (pipeline app.features) ; 422 si une feature requise manque.
+    """
+    try:
+        return feature_matrix(payloads, feature_order)
+    except MissingFeatures as e:
+        raise HTTPException(status_code=422, detail={"error": "missing_features", "missing": e.missing})
+
+def risk_level(proba: float) -> str:
+    return "Low" if proba < 0.3 else "Medium" if proba < 0.7 else "High"
+
+def record_prediction(input_data: np.ndarray, probas: np.ndarray, endpoint: str):
+    """
+    Alimente le suivi du drift et le journal des prédictions (tampon mémoire,
+    écrit par un thread de fond) ; une erreur ici ne doit jamais bloquer une prédiction.
+    """
+    try:
+        if drift_monitor is not None:
+            drift_monitor.update(input_data, feature_order)
+        if prediction_log is not None:
+            prediction_log.append(input_data, feature_order, probas, endpoint,
+                                  model_metadata["version"] if model_metadata else None)
+    except Exception as e:
+        logger.warning("prediction_record_error", extra={
+            "custom_dimensions": {
+                "event_type": "prediction_record",
+                "error": str(e)
+            }
+        })
+
 @app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
 def predict(features: StockFeatures):
     if model is None:
         raise HTTPException(status_code=503, detail="Model unavailable")
 
-    try:
-        input_data = np.array([[  
-            features.Open,
-            features.High,
-            features.Low,
-            features.Close,
-            features.Volume,
-            features.Adj_Close
-        ]])
+    input_data = to_input_matrix([features.model_dump()])
 
+    try:
         proba = float(model.predict_proba(input_data)[0][1])
         prediction = int(proba > 0.5)
+        record_prediction(input_data, [proba], "/predict")
         
-        risk = "Low" if proba < 0.3 else "Medium" if proba < 0.7 else "High"
+        risk = risk_level(proba)
 
         logger.info("prediction", extra={
             "custom_dimensions": {
@@ -157,24 +278,20 @@ def predict_batch(features_list: List[StockFeatures]):
     if model is None:
         raise HTTPException(status_code=503, detail="Model unavailable")
 
+    input_data = to_input_matrix([f.model_dump() for f in features_list])
+
     try:
         predictions = []
-        for features in features_list:
-            input_data = np.array([[  
-                features.Open,
-                features.High,
-                features.Low,
-                features.Close,
-                features.Volume,
-                features.Adj_Close
-            ]])
-
-            proba = float(model.predict_proba(input_data)[0][1])
+        probas = model.predict_proba(input_data)[:, 1] if features_list else []
+        record_prediction(input_data, probas, "/predict/batch")
+        for proba in probas:
+            proba = float(proba)
             prediction = int(proba > 0.5)
 
             predictions.append({
                 "churn_probability": round(proba, 4),
-                "prediction": prediction
+                "prediction": prediction,
+                "risk_level": risk_level(proba)
             })
 
         logger.info("batch_prediction", extra={
@@ -235,29 +352,112 @@ def log_drift_to_insights(drift_results: dict):
 # DRIFT ENDPOINTS
 # ============================================================
 
-@app.post("/drift/check", tags=["Monitoring"])
-def check_drift(threshold: float = 0.05):
+def run_drift_check(threshold: float) -> dict:
+    """Corps d'une tâche de drift : calcul, journalisation, résumé + détail par feature."""
     try:
         results = detect_drift(
-            reference_file="data/stock_market.csv",
-            production_file="data/production_data.csv",
-            threshold=threshold
+            reference_file=DRIFT_REFERENCE_PATH,
+            production_file=DRIFT_PRODUCTION_PATH,
+            threshold=threshold,
+            reference=drift_reference
         )
-        log_drift_to_insights(results)
-        return {
-            "status": "success",
-            "features_analyzed": len(results),
-            "features_drifted": sum(1 for r in results.values() if r["drift_detected"])
+    except Exception as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.error("drift_error", extra={
+                "custom_dimensions": {
+                    "event_type": "drift_error",
+                    "traceback": traceback.format_exc()
+                }
+            })
+        raise
+    log_drift_to_insights(results)
+    return {
+        "status": "success",
+        "features_analyzed": len(results),
+        "features_drifted": sum(1 for r in results.values() if r["drift_detected"]),
+        "features": results
+    }
+
+def drift_job_key(threshold: float) -> str:
+    return f"drift_check:{threshold}"
+
+def submit_drift_check(threshold: float):
+    return jobs.submit(drift_job_key(threshold), run_drift_check, threshold, name="drift_check")
+
+def log_scheduled_drift_skipped(error: Exception):
+    logger.warning("drift_schedule_skipped", extra={
+        "custom_dimensions": {
+            "event_type": "drift_schedule",
+            "error": str(error)
         }
-    except Exception:
-        tb = traceback.format_exc()
-        logger.error("drift_error", extra={
-            "custom_dimensions": {
-                "event_type": "drift_error",
-                "traceback": tb
-            }
-        })
+    })
+
+@app.post("/drift/check", tags=["Monitoring"], status_code=202)
+def check_drift(threshold: float = 0.05, wait: bool = False):
+    """
+    Lance un contrôle de drift en tâche de fond et renvoie son identifiant.
+    Un contrôle identique déjà en cours est réutilisé. wait=true attend le
+    résultat (comportement synchrone historique).
+    """
+    try:
+        job, coalesced = submit_drift_check(threshold)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    if not wait:
+        return {"status": "accepted", "job_id": job.id, "coalesced": coalesced,
+                "status_url": f"/drift/jobs/{job.id}"}
+
+    job.future.result()
+    if job.status == "failed":
+        if isinstance(job.exception, FileNotFoundError):
+            raise HTTPException(status_code=404, detail=str(job.exception))
         raise HTTPException(status_code=500, detail="Drift check failed")
+    return JSONResponse(status_code=200, content={k: v for k, v in job.result.items() if k != "features"})
+
+@app.get("/drift/jobs", tags=["Monitoring"])
+def list_drift_jobs():
+    return {"jobs": [j.to_dict() for j in jobs.list(name="drift_check")]}
+
+@app.get("/drift/jobs/{job_id}", tags=["Monitoring"])
+def drift_job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.to_dict()
+
+@app.get("/drift/jobs/{job_id}/result", tags=["Monitoring"])
+def drift_job_result(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if not job.done:
+        raise HTTPException(status_code=409, detail=f"Job {job.status}")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    return job.to_dict(include_result=True)
+
+@app.get("/drift/live", tags=["Monitoring"])
+def live_drift(threshold: float = 0.05, min_rows: int = 30):
+    """Drift de la fenêtre glissante des prédictions récentes, sans relire de fichier."""
+    if drift_monitor is None:
+        raise HTTPException(status_code=503, detail="Drift monitor unavailable")
+    report = drift_monitor.check(threshold=threshold, min_rows=min_rows)
+    features = report["features"]
+    return {
+        "status": "success",
+        "window_seconds": report["window_seconds"],
+        "rows_in_window": report["rows_in_window"],
+        "features_analyzed": len(features),
+        "features_drifted": sum(1 for r in features.values() if r["drift_detected"]),
+        "features": features
+    }
+
+@app.get("/predictions/log", tags=["Monitoring"])
+def prediction_log_stats():
+    if prediction_log is None:
+        raise HTTPException(status_code=503, detail="Prediction log unavailable")
+    return prediction_log.stats()
 
 @app.post("/drift/alert", tags=["Monitoring"])
 def manual_drift_alert(
@@ -8,6 +8,13 @@ class StockFeatures(BaseModel):
     Close: float
     Volume: float
     Adj_Close: float 
+    # Indicateurs (app.features.latest_feature_payload) : optionnels, mais un
+    # indicateur requis par le modèle actif et absent -> 422
+    Return: Optional[float] = None
+    MA_short_20: Optional[float] = None
+    MA_long_50: Optional[float] = None
+    RSI_14: Optional[float] = None
+    Volatility_30d: Optional[float] = None
 
 class PredictionResponse(BaseModel):
     churn_probability: float  # Peut-être renommer en "up_probability" ?
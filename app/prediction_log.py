@@ -0,0 +1,245 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# JOURNAL DES PRÉDICTIONS (PARQUET, AJOUT SEUL)
+# ============================================================
+# - append() ne fait qu'ajouter des tableaux à un tampon mémoire (sous verrou)
+# - un thread d'écriture vide le tampon par lots (toutes les flush_seconds ou
+#   dès flush_rows lignes) : un groupe de lignes Parquet par lot
+# - rotation par taille (rotate_rows) ou par âge (rotate_seconds) : le segment
+#   courant s'écrit en .parquet.inprogress puis est renommé en .parquet à la
+#   fermeture. Les lecteurs (drift, ré-entraînement) ne voient que des
+#   segments complets.
+# - si l'écriture prend du retard, au-delà de max_buffer_rows les lignes les
+#   plus anciennes du tampon sont abandonnées (comptées dans dropped_rows)
+# - une erreur d'écriture (disque plein, schéma, renommage) est journalisée et
+#   comptée (write_errors) sans arrêter le thread ; le lot non écrit est retenté
+#   aux vidages suivants, puis abandonné après write_retries échecs
+#   (compté dans failed_rows)
+
+logger = logging.getLogger("assistant-financier-ia")
+
+SEGMENT_SUFFIX = ".parquet"
+INPROGRESS_SUFFIX = ".parquet.inprogress"
+
+
+class PredictionLog:
+    def __init__(self,
+                 directory: str = "data/production_log",
+                 flush_rows: int = 1000,
+                 flush_seconds: float = 5.0,
+                 rotate_rows: int = 1_000_000,
+                 rotate_seconds: float = 3600.0,
+                 max_buffer_rows: int = 200_000,
+                 write_retries: int = 3):
+        import pyarrow  # noqa: F401  (dépendance requise, erreur explicite au démarrage)
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.rotate_rows = rotate_rows
+        self.rotate_seconds = rotate_seconds
+        self.max_buffer_rows = max_buffer_rows
+        self.write_retries = write_retries
+
+        self._lock = threading.Lock()
+        self._buffer: List[pd.DataFrame] = []
+        self._buffered_rows = 0
+        self.dropped_rows = 0
+        self.written_rows = 0
+        self.failed_rows = 0
+        self.write_errors = 0
+        self.last_error: Optional[str] = None
+        self._pending: List[pd.DataFrame] = []  # lot en échec, retenté au prochain vidage
+        self._pending_attempts = 0
+
+        self._writer = None
+        self._schema = None
+        self._segment_path: Optional[Path] = None
+        self._segment_rows = 0
+        self._segment_opened = 0.0
+        self._segment_seq = 0
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="prediction-log", daemon=True)
+        self._thread.start()
+
+    # -----------------------------------------------------------------
+    # Chemin des requêtes
+    # -----------------------------------------------------------------
+
+    def append(self, X: np.ndarray, columns: List[str], probabilities: np.ndarray,
+               endpoint: str, model_version: Optional[str] = None):
+        """Ajoute entrées + sorties au tampon ; aucune écriture disque ici."""
+        n = len(X)
+        if not n:
+            return
+        frame = pd.DataFrame(np.asarray(X, dtype=np.float32), columns=list(columns))
+        probabilities = np.asarray(probabilities, dtype=np.float32)
+        frame.insert(0, "timestamp", pd.Timestamp.now().floor("ms"))
+        frame.insert(1, "endpoint", endpoint)
+        frame.insert(2, "model_version", model_version or "unversioned")
+        frame["probability"] = probabilities
+        frame["prediction"] = (probabilities > 0.5).astype(np.int8)
+
+        with self._lock:
+            self._buffer.append(frame)
+            self._buffered_rows += n
+            while self._buffered_rows > self.max_buffer_rows and len(self._buffer) > 1:
+                oldest = self._buffer.pop(0)
+                self._buffered_rows -= len(oldest)
+                self.dropped_rows += len(oldest)
+            if self._buffered_rows >= self.flush_rows:
+                self._wake.set()
+
+    # -----------------------------------------------------------------
+    # Thread d'écriture
+    # -----------------------------------------------------------------
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self._safe_flush()
+
+    def _safe_flush(self):
+        """flush() sans jamais lever : l'erreur est journalisée et comptée."""
+        try:
+            self.flush()
+        except Exception as e:
+            self.write_errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.warning("prediction_log_write_error", extra={
+                "custom_dimensions": {
+                    "event_type": "prediction_log",
+                    "error": self.last_error,
+                    "pending_rows": sum(len(f) for f in self._pending),
+                    "failed_rows": self.failed_rows
+                }
+            })
+
+    def flush(self):
+        """
+        Écrit le tampon (et un lot précédemment en échec). En cas d'erreur, les
+        lignes non écrites sont gardées pour le prochain vidage, ou abandonnées
+        après write_retries tentatives ; l'exception est relancée.
+        """
+        with self._lock:
+            frames, self._buffer, self._buffered_rows = self._buffer, [], 0
+        frames, self._pending = self._pending + frames, []
+
+        import pyarrow as pa
+
+        # Un changement de colonnes (nouveau modèle) ouvre un nouveau segment
+        groups = list(self._group_by_columns(frames)) if frames else []
+        written = 0
+        try:
+            if self._writer is not None and time.time() - self._segment_opened >= self.rotate_seconds:
+                self._close_segment()
+            for frame in groups:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if self._writer is not None and not table.schema.equals(self._schema):
+                    self._close_segment()
+                if self._writer is None:
+                    self._open_segment(table.schema)
+                self._writer.write_table(table)
+                written += 1
+                self._segment_rows += table.num_rows
+                self.written_rows += table.num_rows
+                if self._segment_rows >= self.rotate_rows:
+                    self._close_segment()
+        except Exception:
+            self._abandon_segment()
+            if groups[written:]:
+                self._keep_unwritten(groups[written:])
+            raise
+        self._pending_attempts = 0
+
+    def _keep_unwritten(self, frames: List[pd.DataFrame]):
+        self._pending_attempts += 1
+        if self._pending_attempts > self.write_retries:
+            self.failed_rows += sum(len(f) for f in frames)
+            self._pending_attempts = 0
+            return
+        self._pending = frames
+
+    def _abandon_segment(self):
+        """Après une erreur : ferme le segment courant si possible, sinon l'oublie (.inprogress)."""
+        try:
+            self._close_segment()
+        except Exception:
+            self._writer = self._schema = self._segment_path = None
+
+    @staticmethod
+    def _group_by_columns(frames: List[pd.DataFrame]):
+        group = [frames[0]]
+        for frame in frames[1:]:
+            if list(frame.columns) == list(group[-1].columns):
+                group.append(frame)
+            else:
+                yield pd.concat(group, ignore_index=True)
+                group = [frame]
+        yield pd.concat(group, ignore_index=True)
+
+    def _open_segment(self, schema):
+        import pyarrow.parquet as pq
+
+        self._segment_seq += 1
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self._segment_path = self.directory / f"predictions-{stamp}-{self._segment_seq:04d}{INPROGRESS_SUFFIX}"
+        self._writer = pq.ParquetWriter(self._segment_path, schema)
+        self._schema = schema
+        self._segment_rows = 0
+        self._segment_opened = time.time()
+
+    def _close_segment(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        final = self._segment_path.with_name(self._segment_path.name[: -len(INPROGRESS_SUFFIX)] + SEGMENT_SUFFIX)
+        self._segment_path.rename(final)
+        self._writer = self._schema = self._segment_path = None
+
+    def close(self):
+        """Arrête le thread, écrit le reste du tampon et ferme le segment courant."""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._safe_flush()
+        try:
+            self._close_segment()
+        except Exception:
+            self._abandon_segment()
+
+    def stats(self) -> dict:
+        with self._lock:
+            buffered = self._buffered_rows
+        return {
+            "directory": str(self.directory),
+            "buffered_rows": buffered,
+            "written_rows": self.written_rows,
+            "dropped_rows": self.dropped_rows,
+            "pending_rows": sum(len(f) for f in self._pending),
+            "failed_rows": self.failed_rows,
+            "write_errors": self.write_errors,
+            "last_error": self.last_error,
+            "segments": len(list(self.directory.glob(f"*{SEGMENT_SUFFIX}"))),
+        }
+
+
+def read_prediction_log(directory: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Segments complets du journal en un DataFrame (ré-entraînement, analyses)."""
+    files = sorted(Path(directory).glob(f"*{SEGMENT_SUFFIX}"))
+    if not files:
+        return pd.DataFrame(columns=columns)
+    return pd.concat([pd.read_parquet(f, columns=columns) for f in files], ignore_index=True)
@@ -0,0 +1,231 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+
+from app.drift_detect import load_reference_profile, save_reference_profile
+
+REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "model/registry")
+INDEX_FILE = "registry.json"
+ARTIFACT_FILE = "model.pkl"
+METADATA_FILE = "metadata.json"
+REFERENCE_DIR = "reference"
+
+
+def data_fingerprint(paths) -> str:
+    """Empreinte des données d'entraînement (nom, taille, date de modification des fichiers)."""
+    h = hashlib.sha256()
+    for p in sorted(Path(p) for p in paths):
+        st = p.stat()
+        h.update(f"{p.name}|{st.st_size}|{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()[:16]
+
+
+def benchmark_model(model, sample: np.ndarray, repeats: int = 200) -> Dict[str, float]:
+    """
+    Latence d'inférence mesurée au moment de l'enregistrement :
+    une ligne (comme /predict) et un lot (comme /predict/batch).
+    """
+    sample = np.asarray(sample, dtype=np.float32)
+    single = sample[:1]
+    model.predict_proba(single)  # échauffement
+
+    timings = []
+    for i in range(repeats):
+        row = sample[i % len(sample)][None, :]
+        t0 = time.perf_counter()
+        model.predict_proba(row)
+        timings.append(time.perf_counter() - t0)
+    timings = np.array(timings) * 1000
+
+    t0 = time.perf_counter()
+    model.predict_proba(sample)
+    batch_seconds = time.perf_counter() - t0
+
+    return {
+        "single_row_p50_ms": round(float(np.percentile(timings, 50)), 4),
+        "single_row_p95_ms": round(float(np.percentile(timings, 95)), 4),
+        "batch_rows": int(len(sample)),
+        "batch_per_row_us": round(batch_seconds / len(sample) * 1e6, 3),
+    }
+
+
+class ModelRegistry:
+    """
+    Registre local de modèles, un dossier par version :
+
+        model/registry/registry.json        index (version active, historique)
+        model/registry/v0001/model.pkl      artefact
+        model/registry/v0001/metadata.json  features, empreinte des données,
+                                            précision, benchmark, paramètres
+        model/registry/v0001/reference/     profil de référence pour le drift
+    """
+
+    def __init__(self, root: str = REGISTRY_DIR):
+        self.root = Path(root)
+
+    # -----------------------------------------------------------------
+    # Index
+    # -----------------------------------------------------------------
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / INDEX_FILE
+
+    def _read_index(self) -> Dict[str, Any]:
+        if not self.index_path.exists():
+            return {"active": None, "history": [], "versions": []}
+        with open(self.index_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_index(self, index: Dict[str, Any]):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, self.index_path)
+
+    def list_versions(self) -> List[str]:
+        return list(self._read_index()["versions"])
+
+    def active_version(self) -> Optional[str]:
+        return self._read_index()["active"]
+
+    def metadata(self, version: str) -> Dict[str, Any]:
+        with open(self.root / version / METADATA_FILE, encoding="utf-8") as f:
+            return json.load(f)
+
+    def artifact_path(self, version: str) -> Path:
+        return self.root / version / ARTIFACT_FILE
+
+    def reference_path(self, version: str) -> Path:
+        return self.root / version / REFERENCE_DIR
+
+    # -----------------------------------------------------------------
+    # Enregistrement / promotion / retour arrière
+    # -----------------------------------------------------------------
+
+    def register(self,
+                 model,
+                 features: List[str],
+                 data_fingerprint: str,
+                 accuracy: Optional[float],
+                 benchmark_sample: np.ndarray,
+                 params: Optional[Dict[str, Any]] = None,
+                 extra: Optional[Dict[str, Any]] = None,
+                 reference_profile=None,
+                 promote: bool = False) -> str:
+        """Sauvegarde une nouvelle version (artefact + métadonnées) et renvoie son identifiant."""
+        index = self._read_index()
+        version = f"v{len(index['versions']) + 1:04d}"
+        version_dir = self.root / version
+        version_dir.mkdir(parents=True, exist_ok=False)
+
+        joblib.dump(model, version_dir / ARTIFACT_FILE)
+
+        t0 = time.perf_counter()
+        joblib.load(version_dir / ARTIFACT_FILE)
+        load_seconds = time.perf_counter() - t0
+
+        benchmark = benchmark_model(model, benchmark_sample)
+        benchmark["artifact_size_bytes"] = (version_dir / ARTIFACT_FILE).stat().st_size
+        benchmark["load_seconds"] = round(load_seconds, 4)
+
+        if reference_profile:
+            save_reference_profile(reference_profile, version_dir / REFERENCE_DIR)
+
+        metadata = {
+            "version": version,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "model_class": type(model).__name__,
+            "features": list(features),
+            "data_fingerprint": data_fingerprint,
+            "accuracy": accuracy,
+            "params": params or {},
+            "benchmark": benchmark,
+            "reference_profile": sorted(reference_profile) if reference_profile else None,
+        }
+        if extra:
+            metadata.update(extra)
+        with open(version_dir / METADATA_FILE, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2)
+
+        index["versions"].append(version)
+        self._write_index(index)
+        if promote:
+            self.promote(version)
+        return version
+
+    def promote(self, version: str):
+        """Active une version ; la version précédente reste dans l'historique pour un retour arrière."""
+        index = self._read_index()
+        if version not in index["versions"]:
+            raise ValueError(f"Version inconnue : {version}")
+        if index["active"] != version:
+            index["history"].append(version)
+            index["active"] = version
+            self._write_index(index)
+
+    def rollback(self) -> str:
+        """Réactive la version active précédente."""
+        index = self._read_index()
+        if len(index["history"]) < 2:
+            raise ValueError("Aucune version précédente vers laquelle revenir")
+        index["history"].pop()
+        index["active"] = index["history"][-1]
+        self._write_index(index)
+        return index["active"]
+
+    # -----------------------------------------------------------------
+    # Chargement
+    # -----------------------------------------------------------------
+
+    def load(self, version: Optional[str] = None) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """Charge une version (par défaut l'active). Renvoie (None, None) si le registre est vide."""
+        version = version or self.active_version()
+        if version is None:
+            return None, None
+        return joblib.load(self.artifact_path(version)), self.metadata(version)
+
+    def load_reference(self, version: Optional[str] = None, mmap: bool = True):
+        """Profil de référence (histogrammes en memmap) d'une version, None s'il n'existe pas."""
+        version = version or self.active_version()
+        if version is None:
+            return None
+        return load_reference_profile(self.reference_path(version), mmap=mmap)
+
+
+# ---------------------------------------------------------------------
+# Ligne de commande : python -m app.registry list|promote|rollback
+# ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Registre local des modèles.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Liste les versions")
+    p_promote = sub.add_parser("promote", help="Active une version")
+    p_promote.add_argument("version")
+    sub.add_parser("rollback", help="Revient à la version active précédente")
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    if args.command == "list":
+        active = registry.active_version()
+        for v in registry.list_versions():
+            meta = registry.metadata(v)
+            bench = meta.get("benchmark", {})
+            print(f"{'*' if v == active else ' '} {v}  {meta['created_at']}  "
+                  f"acc={meta.get('accuracy')}  p50={bench.get('single_row_p50_ms')}ms  "
+                  f"size={bench.get('artifact_size_bytes')}B  data={meta['data_fingerprint']}")
+    elif args.command == "promote":
+        registry.promote(args.version)
+        print(f"Version active : {args.version}")
+    elif args.command == "rollback":
+        print(f"Version active : {registry.rollback()}")
@@ -0,0 +1,229 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analysis_stock_data import (
+    DATA_DIR,
+    read_stock_csv,
+    compute_indicators,
+    technical_score_series,
+)
+
+TRADING_DAYS = 252
+
+
+# ---------------------------------------------------------------------
+# Règles de position
+# ---------------------------------------------------------------------
+
+def score_to_position(score: np.ndarray,
+                      long_threshold: int = 1,
+                      short_threshold: int = -1,
+                      allow_short: bool = True) -> np.ndarray:
+    """
+    Traduit le score technique en position :
+    +1 (long) si score >= long_threshold, -1 (short) si score <= short_threshold,
+    0 (flat) sinon.
+    """
+    score = np.asarray(score)
+    position = np.zeros(score.shape, dtype=np.int8)
+    position[score >= long_threshold] = 1
+    if allow_short:
+        position[score <= short_threshold] = -1
+    return position
+
+
+# ---------------------------------------------------------------------
+# Backtest d'une série
+# ---------------------------------------------------------------------
+
+def backtest_matrix(close: np.ndarray,
+                    scores: np.ndarray,
+                    long_threshold: int = 1,
+                    short_threshold: int = -1,
+                    allow_short: bool = True,
+                    cost_bps: float = 0.0) -> dict:
+    """
+    Backtest vectorisé long/flat/short d'une série de clôtures (n,) pour
+    plusieurs séries de scores à la fois (k, n). Retourne un dict de tableaux (k,).
+    La position décidée à la clôture t s'applique au rendement t -> t+1
+    (pas de biais d'anticipation).
+    """
+    close = np.asarray(close, dtype=np.float64)
+    scores = np.atleast_2d(scores)
+    k, n = scores.shape
+
+    position = score_to_position(scores, long_threshold, short_threshold, allow_short)
+
+    returns = np.zeros(n)
+    if n > 1:
+        returns[1:] = close[1:] / close[:-1] - 1.0
+    returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+    held = np.zeros((k, n), dtype=np.int8)
+    held[:, 1:] = position[:, :-1]
+
+    changes = np.abs(np.diff(held, axis=1, prepend=0)).astype(np.float64)
+    strat_returns = held * returns - changes * cost_bps / 10_000
+
+    equity = np.cumprod(1.0 + strat_returns, axis=1)
+    running_max = np.maximum.accumulate(equity, axis=1)
+    drawdown = equity / running_max - 1.0
+
+    in_market = held != 0
+    n_in_market = in_market.sum(axis=1)
+    wins = ((strat_returns > 0) & in_market).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hit_rate = np.where(n_in_market > 0, wins / n_in_market, np.nan)
+
+    total_return = equity[:, -1] - 1.0 if n else np.zeros(k)
+    years = max(n - 1, 1) / TRADING_DAYS
+    annualized = np.where(total_return > -1,
+                          np.power(np.maximum(1.0 + total_return, 0.0), 1.0 / years) - 1.0,
+                          -1.0)
+
+    return {
+        "n_bars": np.full(k, n),
+        "total_return": total_return,
+        "buy_hold_return": np.full(k, np.prod(1.0 + returns) - 1.0),
+        "annualized_return": annualized,
+        "hit_rate": hit_rate,
+        "max_drawdown": drawdown.min(axis=1) if n else np.zeros(k),
+        "turnover": changes.sum(axis=1) / max(n, 1),
+        "n_trades": np.count_nonzero(changes, axis=1),
+        "exposure": n_in_market / max(n, 1),
+    }
+
+
+def backtest_series(close: np.ndarray, score: np.ndarray, **rules) -> dict:
+    """Backtest d'une seule série de scores (voir backtest_matrix)."""
+    metrics = backtest_matrix(close, np.asarray(score)[None, :], **rules)
+    return {k: v[0].item() for k, v in metrics.items()}
+
+
+def backtest_ticker(ticker: str,
+                    start_date=None,
+                    end_date=None,
+                    data_dir: Path = DATA_DIR,
+                    **rules) -> dict:
+    """
+    Backtest d'un ticker : indicateurs calculés sur tout l'historique
+    (préchauffage correct), puis évaluation sur la fenêtre [start_date, end_date].
+    """
+    try:
+        df = compute_indicators(read_stock_csv(ticker, data_dir))
+    except Exception as e:
+        return {"ticker": ticker, "error": str(e)}
+
+    df["Technical_Score"] = technical_score_series(df)
+    if start_date:
+        df = df[df["Date"] >= pd.to_datetime(start_date)]
+    if end_date:
+        df = df[df["Date"] <= pd.to_datetime(end_date)]
+
+    result = backtest_series(df["Close"].to_numpy(), df["Technical_Score"].to_numpy(), **rules)
+    result["ticker"] = ticker
+    return result
+
+
+def _backtest_worker(args):
+    ticker, start_date, end_date, data_dir, rules = args
+    return backtest_ticker(ticker, start_date, end_date, data_dir, **rules)
+
+
+# ---------------------------------------------------------------------
+# Backtest multi-tickers en parallèle
+# ---------------------------------------------------------------------
+
+def list_tickers(data_dir: Path = DATA_DIR) -> list:
+    return sorted(p.stem for p in Path(data_dir).glob("*.csv"))
+
+
+def run_backtest(tickers=None,
+                 start_date=None,
+                 end_date=None,
+                 data_dir: Path = DATA_DIR,
+                 workers: int = None,
+                 **rules) -> pd.DataFrame:
+    """
+    Lance le backtest sur plusieurs tickers dans un pool de processus.
+    Retourne un DataFrame (une ligne par ticker).
+    """
+    if tickers is None:
+        tickers = list_tickers(data_dir)
+    workers = workers or os.cpu_count() or 1
+
+    tasks = [(t, start_date, end_date, data_dir, rules) for t in tickers]
+    if workers == 1 or len(tasks) <= 1:
+        results = [_backtest_worker(t) for t in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_backtest_worker, tasks, chunksize=chunksize))
+
+    return pd.DataFrame(results).set_index("ticker")
+
+
+def aggregate_results(results: pd.DataFrame) -> dict:
+    """Statistiques globales sur l'univers testé (tickers en erreur exclus)."""
+    ok = results
+    if "error" in results.columns:
+        ok = results[results["error"].isna()]
+    if ok.empty:
+        return {"n_tickers": 0}
+
+    return {
+        "n_tickers": int(len(ok)),
+        "n_errors": int(len(results) - len(ok)),
+        "mean_total_return": float(ok["total_return"].mean()),
+        "median_total_return": float(ok["total_return"].median()),
+        "mean_buy_hold_return": float(ok["buy_hold_return"].mean()),
+        "share_beating_buy_hold": float((ok["total_return"] > ok["buy_hold_return"]).mean()),
+        "mean_hit_rate": float(ok["hit_rate"].mean()),
+        "mean_max_drawdown": float(ok["max_drawdown"].mean()),
+        "mean_turnover": float(ok["turnover"].mean()),
+    }
+
+
+# ---------------------------------------------------------------------
+# Ligne de commande
+# ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest du score technique sur l'univers de tickers.")
+    parser.add_argument("--tickers", nargs="*", help="Tickers à tester (défaut : tout data/stocks)")
+    parser.add_argument("--start", default=None, help="Date début (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="Date fin (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus")
+    parser.add_argument("--long-threshold", type=int, default=1)
+    parser.add_argument("--short-threshold", type=int, default=-1)
+    parser.add_argument("--no-short", action="store_true", help="Stratégie long/flat uniquement")
+    parser.add_argument("--cost-bps", type=float, default=0.0, help="Coût par changement de position (bps)")
+    parser.add_argument("--output", default=None, help="Fichier CSV des résultats par ticker")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    results = run_backtest(
+        tickers=args.tickers or None,
+        start_date=args.start,
+        end_date=args.end,
+        workers=args.workers,
+        long_threshold=args.long_threshold,
+        short_threshold=args.short_threshold,
+        allow_short=not args.no_short,
+        cost_bps=args.cost_bps,
+    )
+    elapsed = time.perf_counter() - t0
+
+    print(f"Backtest terminé : {len(results)} tickers en {elapsed:.2f}s\n")
+    for k, v in aggregate_results(results).items():
+        print(f"{k}: {v}")
+
+    if args.output:
+        results.to_csv(args.output)
+        print(f"\nRésultats sauvegardés dans {args.output}")
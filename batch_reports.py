@@ -0,0 +1,231 @@
+import argparse
+import csv
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from analysis_stock_data import DATA_DIR
+from financial_agent import (
+    REPORTS_DIR,
+    financial_agent,
+    new_financial_agent,
+    new_web_news_agent,
+    report_path,
+    run_news_search,
+    run_quantitative_analysis,
+    web_news_agent,
+    write_report,
+)
+from local_llm import local_agent, local_delays
+
+# ---------------------------------------------------------------------
+# Génération des rapports en lot (mode non interactif)
+# ---------------------------------------------------------------------
+# - liste de tickers (arguments, fichier texte / CSV, ou tous les CSV de data/stocks)
+# - N rapports en parallèle, appels au modèle limités par un seau à jetons
+# - reprise : un rapport déjà présent (écriture atomique) n'est pas refait
+# - résumé : débit, latence par rapport et par étape, échecs
+#
+# Exemple (sans Groq) :
+#   python batch_reports.py --all --backend local --workers 8
+
+
+class RateLimiter:
+    """Seau à jetons : au plus `rate_per_minute` appels par minute, rafales de `burst`."""
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def acquire(self):
+        t0 = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.waited_seconds += now - t0
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+class RateLimitedAgent:
+    """
+    Enveloppe d'agent : chaque appel au modèle passe par le limiteur. Les
+    réponses servies par le cache (llm_cache) ne consomment pas de jeton.
+    """
+
+    def __init__(self, agent, limiter: RateLimiter):
+        self._agent = agent
+        self._limiter = limiter
+
+    def __getattr__(self, name):
+        # name, model, role, instructions : utilisés par la clé du cache
+        return getattr(self._agent, name)
+
+    def run(self, message: str, **kwargs):
+        self._limiter.acquire()
+        return self._agent.run(message, **kwargs)
+
+
+# ---------------------------------------------------------------------
+# Tickers
+# ---------------------------------------------------------------------
+
+def read_tickers_file(path: str) -> List[str]:
+    """Un ticker par ligne (# = commentaire), ou CSV avec une colonne Symbol / Ticker."""
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            column = next((c for c in reader.fieldnames or [] if c.lower() in ("symbol", "ticker")), None)
+            if column is None:
+                raise ValueError(f"{path} : colonne Symbol ou Ticker introuvable")
+            return [row[column] for row in reader]
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [line.split("#")[0] for line in lines]
+
+
+def collect_tickers(args) -> List[str]:
+    tickers = list(args.tickers or [])
+    if args.tickers_file:
+        tickers += read_tickers_file(args.tickers_file)
+    if args.all:
+        tickers += [p.stem for p in sorted(Path(DATA_DIR).glob("*.csv"))]
+    # ordre conservé, doublons et vides retirés
+    return list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+
+
+# ---------------------------------------------------------------------
+# Un rapport
+# ---------------------------------------------------------------------
+
+def build_report(ticker: str, start, end, path: Path, agents: dict) -> dict:
+    """agents : nom -> fonction qui construit un nouvel agent (un par rapport)."""
+    quant_agent, news_agent = agents["quant"](), agents["news"]()
+    t0 = time.perf_counter()
+    _, quant_content = run_quantitative_analysis(ticker, start, end, agent=quant_agent)
+    t1 = time.perf_counter()
+    news_content = run_news_search(ticker, agent=news_agent)
+    t2 = time.perf_counter()
+    write_report(path, ticker, start, end, quant_content, news_content)
+    return {"quant_seconds": t1 - t0, "news_seconds": t2 - t1, "total_seconds": time.perf_counter() - t0}
+
+
+def make_agents(backend: str, limiter: RateLimiter, first_token_delay: float, token_delay: float) -> dict:
+    """
+    Fabriques d'agents (nom -> fonction sans argument). Chaque rapport a ses
+    propres instances : un Agent phi partagé entre threads mélangerait l'état
+    des appels simultanés (run_response, mémoire).
+    """
+    if backend == "local":
+        factories = {
+            "quant": lambda: local_agent(financial_agent.name, financial_agent.role, financial_agent.instructions,
+                                         first_token_delay=first_token_delay, token_delay=token_delay),
+            "news": lambda: local_agent(web_news_agent.name, web_news_agent.role, web_news_agent.instructions,
+                                        first_token_delay=first_token_delay, token_delay=token_delay),
+        }
+    else:
+        factories = {"quant": new_financial_agent, "news": new_web_news_agent}
+    if limiter is None:
+        return factories
+    return {name: (lambda f=factory: RateLimitedAgent(f(), limiter)) for name, factory in factories.items()}
+
+
+def _percentiles(values: List[float]) -> dict:
+    if not values:
+        return {}
+    arr = np.asarray(values)
+    return {"p50": round(float(np.percentile(arr, 50)), 3),
+            "p95": round(float(np.percentile(arr, 95)), 3),
+            "max": round(float(arr.max()), 3)}
+
+
+def run_batch(tickers: List[str], start=None, end=None, reports_dir=REPORTS_DIR, workers: int = 4,
+              agents: dict = None, force: bool = False, limiter: RateLimiter = None) -> dict:
+    day = datetime.today().strftime("%Y-%m-%d")
+    paths = {t: report_path(t, start, end, reports_dir, day) for t in tickers}
+    todo = [t for t in tickers if force or not paths[t].exists()]
+    skipped = len(tickers) - len(todo)
+    print(f"{len(tickers)} tickers, {skipped} rapport(s) déjà présent(s), {len(todo)} à générer "
+          f"({workers} workers)")
+
+    done, failed = {}, {}
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report") as pool:
+        futures = {pool.submit(build_report, t, start, end, paths[t], agents): t for t in todo}
+        for i, future in enumerate(as_completed(futures), 1):
+            ticker = futures[future]
+            try:
+                done[ticker] = future.result()
+                status = f"{done[ticker]['total_seconds']:.1f}s"
+            except Exception as e:
+                failed[ticker] = f"{type(e).__name__}: {e}"
+                status = f"ÉCHEC ({failed[ticker]})"
+            print(f"[{i}/{len(todo)}] {ticker} : {status}", flush=True)
+    wall = time.perf_counter() - t0
+
+    return {
+        "tickers": len(tickers),
+        "generated": len(done),
+        "skipped": skipped,
+        "failed": failed,
+        "wall_seconds": round(wall, 3),
+        "reports_per_minute": round(len(done) / wall * 60, 2) if wall > 0 and done else 0.0,
+        "report_latency": _percentiles([r["total_seconds"] for r in done.values()]),
+        "quant_latency": _percentiles([r["quant_seconds"] for r in done.values()]),
+        "news_latency": _percentiles([r["news_seconds"] for r in done.values()]),
+        "rate_limit_wait_seconds": round(limiter.waited_seconds, 3) if limiter else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère les rapports Markdown de plusieurs tickers en parallèle.")
+    parser.add_argument("tickers", nargs="*", help="Tickers (ex: AAPL MSFT)")
+    parser.add_argument("--tickers-file", help="Fichier texte (un ticker par ligne) ou CSV (colonne Symbol)")
+    parser.add_argument("--all", action="store_true", help=f"Tous les tickers de {DATA_DIR}")
+    parser.add_argument("--start", help="Date début (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Date fin (YYYY-MM-DD)")
+    parser.add_argument("--reports-dir", default=str(REPORTS_DIR))
+    parser.add_argument("--workers", type=int, default=4, help="Rapports générés en parallèle")
+    parser.add_argument("--rate-per-minute", type=float, default=30.0,
+                        help="Appels au modèle par minute (0 = sans limite)")
+    parser.add_argument("--burst", type=int, default=4, help="Appels autorisés en rafale")
+    parser.add_argument("--backend", choices=["groq", "local"], default="groq",
+                        help="local : agent de substitution sans réseau (local_llm.py) ; "
+                             "groq : agents de financial_agent (LLM_BACKEND)")
+    parser.add_argument("--first-token-delay", type=float, default=local_delays()["first_token_delay"],
+                        help="Backend local : délai initial (s)")
+    parser.add_argument("--token-delay", type=float, default=local_delays()["token_delay"],
+                        help="Backend local : délai par mot (s)")
+    parser.add_argument("--force", action="store_true", help="Refaire les rapports déjà présents")
+    parser.add_argument("--summary-json", help="Écrit aussi le résumé dans ce fichier")
+    args = parser.parse_args()
+
+    tickers = collect_tickers(args)
+    if not tickers:
+        parser.error("aucun ticker (arguments, --tickers-file ou --all)")
+
+    limiter = RateLimiter(args.rate_per_minute, args.burst) if args.rate_per_minute > 0 else None
+    agents = make_agents(args.backend, limiter, args.first_token_delay, args.token_delay)
+    summary = run_batch(tickers, args.start, args.end, args.reports_dir, args.workers,
+                        agents, args.force, limiter)
+
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.summary_json:
+        Path(args.summary_json).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    sys.exit(1 if summary["failed"] else 0)
@@ -0,0 +1,102 @@
+"""
+Taille et temps de rendu des graphiques du tableau de bord, avec et sans
+sous-échantillonnage (downsample.py).
+
+    python benchmarks/chart_benchmark.py                  # tickers de data/stocks
+    python benchmarks/chart_benchmark.py --years 40 --tickers 8   # historiques synthétiques
+
+Pour chaque graphique : points envoyés, taille Arrow (format transmis au
+navigateur) et temps de l'appel st.*_chart (sérialisation comprise), sans
+sous-échantillonnage puis avec.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import streamlit as st  # noqa: E402
+
+from analysis_stock_data import DATA_DIR, compute_indicators, read_stock_csv  # noqa: E402
+from downsample import arrow_payload_bytes, downsample_frame, target_points  # noqa: E402
+
+
+def synthetic_history(ticker: str, years: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("1980-01-01", periods=years * 252)
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(dates))))
+    return pd.DataFrame({"Date": dates, "Close": close, "Volume": rng.lognormal(14, 0.5, len(dates))})
+
+
+def dashboard_charts(histories: dict) -> list:
+    """(nom, type, fraction de largeur, données) des graphiques des deux pages."""
+    charts = []
+    first = next(iter(histories.values()))
+    indexed = first.set_index("Date")
+    charts.append(("Prix", "line", 2 / 3, indexed[["Close"]]))
+    charts.append(("Volume", "bar", 2 / 3, indexed[["Volume"]]))
+    charts.append(("Moyennes mobiles", "line", 1 / 2, indexed[["Close", "MA_short", "MA_long"]].dropna()))
+    charts.append(("Volatilité", "line", 1 / 2, indexed[["Volatility_30d"]].dropna()))
+    charts.append(("RSI", "line", 1 / 2, indexed[["RSI_14"]].dropna()))
+
+    closes = pd.DataFrame({t: df.set_index("Date")["Close"] for t, df in histories.items()})
+    charts.append(("Performance (comparaison)", "line", 1.0, (closes / closes.bfill().iloc[0] - 1) * 100))
+    volumes = pd.DataFrame({t: df.set_index("Date")["Volume"] for t, df in histories.items()})
+    charts.append(("Volume (comparaison)", "bar", 1.0, volumes))
+    return charts
+
+
+def time_render(kind: str, data: pd.DataFrame, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        getattr(st, f"{kind}_chart")(data)
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Graphiques avant / après sous-échantillonnage.")
+    parser.add_argument("--years", type=int, default=0, help="Historiques synthétiques de N années (0 = CSV)")
+    parser.add_argument("--tickers", type=int, default=6, help="Nombre de tickers comparés")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.years:
+        raw = {f"SYN{i}": synthetic_history(f"SYN{i}", args.years, i) for i in range(args.tickers)}
+    else:
+        raw = {p.stem: read_stock_csv(p.stem) for p in sorted(Path(DATA_DIR).glob("*.csv"))[:args.tickers]}
+    histories = {t: compute_indicators(df) for t, df in raw.items()}
+    # hors `streamlit run` : pas d'avertissement « missing ScriptRunContext » à chaque graphique
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+    rows = []
+    for name, kind, fraction, data in dashboard_charts(histories):
+        method = "minmax" if kind == "bar" else "lttb"
+        t0 = time.perf_counter()
+        small = downsample_frame(data, target_points(fraction), method)
+        downsample_ms = (time.perf_counter() - t0) * 1000
+        rows.append({
+            "chart": name,
+            "method": method,
+            "points_before": data.size,
+            "points_after": small.size,
+            "kb_before": arrow_payload_bytes(data) / 1024,
+            "kb_after": arrow_payload_bytes(small) / 1024,
+            "render_ms_before": time_render(kind, data, args.repeat) * 1000,
+            "render_ms_after": time_render(kind, small, args.repeat) * 1000 + downsample_ms,
+        })
+
+    table = pd.DataFrame(rows).set_index("chart")
+    print(f"{len(histories)} ticker(s), {len(next(iter(histories.values())))} séances par ticker\n")
+    print(table.round(1).to_string())
+    total = table[["kb_before", "kb_after", "render_ms_before", "render_ms_after"]].sum()
+    print(f"\nTotal : {total['kb_before']:.0f} Ko → {total['kb_after']:.0f} Ko, "
+          f"{total['render_ms_before']:.0f} ms → {total['render_ms_after']:.0f} ms "
+          "(temps après = sous-échantillonnage + rendu)")
@@ -0,0 +1,153 @@
+"""
+Benchmark de app/drift_detect sur des données synthétiques (10M lignes par défaut).
+
+    python benchmarks/drift_benchmark.py
+    python benchmarks/drift_benchmark.py --rows 2000000 --csv   # inclut la lecture CSV par morceaux
+
+Mesure le temps des statistiques en flux (histogrammes) et compare KS /
+Wasserstein aux valeurs exactes calculées sur les échantillons triés.
+Vérifie aussi ks_pvalue contre scipy.stats.ks_2samp (si scipy est installé).
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.drift_detect import (  # noqa: E402
+    CHUNK_SIZE,
+    StreamingHistogram,
+    _Reservoir,
+    compare_histograms,
+    detect_drift,
+    ks_pvalue,
+    quantile_edges,
+)
+
+
+def exact_ks_wasserstein(a: np.ndarray, b: np.ndarray):
+    """KS et Wasserstein-1 exacts (fonctions de répartition empiriques sur l'union triée)."""
+    a, b = np.sort(a), np.sort(b)
+    points = np.concatenate([a, b])
+    points.sort(kind="mergesort")
+    cdf_a = np.searchsorted(a, points, side="right") / len(a)
+    cdf_b = np.searchsorted(b, points, side="right") / len(b)
+    gap = np.abs(cdf_a - cdf_b)
+    return float(gap.max()), float(np.sum(gap[:-1] * np.diff(points)))
+
+
+def check_ks_pvalue(tolerance: float = 0.02) -> bool:
+    """
+    Compare ks_pvalue à scipy (ks_2samp asymptotique) sur des échantillons
+    identiques, proches et décalés, et à kstwobign pour les petites valeurs
+    de lambda (série de Kolmogorov lente à converger).
+    """
+    try:
+        from scipy.stats import ks_2samp, kstwobign
+    except ImportError:
+        print("scipy absent : vérification de ks_pvalue ignorée")
+        return True
+
+    rng = np.random.default_rng(1)
+    failures = []
+    for lam in [0.001, 0.00101, 0.002, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 1.5]:
+        # n = m = 2 * en^2 avec en grand : lambda ~ en * statistic
+        n = 2_000_000
+        en = np.sqrt(n / 2)
+        statistic = lam / (en + 0.12 + 0.11 / en)
+        ours, expected = ks_pvalue(statistic, n, n), float(kstwobign.sf(lam))
+        if abs(ours - expected) > tolerance:
+            failures.append(f"lambda={lam}: {ours:.4f} au lieu de {expected:.4f}")
+
+    base = rng.normal(0, 1, 5_000)
+    samples = {
+        "identiques": (base, base.copy()),
+        "même loi": (base, rng.normal(0, 1, 5_000)),
+        "décalage 0.05": (base, rng.normal(0.05, 1, 5_000)),
+        "décalage 0.5": (base, rng.normal(0.5, 1, 5_000)),
+    }
+    for name, (a, b) in samples.items():
+        result = ks_2samp(a, b, method="asymp")
+        ours = ks_pvalue(float(result.statistic), len(a), len(b))
+        if abs(ours - float(result.pvalue)) > tolerance:
+            failures.append(f"{name}: {ours:.4f} au lieu de {float(result.pvalue):.4f}")
+
+    for failure in failures:
+        print(f"  ks_pvalue ÉCART {failure}")
+    print(f"ks_pvalue vs scipy : {'OK' if not failures else f'{len(failures)} écart(s)'}\n")
+    return not failures
+
+
+def streaming_stats(reference: np.ndarray, production: np.ndarray, chunksize: int):
+    reservoir = _Reservoir(200_000)
+    for i in range(0, len(reference), chunksize):
+        reservoir.add(reference[i:i + chunksize])
+    ref_hist = StreamingHistogram(quantile_edges(reservoir.values))
+    prod_hist = StreamingHistogram(ref_hist.edges)
+    for i in range(0, len(reference), chunksize):
+        ref_hist.add(reference[i:i + chunksize])
+    for i in range(0, len(production), chunksize):
+        prod_hist.add(production[i:i + chunksize])
+    return compare_histograms(ref_hist, prod_hist)
+
+
+def _peak_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform != "darwin" else peak / 1024 ** 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la détection de drift.")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--csv", action="store_true", help="Écrit les CSV et mesure detect_drift de bout en bout")
+    args = parser.parse_args()
+
+    if not check_ks_pvalue():
+        sys.exit(1)
+
+    rng = np.random.default_rng(0)
+    scenarios = {
+        "aucun drift": (rng.lognormal(4, 0.5, args.rows), rng.lognormal(4, 0.5, args.rows)),
+        "décalage +2%": (rng.lognormal(4, 0.5, args.rows), rng.lognormal(4.02, 0.5, args.rows)),
+        "hors plage": (rng.normal(100, 5, args.rows), rng.normal(140, 5, args.rows)),
+    }
+
+    print(f"{args.rows:,} lignes par échantillon, morceaux de {args.chunksize:,}\n")
+    for name, (ref, prod) in scenarios.items():
+        t0 = time.perf_counter()
+        stats = streaming_stats(ref, prod, args.chunksize)
+        streaming_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        ks, w1 = exact_ks_wasserstein(ref, prod)
+        exact_s = time.perf_counter() - t0
+
+        print(f"[{name}]")
+        print(f"  flux   : {streaming_s:6.2f}s  KS={stats['statistic']:.4f}  W1={stats['wasserstein']:.4f}  "
+              f"PSI={stats['psi']:.4f}  p={stats['p_value']}")
+        print(f"  exact  : {exact_s:6.2f}s  KS={ks:.4f}  W1={w1:.4f}")
+
+    if args.csv:
+        ref, prod = scenarios["décalage +2%"]
+        with tempfile.TemporaryDirectory() as tmp:
+            ref_path, prod_path = os.path.join(tmp, "reference.csv"), os.path.join(tmp, "production.csv")
+            print("\nÉcriture des CSV...")
+            pd.DataFrame({"Close": ref, "Volume": ref * 1e4}).to_csv(ref_path, index=False)
+            pd.DataFrame({"Close": prod, "Volume": prod * 1e4}).to_csv(prod_path, index=False)
+            size_mb = (os.path.getsize(ref_path) + os.path.getsize(prod_path)) / 1024 ** 2
+            del ref, prod, scenarios
+
+            t0 = time.perf_counter()
+            results = detect_drift(ref_path, prod_path, chunksize=args.chunksize)
+            print(f"detect_drift sur {size_mb:.0f} Mo de CSV : {time.perf_counter() - t0:.2f}s")
+            for feature, r in results.items():
+                print(f"  {feature}: drift={r['drift_detected']} KS={r['statistic']} PSI={r['psi']}")
+
+    print(f"\nPic mémoire du processus : {_peak_mb():.0f} Mo")
@@ -0,0 +1,219 @@
+"""
+Temps de chaque étape d'une analyse complète, hors réseau externe par défaut.
+
+    python benchmarks/e2e_benchmark.py AAPL MSFT --runs 5
+    python benchmarks/e2e_benchmark.py --backend local-server      # client Groq + serveur local
+    python benchmarks/e2e_benchmark.py --api-url http://localhost:8000
+
+Étapes (même enchaînement que le tableau de bord) : chargement du CSV,
+indicateurs, résumé + prompt, features /predict, puis en parallèle les deux
+agents (1er fragment et total) et /predict. « visible » = temps de bout en bout
+vu par l'utilisateur. L'API est appelée dans le processus (TestClient, modèle
+de model/) sauf si --api-url est donné. Cache des agents désactivé par défaut.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Décomposition par étape de la latence d'une analyse.")
+    parser.add_argument("tickers", nargs="*", help="Tickers (défaut : tous les CSV de data/stocks)")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--runs", type=int, default=3, help="Analyses par ticker")
+    parser.add_argument("--backend", choices=["local", "local-server", "groq"], default="local")
+    parser.add_argument("--llm-port", type=int, default=8100, help="Port du serveur local (local-server)")
+    parser.add_argument("--first-token-seconds", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--real-search", action="store_true", help="DuckDuckGo réel (sinon backend simulé)")
+    parser.add_argument("--with-cache", action="store_true", help="Garde le cache des réponses des agents")
+    parser.add_argument("--api-url", help="API de prédiction déjà lancée (sinon appelée dans le processus)")
+    parser.add_argument("--csv", help="Écrit aussi les mesures brutes dans ce fichier")
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    """Variables lues à l'import des modules : à fixer avant les imports ci-dessous."""
+    os.environ["LLM_BACKEND"] = args.backend
+    os.environ["LOCAL_LLM_FIRST_TOKEN_SECONDS"] = str(args.first_token_seconds)
+    os.environ["LOCAL_LLM_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+    os.environ["LOCAL_LLM_PROMPT_TOKENS_PER_SECOND"] = str(args.prompt_tokens_per_second)
+    os.environ["LOCAL_LLM_URL"] = f"http://127.0.0.1:{args.llm_port}"
+    if not args.real_search:
+        os.environ.setdefault("SEARCH_BACKEND", "fake")
+    if not args.with_cache:
+        os.environ["LLM_CACHE_DISABLED"] = "1"
+    if not args.api_url:
+        # journal des prédictions de l'API dans le processus : hors du répertoire de travail
+        os.environ.setdefault("PREDICTION_LOG_DIR", tempfile.mkdtemp(prefix="e2e_prediction_log_"))
+
+
+def start_local_server(port: int):
+    import httpx
+    import uvicorn
+
+    from local_llm import create_server_app, local_delays
+
+    server = uvicorn.Server(uvicorn.Config(create_server_app(**local_delays()), host="127.0.0.1",
+                                           port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/openai/v1/models", timeout=0.5)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Serveur local injoignable sur le port {port}")
+
+
+class Predictor:
+    """POST /predict sur une API lancée (--api-url) ou dans le processus (TestClient)."""
+
+    def __init__(self, api_url: str = None):
+        self._client = None
+        if api_url:
+            import requests
+
+            session = requests.Session()
+            self._post = lambda payload: session.post(f"{api_url}/predict", json=payload, timeout=10)
+        else:
+            from fastapi.testclient import TestClient
+
+            from app.main import app
+
+            self._client = TestClient(app)
+            self._client.__enter__()  # lifespan : chargement du modèle
+            self._post = lambda payload: self._client.post("/predict", json=payload)
+
+    def __call__(self, payload: dict) -> dict:
+        response = self._post(payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"/predict : {response.status_code} {response.text[:200]}")
+        return response.json()
+
+    def close(self):
+        if self._client is not None:
+            self._client.__exit__(None, None, None)
+
+
+def timed_stream(stream_factory):
+    """Consomme un StreamingRun ; renvoie (1er fragment, total) mesurés par le run."""
+    run = stream_factory()
+    for _ in run:
+        pass
+    return run.first_token_seconds, run.total_seconds
+
+
+def analyse_once(ticker: str, start, end, predictor) -> dict:
+    from analysis_stock_data import compute_indicators, read_stock_csv, slice_by_dates, summarize_stock, technical_score
+    from app.features import WARMUP_ROWS, latest_feature_payload
+    from financial_agent import financial_agent, submit_tasks, iter_task_results, web_news_agent
+    from llm_cache import NEWS_TTL, QUANT_TTL, cached_stream
+    from prompt_budget import build_news_prompt, build_quant_prompt
+
+    times = {}
+    t_start = time.perf_counter()
+
+    t0 = time.perf_counter()
+    raw = read_stock_csv(ticker)
+    times["load"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    df = slice_by_dates(compute_indicators(raw), start, end)
+    times["indicators"] = time.perf_counter() - t0
+    if df.empty:
+        raise ValueError(f"{ticker} : pas de données sur la période")
+
+    t0 = time.perf_counter()
+    summary = summarize_stock(df)
+    summary["technical_score"] = technical_score(df)
+    price_prompt, times["prompt_tokens"] = build_quant_prompt(ticker, summary, df, agent=financial_agent)
+    news_prompt, _ = build_news_prompt(ticker, agent=web_news_agent)
+    times["summary"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    history = slice_by_dates(raw, None, df["Date"].iloc[-1])
+    payload = latest_feature_payload(history.tail(WARMUP_ROWS))
+    times["features"] = time.perf_counter() - t0
+
+    tasks = {
+        "quant": lambda: timed_stream(lambda: cached_stream(financial_agent, price_prompt, ttl=QUANT_TTL)),
+        "news": lambda: timed_stream(lambda: cached_stream(web_news_agent, news_prompt, ttl=NEWS_TTL)),
+    }
+    if predictor is not None:
+        tasks["predict"] = lambda: predictor(payload)
+
+    t0 = time.perf_counter()
+    for result in iter_task_results(submit_tasks(tasks), {}):
+        if result.error is not None:
+            raise RuntimeError(f"{result.name} : {result.error}")
+        if result.name == "predict":
+            times["predict"] = result.seconds
+        else:
+            times[f"{result.name}_first_token"], times[result.name] = result.value
+    times["parallel_wait"] = time.perf_counter() - t0
+    times["visible"] = time.perf_counter() - t_start
+    return times
+
+
+def report(rows: pd.DataFrame):
+    stages = ["load", "indicators", "summary", "features", "quant_first_token", "quant",
+              "news_first_token", "news", "predict", "parallel_wait", "visible"]
+    stages = [s for s in stages if s in rows.columns]
+    table = pd.DataFrame({
+        "mean_ms": rows[stages].mean() * 1000,
+        "p50_ms": rows[stages].median() * 1000,
+        "p95_ms": rows[stages].quantile(0.95) * 1000,
+    })
+    # part du temps visible : étapes séquentielles + attente parallèle
+    sequential = ["load", "indicators", "summary", "features", "parallel_wait"]
+    table["share_visible"] = np.nan
+    for stage in sequential:
+        table.loc[stage, "share_visible"] = rows[stage].sum() / rows["visible"].sum()
+    print(table.round(3).to_string())
+    slowest = rows[["quant", "news"] + (["predict"] if "predict" in rows else [])].mean().idxmax()
+    print(f"\nÉtape parallèle la plus lente (chemin critique) : {slowest}")
+    print(f"Tokens de prompt (analyse quantitative) : {rows['prompt_tokens'].mean():.0f}")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_environment(args)
+    if args.backend == "local-server":
+        start_local_server(args.llm_port)
+
+    from analysis_stock_data import DATA_DIR  # noqa: E402
+
+    tickers = args.tickers or [p.stem for p in sorted(Path(DATA_DIR).glob("*.csv"))]
+    try:
+        predictor = Predictor(args.api_url)
+    except Exception as e:
+        print(f"/predict ignoré : {type(e).__name__}: {e}")
+        predictor = None
+
+    rows = []
+    try:
+        for run in range(args.runs):
+            for ticker in tickers:
+                times = analyse_once(ticker, args.start, args.end, predictor)
+                rows.append({"ticker": ticker, "run": run, **times})
+    finally:
+        if predictor is not None:
+            predictor.close()
+
+    results = pd.DataFrame(rows)
+    print(f"\nBackend : {args.backend} · {len(tickers)} ticker(s) × {args.runs} analyse(s)\n")
+    report(results)
+    if args.csv:
+        results.to_csv(args.csv, index=False)
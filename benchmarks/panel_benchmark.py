@@ -0,0 +1,104 @@
+"""
+Pages de comparaison : ancien chemin (concat en format long + pivot par
+série) contre le panel aligné (panel.py), sur N tickers synthétiques.
+
+    python benchmarks/panel_benchmark.py --tickers 150 --days 5000
+
+Mesure, pour une sélection : construction, performance normalisée, volumes,
+matrice de corrélation et corrélation glissante (le panel seulement pour ces
+deux dernières ; pandas .corr / .rolling().corr() en référence).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from panel import PricePanel  # noqa: E402
+
+
+def synthetic_frames(n_tickers: int, days: int, seed: int = 0) -> dict:
+    """Historiques de longueurs différentes avec quelques séances manquantes."""
+    rng = np.random.default_rng(seed)
+    all_dates = pd.bdate_range("2000-01-01", periods=days)
+    frames = {}
+    for i in range(n_tickers):
+        dates = all_dates[rng.integers(0, days // 4):]
+        dates = dates[rng.random(len(dates)) > 0.01]
+        close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, len(dates))))
+        frames[f"T{i:03d}"] = pd.DataFrame({"Date": dates, "Close": close,
+                                            "Volume": rng.lognormal(14, 0.5, len(dates))})
+    return frames
+
+
+def legacy_path(frames: dict):
+    """Chemin d'origine de show_comparison_page (concat long + pivot)."""
+    volumes = pd.concat([df[["Date", "Volume"]].assign(Ticker=t) for t, df in frames.items()],
+                        ignore_index=True)
+    vol_pivot = volumes.pivot(index="Date", columns="Ticker", values="Volume")
+    perf_list = []
+    for t, df in frames.items():
+        df_loc = df[["Date", "Close"]].copy()
+        df_loc["Close_norm"] = df_loc["Close"] / df_loc["Close"].iloc[0] - 1
+        df_loc["Ticker"] = t
+        perf_list.append(df_loc[["Date", "Ticker", "Close_norm"]])
+    perf = pd.concat(perf_list, ignore_index=True)
+    perf_pivot = perf.pivot(index="Date", columns="Ticker", values="Close_norm") * 100
+    return vol_pivot, perf_pivot
+
+
+def timed(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times)) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Panel aligné contre concat / pivot.")
+    parser.add_argument("--tickers", type=int, default=150)
+    parser.add_argument("--days", type=int, default=5000)
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = synthetic_frames(args.tickers, args.days)
+    panel = PricePanel.from_frames(frames)
+    close = panel.frame(panel.close)
+    returns = close / close.shift(1) - 1
+    reference = panel.tickers[0]
+
+    rows = {
+        "concat + pivot (volume, perf.)": timed(lambda: legacy_path(frames), args.repeat),
+        "panel : construction": timed(lambda: PricePanel.from_frames(frames), args.repeat),
+        "panel : perf. + volume": timed(lambda: (panel.frame(panel.normalized_performance()),
+                                                 panel.frame(panel.volume)), args.repeat),
+        "panel : corrélation": timed(panel.correlation, args.repeat),
+        "pandas : corrélation": timed(lambda: returns.corr(min_periods=20), args.repeat),
+        "panel : covariance": timed(panel.covariance, args.repeat),
+        "panel : corrélation glissante": timed(lambda: panel.rolling_correlation(reference, args.window),
+                                               args.repeat),
+        "pandas : corrélation glissante": timed(
+            lambda: returns.drop(columns=[reference]).rolling(args.window, min_periods=args.window // 2)
+            .corr(returns[reference]), args.repeat),
+        "panel : résumé par ticker": timed(panel.summary, args.repeat),
+    }
+    print(f"{args.tickers} tickers, {len(panel.dates)} dates (union)\n")
+    print(pd.Series(rows, name="ms (médiane)").round(1).to_string())
+
+    corr_gap = np.nanmax(np.abs(panel.correlation().to_numpy() - returns.corr(min_periods=20).to_numpy()))
+    print(f"\nÉcart max. avec pandas (corrélation) : {corr_gap:.1e}")
+
+    rolling_panel = panel.rolling_correlation(reference, args.window).to_numpy()
+    rolling_pandas = (returns.drop(columns=[reference]).rolling(args.window, min_periods=args.window // 2)
+                      .corr(returns[reference]).to_numpy())
+    rolling_gap = np.nanmax(np.abs(rolling_panel - rolling_pandas))
+    head_gap = np.nanmax(np.abs(rolling_panel[:args.window - 1] - rolling_pandas[:args.window - 1]))
+    print(f"Écart max. avec pandas (corrélation glissante) : {rolling_gap:.1e} "
+          f"(fenêtres partielles du début : {head_gap:.1e})")
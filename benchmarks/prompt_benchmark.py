@@ -0,0 +1,103 @@
+"""
+Benchmark des modes de prompt de l'analyse quantitative (prompt_budget.py)
+contre l'agent local de substitution (local_llm.py), sans appel réseau.
+
+    python benchmarks/prompt_benchmark.py
+    python benchmarks/prompt_benchmark.py AAPL MSFT --prompt-token-delay 0.002
+
+Pour chaque mode : tokens du prompt (consignes de l'agent comprises), tokens
+de la réponse, temps jusqu'au 1er fragment et temps total. Les modes compacts
+utilisent aussi les consignes courtes de l'agent (COMPACT_ROLE /
+COMPACT_INSTRUCTIONS). Le délai du modèle local croît avec le nombre de tokens
+envoyés (--prompt-token-delay).
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from analysis_stock_data import DATA_DIR, get_stock_with_indicators  # noqa: E402
+from financial_agent import FINANCIAL_INSTRUCTIONS, FINANCIAL_ROLE, financial_agent  # noqa: E402
+from local_llm import LocalStandInAgent  # noqa: E402
+from prompt_budget import (  # noqa: E402
+    COMPACT_INSTRUCTIONS,
+    COMPACT_ROLE,
+    PromptBudgetExceeded,
+    agent_overhead_tokens,
+    build_quant_prompt,
+    count_tokens,
+)
+
+MODES = {
+    "full": dict(mode="full"),
+    "compact": dict(mode="compact", precision=2, indicators=True),
+    "compact_no_ind": dict(mode="compact", precision=2, indicators=False),
+    "compact_p0": dict(mode="compact", precision=0, indicators=False),
+}
+
+
+def run_once(agent, prompt: str):
+    t0 = time.perf_counter()
+    first, parts = None, []
+    for chunk in agent.run(prompt, stream=True):
+        if first is None:
+            first = time.perf_counter() - t0
+        parts.append(chunk.content)
+    return first, time.perf_counter() - t0, count_tokens("".join(parts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tokens et latence par mode de prompt (modèle local).")
+    parser.add_argument("tickers", nargs="*", help=f"Tickers (défaut : tous les CSV de {DATA_DIR})")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--budget", type=int, default=None,
+                        help="Budget de tokens du mode compact_budget (défaut : consignes + 90)")
+    parser.add_argument("--first-token-delay", type=float, default=0.05)
+    parser.add_argument("--prompt-token-delay", type=float, default=0.001, help="Délai par token envoyé (s)")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="Délai par mot généré (s)")
+    args = parser.parse_args()
+
+    tickers = args.tickers or [p.stem for p in sorted(Path(DATA_DIR).glob("*.csv"))]
+    delays = dict(first_token_delay=args.first_token_delay, token_delay=args.token_delay,
+                  prompt_token_delay=args.prompt_token_delay)
+    # même rôle / instructions que financial_agent dans chaque mode
+    agents = {
+        "full": LocalStandInAgent(financial_agent.name, FINANCIAL_ROLE, FINANCIAL_INSTRUCTIONS, **delays),
+        "compact": LocalStandInAgent(financial_agent.name, COMPACT_ROLE, COMPACT_INSTRUCTIONS, **delays),
+    }
+    modes = dict(MODES)
+    modes["compact_budget"] = dict(mode="compact", precision=2, indicators=True,
+                                   budget=args.budget or agent_overhead_tokens(agents["compact"]) + 90)
+
+    rows = []
+    for ticker in tickers:
+        df, summary = get_stock_with_indicators(ticker, args.start, args.end, warmup=True)
+        if not summary:
+            print(f"{ticker} : pas de données sur la période, ignoré")
+            continue
+        for name, options in modes.items():
+            agent = agents[options["mode"]]
+            overhead = agent_overhead_tokens(agent)
+            try:
+                prompt, prompt_tokens = build_quant_prompt(ticker, summary, df, agent=agent, **options)
+            except PromptBudgetExceeded as e:
+                print(f"{ticker} / {name} : {e}")
+                continue
+            first, total, response_tokens = run_once(agent, prompt)
+            rows.append({"ticker": ticker, "mode": name, "prompt_tokens": prompt_tokens,
+                         "system_tokens": overhead, "response_tokens": response_tokens,
+                         "first_token_s": first, "total_s": total})
+
+    results = pd.DataFrame(rows)
+    table = results.groupby("mode", sort=False)[
+        ["prompt_tokens", "system_tokens", "response_tokens", "first_token_s", "total_s"]
+    ].mean()
+    table["prompt_vs_full"] = table["prompt_tokens"] / table.loc["full", "prompt_tokens"]
+    print(f"\nMoyennes sur {len(tickers)} ticker(s) (system_tokens = rôle + instructions de l'agent) :\n")
+    print(table.round(3).to_string())
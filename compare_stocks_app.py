@@ -3,7 +3,10 @@ from pathlib import Path
 from datetime import datetime
 import pandas as pd
 
-from analysis_stock_data import get_stock_with_indicators
+from analysis_stock_data import load_data_with_indicators, slice_by_dates
+from downsample import ChartRecorder
+from panel import PricePanel, load_panel
+from prediction_client import feature_payloads, get_prediction_client, predictions_frame
 
 
 
@@ -18,6 +21,35 @@ def parse_date_or_none(s: str):
         return None
 
 
+@st.cache_data(show_spinner=False, max_entries=8)
+def _export_csv(tickers: tuple, start_date, end_date) -> bytes:
+    """Historique + indicateurs de chaque ticker sur la période (CSV long, colonne Ticker)."""
+    frames = [slice_by_dates(load_data_with_indicators(t), start_date, end_date).assign(Ticker=t)
+              for t in tickers]
+    return pd.concat(frames, ignore_index=True).to_csv(index=False).encode("utf-8")
+
+
+def render_correlation_section(panel: PricePanel, charts: ChartRecorder, key: str):
+    """Matrice de corrélation / covariance des rendements et corrélation glissante à une référence."""
+    if len(panel.tickers) < 2:
+        return
+    st.subheader("🔗 Corrélation des rendements quotidiens")
+    kind = st.radio("Matrice", ["Corrélation", "Covariance annualisée"], horizontal=True,
+                    key=f"{key}_matrix")
+    if kind == "Corrélation":
+        st.dataframe(panel.correlation().round(2), use_container_width=True)
+    else:
+        st.dataframe(panel.covariance().round(4), use_container_width=True)
+
+    col_ref, col_window = st.columns(2)
+    with col_ref:
+        reference = st.selectbox("Référence", panel.tickers, key=f"{key}_reference")
+    with col_window:
+        window = st.slider("Fenêtre (séances)", 20, 250, 60, step=10, key=f"{key}_window")
+    st.caption(f"Corrélation glissante ({window} séances) des rendements avec {reference}")
+    charts.line(panel.rolling_correlation(reference, window), 1.0, "Corrélation glissante")
+
+
 def show_comparison_page():
     st.title("📊 Side‑by‑Side Stock Comparison")
 
@@ -50,61 +82,38 @@ def show_comparison_page():
         st.error("Dates invalides. Utilise le format YYYY-MM-DD.")
         return
 
-    data_dict = {}
-    for t in selected:
-        df, _ = get_stock_with_indicators(t, start_date=start_input, end_date=end_input)
-        if df.empty:
-            st.warning(f"⚠️ Données insuffisantes pour {t} (ignoré).")
-            continue
-        df = df.rename(columns={"Date": "Date", "Close": "Close", "Volume": "Volume"})
-        df = df.sort_values("Date")
-        df["Ticker"] = t
-        data_dict[t] = df
-
-    if not data_dict:
+    # Séries de la sélection alignées par date, construites une fois par (sélection, période)
+    panel = load_panel(tuple(selected), start_input, end_input)
+    for t in panel.missing:
+        st.warning(f"⚠️ Données insuffisantes pour {t} (ignoré).")
+
+    if panel.empty:
         st.error("Aucune donnée disponible pour les tickers sélectionnés.")
         return
 
     st.subheader("Side‑by‑Side Comparison")
-    cols = st.columns(len(data_dict))
-    for col, (t, df) in zip(cols, data_dict.items()):
-        with col:
-            st.markdown(f"### {t}")
-            st.json(df.head(3).to_dict(orient="records"))
+    st.dataframe(panel.summary(), use_container_width=True)
 
     st.subheader("Stock Trading Volume Comparison")
-    volumes = pd.concat(
-        [df[["Date", "Volume"]].assign(Ticker=t) for t, df in data_dict.items()],
-        ignore_index=True,
-    )
-    vol_pivot = volumes.pivot(index="Date", columns="Ticker", values="Volume")
-    st.bar_chart(vol_pivot)
+    charts = ChartRecorder()
+    charts.bar(panel.frame(panel.volume), 1.0, "Volume")
 
     st.subheader("Normalized Price Performance (%)")
-    perf_list = []
-    for t, df in data_dict.items():
-        df_loc = df[["Date", "Close"]].copy()
-        if df_loc["Close"].iloc[0] == 0:
-            continue
-        df_loc["Close_norm"] = df_loc["Close"] / df_loc["Close"].iloc[0] - 1
-        df_loc["Ticker"] = t
-        perf_list.append(df_loc[["Date", "Ticker", "Close_norm"]])
-
-    if not perf_list:
-        st.warning("Impossible de calculer la performance normalisée.")
-        return
+    charts.line(panel.frame(panel.normalized_performance()), 1.0, "Performance normalisée")
 
-    perf = pd.concat(perf_list, ignore_index=True)
-    perf_pivot = perf.pivot(index="Date", columns="Ticker", values="Close_norm") * 100
-    st.line_chart(perf_pivot)
-    st.markdown("### 📥 Export des données comparées")
+    render_correlation_section(panel, charts, key="compare_page")
 
-    all_concat = pd.concat(data_dict.values(), ignore_index=True)
-    csv_bytes = all_concat.to_csv(index=False).encode("utf-8")
+    st.subheader("🔮 Model Predictions")
+    # un seul aller-retour /predict/batch pour tous les tickers affichés
+    predictions = get_prediction_client().predict_many(feature_payloads(panel.last_dates()))
+    st.dataframe(predictions_frame(predictions), use_container_width=True, hide_index=True)
+
+    charts.show_report()
+    st.markdown("### 📥 Export des données comparées")
 
     st.download_button(
         "Télécharger les données multi‑actions (CSV)",
-        data=csv_bytes,
+        data=_export_csv(tuple(panel.tickers), start_input, end_input),
         file_name="comparaison_stocks.csv",
         mime="text/csv",
         use_container_width=True,
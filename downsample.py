@@ -0,0 +1,180 @@
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------------------
+# Sous-échantillonnage des séries avant affichage
+# ---------------------------------------------------------------------
+# Un graphique de quelques centaines de pixels n'a pas besoin de 10 000
+# points quotidiens. Deux méthodes qui préservent l'allure de la courbe :
+# - "lttb"   : Largest-Triangle-Three-Buckets (courbes : prix, MA, RSI, perf.)
+# - "minmax" : minimum et maximum de chaque intervalle (barres : volume,
+#              aucun pic perdu)
+# Nombre de points cible = largeur estimée du graphique en pixels
+# (CHART_PIXEL_WIDTH pour la pleine largeur, multipliée par la fraction de
+# page occupée). CHART_DOWNSAMPLE=off désactive le sous-échantillonnage.
+
+CHART_DOWNSAMPLE = os.getenv("CHART_DOWNSAMPLE", "lttb")
+CHART_PIXEL_WIDTH = int(os.getenv("CHART_PIXEL_WIDTH", "1200"))
+CHART_STATS = os.getenv("CHART_STATS", "").lower() in ("1", "true", "yes")
+
+
+def target_points(width_fraction: float = 1.0) -> int:
+    """Un point par pixel de largeur du graphique."""
+    return max(int(CHART_PIXEL_WIDTH * width_fraction), 10)
+
+
+def lttb_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices des n_out points retenus par LTTB (abscisses = positions, les
+    séances étant régulièrement espacées). Le premier et le dernier point
+    sont toujours conservés.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=np.float64)
+    # n_out - 2 intervalles entre le premier et le dernier point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    cum_y = np.concatenate([[0.0], np.cumsum(y)])
+    counts = np.diff(edges)
+    mean_x = (edges[:-1] + edges[1:] - 1) / 2.0
+    mean_y = (cum_y[edges[1:]] - cum_y[edges[:-1]]) / counts
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # point de référence : moyenne de l'intervalle suivant (ou dernier point)
+        if i + 1 < n_out - 2:
+            cx, cy = mean_x[i + 1], mean_y[i + 1]
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices du minimum et du maximum de n_out / 2 intervalles (+ extrémités)."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    buckets = n_out // 2
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    bucket = np.repeat(np.arange(buckets), np.diff(edges))
+
+    picked = [np.array([0, n - 1])]
+    for reduce in (np.minimum, np.maximum):
+        extreme = reduce.reduceat(y, starts)
+        candidates = np.flatnonzero(y == extreme[bucket])
+        _, first = np.unique(bucket[candidates], return_index=True)
+        picked.append(candidates[first])
+    return np.unique(np.concatenate(picked))
+
+
+def downsample_frame(df: pd.DataFrame, n_out: int, method: Optional[str] = None,
+                     columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Lignes de df à afficher : union des points retenus pour chaque colonne
+    (NaN ignorés), au plus ~n_out lignes au total.
+    """
+    method = method or CHART_DOWNSAMPLE
+    if method == "off" or len(df) <= n_out:
+        return df
+    select = {"lttb": lttb_indices, "minmax": minmax_indices}[method]
+
+    columns = columns or [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    if not columns:
+        return df
+    per_column = max(n_out // len(columns), 4)
+    keep = []
+    for col in columns:
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = np.flatnonzero(~np.isnan(values))
+        if len(valid):
+            keep.append(valid[select(values[valid], per_column)])
+    if not keep:
+        return df
+    return df.iloc[np.unique(np.concatenate(keep))]
+
+
+def arrow_payload_bytes(df: pd.DataFrame) -> int:
+    """Taille du DataFrame sérialisé en Arrow IPC (format envoyé au navigateur)."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().size
+
+
+# ---------------------------------------------------------------------
+# Graphiques Streamlit
+# ---------------------------------------------------------------------
+
+class ChartRecorder:
+    """
+    Trace les graphiques d'une exécution de page après sous-échantillonnage
+    et, si record_stats, relève points, taille Arrow et temps avant / après.
+    """
+
+    def __init__(self, record_stats: bool = CHART_STATS):
+        self.record_stats = record_stats
+        self.stats = []
+
+    def _draw(self, kind: str, data: pd.DataFrame, width_fraction: float, method: str, name: str):
+        import streamlit as st
+
+        t0 = time.perf_counter()
+        small = downsample_frame(data, target_points(width_fraction), method)
+        downsample_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        getattr(st, f"{kind}_chart")(small)
+        render_s = time.perf_counter() - t0
+
+        if self.record_stats:
+            self.stats.append({
+                "chart": name or kind,
+                "method": method if small is not data else "off",
+                "points_before": len(data) * data.shape[1],
+                "points_after": len(small) * small.shape[1],
+                "bytes_before": arrow_payload_bytes(data),
+                "bytes_after": arrow_payload_bytes(small),
+                "downsample_ms": round(downsample_s * 1000, 2),
+                "render_ms": round(render_s * 1000, 2),
+            })
+
+    def line(self, data: pd.DataFrame, width_fraction: float = 1.0, name: str = None):
+        self._draw("line", data, width_fraction, CHART_DOWNSAMPLE, name)
+
+    def bar(self, data: pd.DataFrame, width_fraction: float = 1.0, name: str = None):
+        # barres : min/max pour conserver les pics de volume
+        method = "off" if CHART_DOWNSAMPLE == "off" else "minmax"
+        self._draw("bar", data, width_fraction, method, name)
+
+    def report(self) -> pd.DataFrame:
+        return pd.DataFrame(self.stats)
+
+    def show_report(self):
+        """Tableau des mesures (CHART_STATS=1) dans un panneau repliable."""
+        if not self.stats:
+            return
+        import streamlit as st
+
+        with st.expander("⏱️ Graphiques : points envoyés au navigateur"):
+            report = self.report()
+            st.dataframe(report, use_container_width=True)
+            st.caption(f"{report['bytes_before'].sum() / 1e6:.2f} Mo → {report['bytes_after'].sum() / 1e6:.2f} Mo")
@@ -1,15 +1,30 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 from datetime import datetime
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple
 
 from phi.agent import Agent
 from phi.model.groq import Groq
-from phi.tools.duckduckgo import DuckDuckGo
 
 from analysis_stock_data import (
     get_stock_with_indicators,
     generate_text_summary,
 )
+from llm_cache import NEWS_TTL, QUANT_TTL, cached_run
+from local_llm import LOCAL_LLM_URL, local_agent
+from prompt_budget import (
+    COMPACT_INSTRUCTIONS,
+    COMPACT_ROLE,
+    PROMPT_MODE,
+    build_news_prompt,
+    build_quant_prompt,
+)
+from search_cache import CachedDuckDuckGo
 
 # ---------------------------------------------------------------------
 # Initialisation
@@ -17,16 +32,38 @@ from analysis_stock_data import (
 
 load_dotenv()
 
-groq_model = Groq(id="llama-3.1-8b-instant")
-print("ID du modèle Groq utilisé :", groq_model.id)
+# Backend des agents (LLM_BACKEND) :
+# - "groq"         : API Groq (production)
+# - "local"        : agents locaux déterministes, dans le processus (local_llm.py)
+# - "local-server" : client Groq vers le serveur local (python local_llm.py --serve)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+if LLM_BACKEND not in ("groq", "local", "local-server"):
+    raise ValueError(f"LLM_BACKEND inconnu : {LLM_BACKEND}")
+
+if LLM_BACKEND == "local-server":
+    groq_model = Groq(id="llama-3.1-8b-instant", base_url=LOCAL_LLM_URL, api_key="local")
+else:
+    groq_model = Groq(id="llama-3.1-8b-instant")
+print(f"Backend des agents : {LLM_BACKEND} (modèle {'local-stand-in' if LLM_BACKEND == 'local' else groq_model.id})")
+
+# Recherches mises en cache (TTL courte, URL dédoublonnées, requêtes simultanées regroupées)
+duck_tool = CachedDuckDuckGo(fixed_max_results=3)
 
-duck_tool = DuckDuckGo(fixed_max_results=3)
+AGENT_TIMEOUT = float(os.getenv("AGENT_TIMEOUT_SECONDS", "60"))
+PREDICT_TIMEOUT = float(os.getenv("PREDICT_TIMEOUT_SECONDS", "10"))
+
+
+def make_agent(name: str, role: str, instructions: list, **agent_kwargs):
+    """Agent phi sur groq_model, ou agent local (mêmes nom / rôle / instructions)."""
+    if LLM_BACKEND == "local":
+        return local_agent(name, role, instructions)
+    return Agent(name=name, role=role, model=groq_model, instructions=instructions, **agent_kwargs)
 
 # ---------------------------------------------------------------------
 # Fonctions utilitaires
 # ---------------------------------------------------------------------
 
-def get_base_summary(ticker: str, start_date=None, end_date=None):
+def get_base_summary(ticker: str, start_date=None, end_date=None, warmup: bool = False):
     """
     Charge les données + indicateurs et renvoie :
     - df_with_ind : DataFrame avec prix, volume, indicateurs
@@ -34,7 +71,7 @@ def get_base_summary(ticker: str, start_date=None, end_date=None):
     - summary_dict: résumé numérique pour l'agent
     """
     df_with_ind, summary_dict = get_stock_with_indicators(
-        ticker, start_date=start_date, end_date=end_date
+        ticker, start_date=start_date, end_date=end_date, warmup=warmup
     )
     
     if not summary_dict:
@@ -47,54 +84,72 @@ def get_base_summary(ticker: str, start_date=None, end_date=None):
 # Agent d'analyse quantitative (prix)
 # ---------------------------------------------------------------------
 
-financial_agent = Agent(
-    name="Financial Analysis Agent",
-    role=(
-        "Tu es un analyste financier. "
-        "Tu reçois un résumé quantitatif de l'évolution d'une action "
-        "et tu dois produire une analyse claire, structurée, en français, "
-        "avec : contexte, interprétation des chiffres, niveaux de risque, "
-        "et éventuellement des conseils prudents (pas de promesse de gains)."
-    ),
-    model=groq_model,
-    instructions=[
-        "Réponds en français.",
-        "Utilise le résumé fourni comme base, ne l'invente pas.",
-        "Explique simplement pour un débutant.",
-        "Structure ta réponse avec des paragraphes courts et éventuellement des listes.",
-    ],
-    markdown=True,
+FINANCIAL_ROLE = (
+    "Tu es un analyste financier. "
+    "Tu reçois un résumé quantitatif de l'évolution d'une action "
+    "et tu dois produire une analyse claire, structurée, en français, "
+    "avec : contexte, interprétation des chiffres, niveaux de risque, "
+    "et éventuellement des conseils prudents (pas de promesse de gains)."
 )
+FINANCIAL_INSTRUCTIONS = [
+    "Réponds en français.",
+    "Utilise le résumé fourni comme base, ne l'invente pas.",
+    "Explique simplement pour un débutant.",
+    "Structure ta réponse avec des paragraphes courts et éventuellement des listes.",
+]
+
+
+def new_financial_agent():
+    """
+    Nouvel agent d'analyse quantitative. Un Agent phi garde l'état de son
+    dernier appel (run_response, run_id, mémoire) : une instance par tâche
+    quand plusieurs analyses tournent en parallèle.
+    """
+    # Mode compact (PROMPT_MODE=compact) : consignes courtes, envoyées à chaque appel
+    return make_agent(
+        "Financial Analysis Agent",
+        COMPACT_ROLE if PROMPT_MODE == "compact" else FINANCIAL_ROLE,
+        COMPACT_INSTRUCTIONS if PROMPT_MODE == "compact" else FINANCIAL_INSTRUCTIONS,
+        markdown=True,
+    )
+
+
+financial_agent = new_financial_agent()
 
 # ---------------------------------------------------------------------
 # Agent d'actualités web (DuckDuckGo)
 # ---------------------------------------------------------------------
 
-web_news_agent = Agent(
-    name="Web News Agent",
-    role=(
-        "Tu es un analyste qui utilise un moteur de recherche (DuckDuckGo) "
-        "pour trouver des actualités financières récentes sur une entreprise cotée."
-    ),
-    model=groq_model,
-    tools=[duck_tool],
-    instructions=[
-        "Réponds en français.",
-        "Quand tu as besoin d'informations web, formule une requête claire pour DuckDuckGo.",
-        "Résume les 3 à 5 principales actualités financières ou boursières récentes.",
-        "Inclue, quand c'est possible, les titres des articles et les liens.",
-    ],
-    markdown=True,
-    show_tool_calls=False,
-)
+def new_web_news_agent():
+    """Nouvel agent d'actualités (une instance par tâche, voir new_financial_agent)."""
+    return make_agent(
+        "Web News Agent",
+        (
+            "Tu es un analyste qui utilise un moteur de recherche (DuckDuckGo) "
+            "pour trouver des actualités financières récentes sur une entreprise cotée."
+        ),
+        [
+            "Réponds en français.",
+            "Quand tu as besoin d'informations web, formule une requête claire pour DuckDuckGo.",
+            "Résume les 3 à 5 principales actualités financières ou boursières récentes.",
+            "Inclue, quand c'est possible, les titres des articles et les liens.",
+        ],
+        tools=[duck_tool],
+        markdown=True,
+        show_tool_calls=False,
+    )
+
+
+web_news_agent = new_web_news_agent()
 
 # ---------------------------------------------------------------------
 # Fonctions principales (utiles pour console + Streamlit)
 # ---------------------------------------------------------------------
 
-def run_quantitative_analysis(ticker: str, start_date=None, end_date=None):
+def run_quantitative_analysis(ticker: str, start_date=None, end_date=None, agent=None):
     """
-    Exécute l'analyse quantitative pour un ticker donné.
+    Exécute l'analyse quantitative pour un ticker donné
+    (agent : financial_agent par défaut).
     Retourne:
       - df_with_ind : DataFrame (pour les graphiques dans Streamlit)
       - quant_text  : texte de l'analyse généré par l'agent
@@ -103,83 +158,266 @@ def run_quantitative_analysis(ticker: str, start_date=None, end_date=None):
         ticker, start_date, end_date
     )
 
-    price_prompt = (
-        f"Voici un résumé quantitatif pour l'action {ticker} :\n\n"
-        f"{base_text}\n\n"
-        "À partir de ce résumé, rédige une analyse structurée :\n"
-        "- explique la tendance générale du cours sur la période,\n"
-        "- commente les niveaux minimum, maximum et le prix moyen,\n"
-        "- interprète la volatilité moyenne,\n"
-        "- donne quelques points de vigilance pour un investisseur prudent.\n"
-    )
+    agent = agent or financial_agent
+    price_prompt, _ = build_quant_prompt(ticker, summary_dict, df_with_ind,
+                                         agent=agent, base_text=base_text)
 
-    response = financial_agent.run(price_prompt)
+    response = cached_run(agent, price_prompt, ttl=QUANT_TTL)
     return df_with_ind, response.content
 
 
-def run_news_search(ticker: str):
+def run_news_search(ticker: str, agent=None):
     """
-    Recherche les actualités pour un ticker donné.
+    Recherche les actualités pour un ticker donné
+    (agent : web_news_agent par défaut).
     Retourne le texte de synthèse.
     """
-    today = datetime.today().strftime("%Y-%m-%d")
-
-    news_prompt = (
-        f"Tu dois rechercher des actualités financières récentes sur l'entreprise "
-        f"liée au ticker {ticker} en utilisant DuckDuckGo.\n\n"
-        "Concentre-toi sur les actualités les plus récentes, idéalement de la "
-        "semaine ou du mois en cours.\n"
-        "Donne une synthèse en français avec 3 à 5 points, et cite les titres "
-        "et liens des articles importants si possible.\n"
-    )
+    agent = agent or web_news_agent
+    news_prompt, _ = build_news_prompt(ticker, agent=agent)
 
-    response = web_news_agent.run(news_prompt)
+    response = cached_run(agent, news_prompt, ttl=NEWS_TTL)
     return response.content
 
 # ---------------------------------------------------------------------
-# Programme principal (mode console)
+# Rapports Markdown
 # ---------------------------------------------------------------------
 
-if __name__ == "__main__":
-    # Choisir le ticker
-    ticker = input("Ticker à analyser (ex: AAPL, MSFT, TSLA) : ").strip().upper() or "AAPL"
+REPORTS_DIR = Path("reports")
 
-    # Choisir la période (optionnelle)
-    start = input("Date début (YYYY-MM-DD, vide = tout) : ").strip() or None
-    end = input("Date fin   (YYYY-MM-DD, vide = tout) : ").strip() or None
-
-    # 1) Analyse Quantitative
-    print(f"\n--- Lancement de l'analyse quantitative pour {ticker} ---")
-    df_with_ind, quant_content = run_quantitative_analysis(ticker, start, end)
-    print(f"\n=== ANALYSE QUANTITATIVE POUR {ticker} ===\n")
-    print(quant_content)
-
-    # 2) Actualités web
-    print(f"\n--- Recherche d'actualités pour {ticker} ---")
-    news_content = run_news_search(ticker)
-    print(f"\n=== ACTUALITÉS FINANCIÈRES POUR {ticker} ===\n")
-    print(news_content)
-
-    # 3) Sauvegarder le rapport en Markdown
-    reports_dir = Path("reports")
-    reports_dir.mkdir(exist_ok=True)
 
+def report_path(ticker: str, start=None, end=None, reports_dir=REPORTS_DIR, day: str = None) -> Path:
+    """reports/<TICKER>_<jour>[_<début>][_<fin>].md"""
     period_str = ""
     if start:
         period_str += f"_{start}"
     if end:
         period_str += f"_{end}"
+    day = day or datetime.today().strftime("%Y-%m-%d")
+    return Path(reports_dir) / f"{ticker}_{day}{period_str}.md"
 
-    today_str = datetime.today().strftime("%Y-%m-%d")
-    report_path = reports_dir / f"{ticker}_{today_str}{period_str}.md"
 
-    with report_path.open("w", encoding="utf-8") as f:
-        f.write(f"# Rapport pour {ticker} ({today_str})\n\n")
+def write_report(path: Path, ticker: str, start, end, quant_content: str, news_content: str,
+                 day: str = None) -> Path:
+    """
+    Écrit le rapport dans un fichier temporaire puis le renomme : un rapport
+    présent sur disque est toujours complet (reprise après interruption).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    day = day or datetime.today().strftime("%Y-%m-%d")
+    tmp_path = path.with_name(path.name + ".tmp")
+
+    with tmp_path.open("w", encoding="utf-8") as f:
+        f.write(f"# Rapport pour {ticker} ({day})\n\n")
         if start or end:
             f.write(f"_Période analysée : {start or 'début'} → {end or 'fin'}._\n\n")
         f.write("## Analyse quantitative\n\n")
-        f.write(quant_content)
+        f.write(quant_content or "")
         f.write("\n\n## Actualités financières\n\n")
-        f.write(news_content)
+        f.write(news_content or "")
+    os.replace(tmp_path, path)
+    return path
+
+
+# ---------------------------------------------------------------------
+# Exécution concurrente (appels réseau indépendants)
+# ---------------------------------------------------------------------
+# Chaque analyse a son propre pool, dimensionné pour ses tâches : aucune
+# tâche n'attend derrière celles d'une autre session. Le pool est fermé avec
+# wait=False dès la soumission : une tâche qui dépasse son délai est abandonnée
+# sans bloquer l'appelant. Le délai court à partir du démarrage effectif de la
+# tâche, pas de sa soumission.
+
+STARTUP_POLL_SECONDS = 0.1  # attente max. tant qu'une tâche n'a pas démarré
+
+
+class TaskHandle:
+    """Future d'une tâche, instant de son démarrage et drapeau d'abandon."""
+
+    def __init__(self):
+        self.future = None
+        self.started = None  # time.perf_counter() au démarrage
+        self.cancelled = threading.Event()
+
+    def run(self, fn: Callable):
+        self.started = time.perf_counter()
+        return fn()
+
+    def deadline(self, timeout: float) -> float:
+        return self.started + timeout if self.started is not None else float("inf")
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started if self.started is not None else 0.0
+
+    def abandon(self):
+        """Délai dépassé : la tâche en attente est annulée, un flux en cours s'arrête au fragment suivant."""
+        self.cancelled.set()
+        self.future.cancel()
+
 
-    print(f"\nRapport sauvegardé dans : {report_path}")
+def _submit_all(jobs: Dict[str, Callable], handles: Dict[str, TaskHandle]) -> Dict[str, TaskHandle]:
+    pool = ThreadPoolExecutor(max_workers=max(len(jobs), 1), thread_name_prefix="agent-task")
+    try:
+        for name, fn in jobs.items():
+            handle = handles.setdefault(name, TaskHandle())
+            handle.future = pool.submit(handle.run, fn)
+    finally:
+        pool.shutdown(wait=False)
+    return handles
+
+
+def _timeout_error(name: str, timeouts: Dict[str, float]) -> TimeoutError:
+    limit = timeouts.get(name, AGENT_TIMEOUT)
+    return TimeoutError(f"{name} : délai de {limit:.0f}s dépassé")
+
+
+def _next_wait(handles: Dict[str, TaskHandle], pending, timeouts: Dict[str, float]) -> float:
+    """Attente jusqu'à la prochaine échéance (bornée tant qu'une tâche n'a pas démarré)."""
+    now = time.perf_counter()
+    remaining = min(handles[n].deadline(timeouts.get(n, AGENT_TIMEOUT)) for n in pending) - now
+    if any(handles[n].started is None for n in pending):
+        remaining = min(remaining, STARTUP_POLL_SECONDS)
+    return max(remaining, 0)
+
+
+class TaskResult(NamedTuple):
+    name: str
+    value: object
+    error: Exception
+    seconds: float
+
+
+def submit_tasks(tasks: Dict[str, Callable]) -> Dict[str, TaskHandle]:
+    """Lance immédiatement chaque tâche (nom -> fonction sans argument)."""
+    return _submit_all(tasks, {})
+
+
+def iter_task_results(handles: Dict[str, TaskHandle], timeouts: Dict[str, float]) -> Iterator[TaskResult]:
+    """
+    Renvoie les résultats dans l'ordre où ils se terminent. Une tâche qui
+    dépasse son délai (timeouts[name], AGENT_TIMEOUT par défaut) est rendue
+    avec une TimeoutError ; une exception levée par la tâche est rendue telle quelle.
+    """
+    pending = {handle.future: name for name, handle in handles.items()}
+
+    while pending:
+        done, _ = wait(list(pending), timeout=_next_wait(handles, pending.values(), timeouts),
+                       return_when=FIRST_COMPLETED)
+
+        for future in done:
+            name = pending.pop(future)
+            elapsed = handles[name].elapsed()
+            try:
+                yield TaskResult(name, future.result(), None, elapsed)
+            except Exception as e:
+                yield TaskResult(name, None, e, elapsed)
+
+        now = time.perf_counter()
+        for future, name in list(pending.items()):
+            if now >= handles[name].deadline(timeouts.get(name, AGENT_TIMEOUT)):
+                del pending[future]
+                handles[name].abandon()
+                yield TaskResult(name, None, _timeout_error(name, timeouts), handles[name].elapsed())
+
+
+class TaskEvent(NamedTuple):
+    name: str
+    kind: str  # "delta" (fragment de texte) ou "done" (fin de tâche)
+    value: object
+    error: Exception
+    seconds: float
+
+
+def _pump(name: str, fn: Callable[[], Iterable[str]], events: queue.Queue, cancelled: threading.Event):
+    stream = fn()
+    for delta in stream:
+        if cancelled.is_set():
+            break  # tâche abandonnée : plus personne ne lit la file
+        events.put((name, "delta", delta))
+    return stream
+
+
+def submit_streaming_tasks(streams: Dict[str, Callable[[], Iterable[str]]],
+                           tasks: Dict[str, Callable] = None):
+    """
+    Comme submit_tasks, mais les tâches de streams renvoient un itérable de
+    fragments de texte, relayés au fil de l'eau. Renvoie (handles, events).
+    """
+    events = queue.Queue()
+    handles = {name: TaskHandle() for name in list(streams) + list(tasks or {})}
+    jobs = {name: (lambda n=name, f=fn: _pump(n, f, events, handles[n].cancelled))
+            for name, fn in streams.items()}
+    jobs.update(tasks or {})
+    _submit_all(jobs, handles)
+    for name, handle in handles.items():
+        # le rappel passe après tous les fragments de la tâche dans la file
+        handle.future.add_done_callback(lambda f, n=name: events.put((n, "done", f)))
+    return handles, events
+
+
+def iter_task_events(handles: Dict[str, TaskHandle], events: queue.Queue,
+                     timeouts: Dict[str, float]) -> Iterator[TaskEvent]:
+    """Fragments et fins de tâches dans l'ordre d'arrivée, avec délai max par tâche."""
+    pending = set(handles)
+
+    while pending:
+        now = time.perf_counter()
+        for name in sorted(n for n in pending if now >= handles[n].deadline(timeouts.get(n, AGENT_TIMEOUT))):
+            pending.discard(name)
+            handles[name].abandon()
+            yield TaskEvent(name, "done", None, _timeout_error(name, timeouts), handles[name].elapsed())
+        if not pending:
+            break
+
+        try:
+            name, kind, payload = events.get(timeout=_next_wait(handles, pending, timeouts))
+        except queue.Empty:
+            continue
+        if name not in pending:
+            continue  # tâche déjà abandonnée pour dépassement de délai
+
+        elapsed = handles[name].elapsed()
+        if kind == "delta":
+            yield TaskEvent(name, "delta", payload, None, elapsed)
+            continue
+        pending.discard(name)
+        try:
+            yield TaskEvent(name, "done", payload.result(), None, elapsed)
+        except Exception as e:
+            yield TaskEvent(name, "done", None, e, elapsed)
+
+
+# ---------------------------------------------------------------------
+# Programme principal (mode console)
+# ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Choisir le ticker
+    ticker = input("Ticker à analyser (ex: AAPL, MSFT, TSLA) : ").strip().upper() or "AAPL"
+
+    # Choisir la période (optionnelle)
+    start = input("Date début (YYYY-MM-DD, vide = tout) : ").strip() or None
+    end = input("Date fin   (YYYY-MM-DD, vide = tout) : ").strip() or None
+
+    # 1) + 2) Analyse quantitative et actualités web en parallèle,
+    # affichées dès que chacune se termine
+    print(f"\n--- Lancement de l'analyse quantitative et de la recherche d'actualités pour {ticker} ---")
+    handles = submit_tasks({
+        "quant": lambda: run_quantitative_analysis(ticker, start, end)[1],
+        "news": lambda: run_news_search(ticker),
+    })
+    titles = {"quant": "ANALYSE QUANTITATIVE", "news": "ACTUALITÉS FINANCIÈRES"}
+    contents = {}
+    for result in iter_task_results(handles, {"quant": AGENT_TIMEOUT, "news": AGENT_TIMEOUT}):
+        if result.error is not None:
+            contents[result.name] = f"Indisponible ({result.error})"
+        else:
+            contents[result.name] = result.value
+        print(f"\n=== {titles[result.name]} POUR {ticker} ({result.seconds:.1f}s) ===\n")
+        print(contents[result.name])
+    quant_content, news_content = contents["quant"], contents["news"]
+
+    # 3) Sauvegarder le rapport en Markdown
+    saved = write_report(report_path(ticker, start, end), ticker, start, end,
+                         quant_content, news_content)
+    print(f"\nRapport sauvegardé dans : {saved}")
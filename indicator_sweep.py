@@ -0,0 +1,300 @@
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analysis_stock_data import DATA_DIR, read_stock_csv
+from backtest import backtest_matrix, list_tickers
+
+
+# ---------------------------------------------------------------------
+# Noyaux à sommes cumulées
+# ---------------------------------------------------------------------
+# Chaque fenêtre supplémentaire coûte O(n) : une soustraction de deux
+# sommes préfixes, vectorisée sur toute la grille (pas de boucle Python
+# par fenêtre). Les fenêtres contenant un NaN donnent NaN, comme
+# rolling(window, min_periods=window).
+
+def _window_bounds(n: int, windows: np.ndarray):
+    windows = np.asarray(windows, dtype=np.int64)[:, None]
+    end = np.arange(1, n + 1)[None, :]
+    start = end - windows
+    return windows, end, start, np.clip(start, 0, None)
+
+
+def _prefix(values: np.ndarray, center: float):
+    valid = ~np.isnan(values)
+    x = np.where(valid, values - center, 0.0)
+    cs = np.concatenate(([0.0], np.cumsum(x)))
+    cs2 = np.concatenate(([0.0], np.cumsum(x * x)))
+    cnt = np.concatenate(([0], np.cumsum(valid)))
+    return cs, cs2, cnt
+
+
+def rolling_mean_grid(values: np.ndarray, windows) -> np.ndarray:
+    """Moyennes glissantes pour toutes les fenêtres : tableau (len(windows), n)."""
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[0]
+    center = np.nanmean(values) if np.any(~np.isnan(values)) else 0.0
+    cs, _, cnt = _prefix(values, center)
+    w, end, start, start_c = _window_bounds(n, windows)
+
+    sums = cs[end] - cs[start_c]
+    counts = cnt[end] - cnt[start_c]
+    full = (start >= 0) & (counts == w)
+    return np.where(full, sums / w + center, np.nan)
+
+
+def rolling_std_grid(values: np.ndarray, windows, ddof: int = 1) -> np.ndarray:
+    """
+    Écarts-types glissants pour toutes les fenêtres à partir des sommes
+    préfixes et des sommes préfixes des carrés : tableau (len(windows), n).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[0]
+    center = np.nanmean(values) if np.any(~np.isnan(values)) else 0.0
+    cs, cs2, cnt = _prefix(values, center)
+    w, end, start, start_c = _window_bounds(n, windows)
+
+    sums = cs[end] - cs[start_c]
+    sums2 = cs2[end] - cs2[start_c]
+    counts = cnt[end] - cnt[start_c]
+    full = (start >= 0) & (counts == w) & (w > ddof)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = (sums2 - sums * sums / w) / (w - ddof)
+    return np.where(full, np.sqrt(np.clip(var, 0.0, None)), np.nan)
+
+
+def rsi_grid(close: np.ndarray, periods) -> np.ndarray:
+    """RSI (moyennes simples, comme add_rsi) pour toutes les périodes : (len(periods), n)."""
+    close = np.asarray(close, dtype=np.float64)
+    delta = np.empty_like(close)
+    delta[0] = np.nan
+    delta[1:] = np.diff(close)
+
+    gain = np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None))
+    loss = np.where(np.isnan(delta), np.nan, -np.clip(delta, None, 0))
+
+    avg_gain = rolling_mean_grid(gain, periods)
+    avg_loss = rolling_mean_grid(loss, periods)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def volatility_grid(close: np.ndarray, windows) -> np.ndarray:
+    """Volatilité glissante des rendements journaliers (comme add_volatility)."""
+    close = np.asarray(close, dtype=np.float64)
+    returns = np.empty_like(close)
+    returns[0] = np.nan
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns[1:] = close[1:] / close[:-1] - 1.0
+    return rolling_std_grid(returns, windows)
+
+
+def sweep_indicators(df: pd.DataFrame,
+                     ma_windows=(7, 20, 30, 50),
+                     vol_windows=(30,),
+                     rsi_periods=(14,)) -> pd.DataFrame:
+    """
+    Calcule en une passe une grille d'indicateurs sur Close.
+    Colonnes : MA_{w}, Volatility_{w}d, RSI_{p}.
+    """
+    close = df["Close"].to_numpy(dtype=np.float64)
+    out = {}
+    for w, col in zip(ma_windows, rolling_mean_grid(close, ma_windows)):
+        out[f"MA_{w}"] = col
+    for w, col in zip(vol_windows, volatility_grid(close, vol_windows)):
+        out[f"Volatility_{w}d"] = col
+    for p, col in zip(rsi_periods, rsi_grid(close, rsi_periods)):
+        out[f"RSI_{p}"] = col
+    return pd.DataFrame(out, index=df.index)
+
+
+# ---------------------------------------------------------------------
+# Scores de croisement sur la grille
+# ---------------------------------------------------------------------
+
+def score_grid(close: np.ndarray,
+               short_windows,
+               long_windows,
+               rsi_periods,
+               rsi_low: float = 30,
+               rsi_high: float = 70):
+    """
+    Score technique (mêmes règles que technical_score) pour chaque
+    combinaison (MA courte, MA longue, période RSI).
+    Retourne (combos, scores) avec scores de forme (len(combos), n).
+    """
+    ma_windows = sorted(set(short_windows) | set(long_windows))
+    ma = rolling_mean_grid(close, ma_windows)
+    ma_idx = {w: i for i, w in enumerate(ma_windows)}
+
+    ma_short = ma[[ma_idx[w] for w in short_windows]][:, None, :]
+    ma_long = ma[[ma_idx[w] for w in long_windows]][None, :, :]
+    # NaN -> 0 : les comparaisons avec NaN sont fausses
+    ma_signal = (ma_short > ma_long).astype(np.int8) - (ma_short < ma_long).astype(np.int8)
+
+    rsi = rsi_grid(close, rsi_periods)
+    rsi_signal = (rsi < rsi_low).astype(np.int8) - (rsi > rsi_high).astype(np.int8)
+
+    scores = ma_signal[:, :, None, :] + rsi_signal[None, None, :, :]
+    combos = list(itertools.product(short_windows, long_windows, rsi_periods))
+    return combos, scores.reshape(len(combos), -1)
+
+
+def sweep_ticker(ticker: str,
+                 short_windows=(7, 10, 20),
+                 long_windows=(30, 50, 100),
+                 rsi_periods=(7, 14, 21),
+                 start_date=None,
+                 end_date=None,
+                 data_dir: Path = DATA_DIR,
+                 **rules) -> pd.DataFrame:
+    """
+    Backtest de toute la grille de paramètres pour un ticker.
+    Indicateurs calculés sur tout l'historique, évaluation sur [start_date, end_date].
+    """
+    df = read_stock_csv(ticker, data_dir)
+    close = df["Close"].to_numpy(dtype=np.float64)
+    combos, scores = score_grid(close, short_windows, long_windows, rsi_periods)
+
+    mask = np.ones(len(df), dtype=bool)
+    if start_date:
+        mask &= (df["Date"] >= pd.to_datetime(start_date)).to_numpy()
+    if end_date:
+        mask &= (df["Date"] <= pd.to_datetime(end_date)).to_numpy()
+
+    metrics = backtest_matrix(close[mask], scores[:, mask], **rules)
+    result = pd.DataFrame(combos, columns=["short_window", "long_window", "rsi_period"])
+    for k, v in metrics.items():
+        result[k] = v
+    result.insert(0, "ticker", ticker)
+    return result
+
+
+def _sweep_worker(args):
+    ticker, grid, start_date, end_date, data_dir, rules = args
+    try:
+        return sweep_ticker(ticker, *grid, start_date=start_date, end_date=end_date,
+                            data_dir=data_dir, **rules)
+    except Exception as e:
+        return {"ticker": ticker, "error": str(e)}
+
+
+def sweep_universe(tickers=None,
+                   short_windows=(7, 10, 20),
+                   long_windows=(30, 50, 100),
+                   rsi_periods=(7, 14, 21),
+                   start_date=None,
+                   end_date=None,
+                   data_dir: Path = DATA_DIR,
+                   workers: int = None,
+                   **rules) -> pd.DataFrame:
+    """
+    Balayage de la grille sur plusieurs tickers dans un pool de processus.
+    Un ticker en échec donne une ligne avec sa colonne error renseignée
+    (comme backtest.run_backtest) ; best_parameters l'ignore.
+    """
+    if tickers is None:
+        tickers = list_tickers(data_dir)
+    workers = workers or os.cpu_count() or 1
+
+    grid = (tuple(short_windows), tuple(long_windows), tuple(rsi_periods))
+    tasks = [(t, grid, start_date, end_date, data_dir, rules) for t in tickers]
+    if workers == 1 or len(tasks) <= 1:
+        results = [_sweep_worker(t) for t in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_sweep_worker, tasks, chunksize=chunksize))
+
+    frames = [r for r in results if isinstance(r, pd.DataFrame)]
+    errors = [r for r in results if isinstance(r, dict)]
+    if errors:
+        frames.append(pd.DataFrame(errors))
+    if not frames:
+        return pd.DataFrame()
+    results = pd.concat(frames, ignore_index=True)
+    if "error" not in results.columns:
+        results["error"] = None
+    return results
+
+
+def failed_tickers(results: pd.DataFrame) -> dict:
+    """Tickers en échec -> message d'erreur."""
+    if results.empty or "error" not in results.columns:
+        return {}
+    failed = results[results["error"].notna()]
+    return dict(zip(failed["ticker"], failed["error"]))
+
+
+def best_parameters(results: pd.DataFrame, metric: str = "total_return") -> pd.DataFrame:
+    """Classement des combinaisons, moyennées sur l'univers."""
+    keys = ["short_window", "long_window", "rsi_period"]
+    if "error" in results.columns:
+        results = results[results["error"].isna()]
+    ranking = (
+        results.groupby(keys)
+        .agg(
+            n_tickers=("ticker", "nunique"),
+            total_return=("total_return", "mean"),
+            hit_rate=("hit_rate", "mean"),
+            max_drawdown=("max_drawdown", "mean"),
+            turnover=("turnover", "mean"),
+        )
+        .sort_values(metric, ascending=False)
+    )
+    return ranking
+
+
+# ---------------------------------------------------------------------
+# Ligne de commande
+# ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Balayage des paramètres d'indicateurs sur l'univers.")
+    parser.add_argument("--tickers", nargs="*", help="Tickers (défaut : tout data/stocks)")
+    parser.add_argument("--short", nargs="+", type=int, default=[7, 10, 20])
+    parser.add_argument("--long", nargs="+", type=int, default=[30, 50, 100])
+    parser.add_argument("--rsi", nargs="+", type=int, default=[7, 14, 21])
+    parser.add_argument("--start", default=None, help="Date début (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="Date fin (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--metric", default="total_return")
+    parser.add_argument("--output", default=None, help="Fichier CSV des résultats détaillés")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    results = sweep_universe(
+        tickers=args.tickers or None,
+        short_windows=args.short,
+        long_windows=args.long,
+        rsi_periods=args.rsi,
+        start_date=args.start,
+        end_date=args.end,
+        workers=args.workers,
+    )
+    elapsed = time.perf_counter() - t0
+
+    n_combos = len(args.short) * len(args.long) * len(args.rsi)
+    failed = failed_tickers(results)
+    ok = results[results["error"].isna()] if not results.empty else results
+    print(f"Balayage terminé : {ok['ticker'].nunique() if not ok.empty else 0} tickers "
+          f"x {n_combos} combinaisons en {elapsed:.2f}s\n")
+    for ticker, error in failed.items():
+        print(f"ÉCHEC {ticker} : {error}")
+    if failed:
+        print(f"{len(failed)} ticker(s) en échec\n")
+    if not ok.empty:
+        print(best_parameters(results, args.metric).head(10))
+
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\nRésultats sauvegardés dans {args.output}")
@@ -0,0 +1,241 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+# ---------------------------------------------------------------------
+# Cache disque des réponses des agents (SQLite)
+# ---------------------------------------------------------------------
+# Clé : nom de l'agent + identifiant du modèle + rôle / instructions + prompt.
+# Deux durées de vie : longue pour l'analyse quantitative (le prompt dépend
+# uniquement des données), courte pour les actualités (le prompt ne change pas
+# mais le web, si). Taille bornée : au-delà de max_entries, les entrées les
+# moins récemment lues sont supprimées.
+
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", "cache/llm_cache.sqlite")
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "500"))
+QUANT_TTL = int(os.getenv("LLM_CACHE_QUANT_TTL", str(24 * 3600)))
+NEWS_TTL = int(os.getenv("LLM_CACHE_NEWS_TTL", str(30 * 60)))
+DISABLED = os.getenv("LLM_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+METRICS_PATH = os.getenv("LLM_METRICS_PATH", "cache/agent_metrics.jsonl")
+
+
+class CachedResponse:
+    """Réponse minimale compatible avec RunResponse (attribut content)."""
+
+    def __init__(self, content: str, cached: bool, elapsed: float):
+        self.content = content
+        self.cached = cached
+        self.elapsed = elapsed
+
+
+def _model_id(agent) -> str:
+    model = getattr(agent, "model", None)
+    return getattr(model, "id", None) or type(model).__name__
+
+
+def cache_key(agent, prompt: str) -> str:
+    payload = json.dumps({
+        "agent": agent.name,
+        "model": _model_id(agent),
+        "role": getattr(agent, "role", None),
+        "instructions": getattr(agent, "instructions", None),
+        "prompt": prompt,
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = MAX_ENTRIES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, agent TEXT, model TEXT, content TEXT,"
+            " created_at REAL, expires_at REAL, last_access REAL, hits INTEGER DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key: str, content: str, ttl: float, agent: str = "", model: str = ""):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, agent, model, content, created_at, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, agent, model, content, now, now + ttl, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT agent, COUNT(*), SUM(hits), SUM(LENGTH(content)) FROM responses GROUP BY agent"
+            ).fetchall()
+        return {agent: {"entries": n, "hits": hits or 0, "bytes": size or 0} for agent, n, hits, size in rows}
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache() -> LLMCache:
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
+
+
+def cached_run(agent, prompt: str, ttl: float, cache: LLMCache = None) -> CachedResponse:
+    """
+    agent.run(prompt) avec cache : une réponse identique encore valide est
+    renvoyée sans appel au modèle. Les erreurs ne sont jamais mises en cache.
+    """
+    t0 = time.perf_counter()
+    if DISABLED or ttl <= 0:
+        return CachedResponse(agent.run(prompt).content, False, time.perf_counter() - t0)
+
+    cache = cache or get_cache()
+    key = cache_key(agent, prompt)
+    content = cache.get(key)
+    if content is not None:
+        return CachedResponse(content, True, time.perf_counter() - t0)
+
+    content = agent.run(prompt).content
+    if content:
+        cache.set(key, content, ttl, agent=agent.name, model=_model_id(agent))
+    return CachedResponse(content, False, time.perf_counter() - t0)
+
+
+class StreamingRun:
+    """
+    Itérateur de fragments de texte d'une réponse d'agent (cache compris).
+    Renseigne first_token_seconds, total_seconds et content, et ajoute une
+    ligne de métriques à METRICS_PATH une fois la réponse complète.
+    """
+
+    def __init__(self, agent, prompt: str, ttl: float, cache: LLMCache = None):
+        self.agent = agent
+        self.prompt = prompt
+        self.ttl = ttl
+        self.cache = cache
+        self.cached = False
+        self._parts = []
+        self.first_token_seconds = None
+        self.total_seconds = None
+
+    @property
+    def content(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def chunks(self) -> int:
+        return len(self._parts)
+
+    def _deltas(self) -> Iterator[str]:
+        use_cache = not DISABLED and self.ttl > 0
+        if use_cache:
+            self.cache = self.cache or get_cache()
+            key = cache_key(self.agent, self.prompt)
+            content = self.cache.get(key)
+            if content is not None:
+                self.cached = True
+                yield content
+                return
+
+        for chunk in self.agent.run(self.prompt, stream=True):
+            if isinstance(chunk.content, str) and chunk.content:
+                yield chunk.content
+
+        if use_cache and self.content:
+            self.cache.set(key, self.content, self.ttl, agent=self.agent.name, model=_model_id(self.agent))
+
+    def __iter__(self) -> Iterator[str]:
+        t0 = time.perf_counter()
+        for delta in self._deltas():
+            if self.first_token_seconds is None:
+                self.first_token_seconds = time.perf_counter() - t0
+            self._parts.append(delta)
+            yield delta
+        self.total_seconds = time.perf_counter() - t0
+        record_metrics(self)
+
+
+def cached_stream(agent, prompt: str, ttl: float, cache: LLMCache = None) -> StreamingRun:
+    """Version streaming de cached_run : itérer sur le résultat donne les fragments de texte."""
+    return StreamingRun(agent, prompt, ttl, cache)
+
+
+def record_metrics(run: StreamingRun, path: str = METRICS_PATH):
+    """Une ligne JSON par réponse : temps jusqu'au 1er fragment, temps total, cache."""
+    try:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps({
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "agent": run.agent.name,
+            "model": _model_id(run.agent),
+            "cached": run.cached,
+            "first_token_seconds": round(run.first_token_seconds, 4) if run.first_token_seconds is not None else None,
+            "total_seconds": round(run.total_seconds, 4),
+            "chunks": run.chunks,
+            "chars": len(run.content),
+        }, ensure_ascii=False)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cache des réponses des agents.")
+    parser.add_argument("command", choices=["stats", "clear"])
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print(json.dumps(get_cache().stats(), indent=2, ensure_ascii=False))
+    else:
+        get_cache().clear()
+        print(f"Cache vidé ({CACHE_PATH})")
@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import re
+import time
+import uuid
+from typing import Iterator, List, Optional
+
+from phi.run.response import RunResponse
+
+# ---------------------------------------------------------------------
+# Agent local de substitution (sans Groq)
+# ---------------------------------------------------------------------
+# Même interface que phi.agent.Agent pour ce que l'application utilise :
+# name, model.id, role, instructions et run(message, stream=False).
+# La réponse est un texte déterministe construit à partir du prompt, émis
+# mot par mot avec des délais configurables, pour tester le streaming, les
+# délais d'attente et le cache sans réseau ni quota.
+# Délai avant le 1er mot = first_token_delay + prompt_token_delay par token
+# envoyé (message + rôle + instructions), comme la phase de lecture du prompt
+# d'un vrai modèle.
+#
+# Deux façons de l'utiliser (LLM_BACKEND, voir financial_agent.py) :
+# - "local"        : agents remplacés dans le processus par LocalStandInAgent
+# - "local-server" : vrais agents phi / client Groq, dirigés vers le serveur
+#                    de ce module (python local_llm.py --serve), compatible
+#                    avec /openai/v1/chat/completions : tout le chemin client
+#                    (HTTP, streaming SSE, phi) est exercé, sans réseau externe
+
+LOCAL_FIRST_TOKEN_SECONDS = float(os.getenv("LOCAL_LLM_FIRST_TOKEN_SECONDS", "0.3"))
+LOCAL_TOKENS_PER_SECOND = float(os.getenv("LOCAL_LLM_TOKENS_PER_SECOND", "50"))
+LOCAL_PROMPT_TOKENS_PER_SECOND = float(os.getenv("LOCAL_LLM_PROMPT_TOKENS_PER_SECOND", "0"))  # 0 = gratuit
+LOCAL_LLM_URL = os.getenv("LOCAL_LLM_URL", "http://127.0.0.1:8100")
+
+
+class LocalModel:
+    def __init__(self, id: str = "local-stand-in"):
+        self.id = id
+
+
+class LocalStandInAgent:
+    def __init__(self,
+                 name: str,
+                 role: str = "",
+                 instructions: Optional[List[str]] = None,
+                 first_token_delay: float = 0.3,
+                 token_delay: float = 0.02,
+                 model_id: str = "local-stand-in",
+                 prompt_token_delay: float = 0.0):
+        self.name = name
+        self.role = role
+        self.instructions = instructions or []
+        self.model = LocalModel(model_id)
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.prompt_token_delay = prompt_token_delay
+
+    def compose(self, message: str) -> str:
+        """Réponse déterministe : reprend les lignes chiffrées du prompt sous forme de liste."""
+        facts = [line.strip(" -") for line in message.splitlines() if re.search(r"\d", line)]
+        lines = [f"**{self.name}** (modèle local de démonstration)", ""]
+        lines += [f"- {fact}" for fact in facts[:8]] or ["- Aucun chiffre dans la demande."]
+        lines += ["", "_Réponse générée localement, sans appel à un modèle de langage._"]
+        return "\n".join(lines)
+
+    def _tokens(self, text: str) -> Iterator[str]:
+        # mots en conservant les espaces / retours à la ligne qui les suivent
+        return iter(re.findall(r"\S+\s*|\s+", text))
+
+    def _prefill_delay(self, message: str) -> float:
+        if not self.prompt_token_delay:
+            return self.first_token_delay
+        from prompt_budget import count_tokens
+
+        sent = "\n".join([message, self.role, *self.instructions])
+        return self.first_token_delay + self.prompt_token_delay * count_tokens(sent)
+
+    def _stream(self, text: str, prefill: float) -> Iterator[RunResponse]:
+        time.sleep(prefill)
+        for i, token in enumerate(self._tokens(text)):
+            if i:
+                time.sleep(self.token_delay)
+            yield RunResponse(content=token, model=self.model.id)
+
+    def run(self, message: str, stream: bool = False, **kwargs):
+        text = self.compose(message)
+        prefill = self._prefill_delay(message)
+        if stream:
+            return self._stream(text, prefill)
+        time.sleep(prefill + self.token_delay * max(len(list(self._tokens(text))) - 1, 0))
+        return RunResponse(content=text, model=self.model.id)
+
+
+def local_delays() -> dict:
+    """Délais de l'agent local d'après LOCAL_LLM_* (débits en tokens par seconde)."""
+    return {
+        "first_token_delay": LOCAL_FIRST_TOKEN_SECONDS,
+        "token_delay": 1.0 / LOCAL_TOKENS_PER_SECOND if LOCAL_TOKENS_PER_SECOND > 0 else 0.0,
+        "prompt_token_delay": 1.0 / LOCAL_PROMPT_TOKENS_PER_SECOND if LOCAL_PROMPT_TOKENS_PER_SECOND > 0 else 0.0,
+    }
+
+
+def local_agent(name: str, role: str = "", instructions: Optional[List[str]] = None, **delays) -> LocalStandInAgent:
+    return LocalStandInAgent(name, role, instructions, **{**local_delays(), **delays})
+
+
+# ---------------------------------------------------------------------
+# Serveur compatible Groq / OpenAI (chat completions)
+# ---------------------------------------------------------------------
+
+def create_server_app(**delays):
+    """Application FastAPI : POST /openai/v1/chat/completions (stream ou non)."""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import StreamingResponse
+
+    server = FastAPI(title="Local stand-in LLM")
+
+    def _agent_for(messages: list, model: str) -> tuple:
+        system = "\n".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+        user = [m.get("content") or "" for m in messages if m.get("role") == "user"]
+        agent = local_agent("local-server", system, None, model_id=model, **delays)
+        return agent, (user[-1] if user else "")
+
+    def _usage(agent: LocalStandInAgent, message: str, text: str) -> dict:
+        from prompt_budget import count_tokens
+
+        prompt_tokens = count_tokens(message) + count_tokens(agent.role)
+        completion_tokens = count_tokens(text)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    @server.get("/openai/v1/models")
+    def models():
+        return {"object": "list", "data": [{"id": "local-stand-in", "object": "model", "owned_by": "local"}]}
+
+    @server.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "local-stand-in")
+        agent, message = _agent_for(body.get("messages", []), model)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            response = agent.run(message)
+            return {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": response.content}}],
+                "usage": _usage(agent, message, response.content),
+            }
+
+        def events() -> Iterator[str]:
+            def chunk(delta: dict, finish_reason=None, **extra) -> str:
+                payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                           "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+                payload.update(extra)
+                return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+            parts = []
+            for i, token in enumerate(agent.run(message, stream=True)):
+                parts.append(token.content)
+                yield chunk({"role": "assistant", "content": token.content} if i == 0 else {"content": token.content})
+            yield chunk({}, "stop", x_groq={"usage": _usage(agent, message, "".join(parts))})
+            yield "data: [DONE]\n\n"
+
+        # générateur synchrone : exécuté dans le pool de threads de Starlette
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Démonstration du streaming avec l'agent local, ou serveur local.")
+    parser.add_argument("--first-token-delay", type=float, default=LOCAL_FIRST_TOKEN_SECONDS)
+    parser.add_argument("--token-delay", type=float, default=local_delays()["token_delay"])
+    parser.add_argument("--prompt-token-delay", type=float, default=local_delays()["prompt_token_delay"])
+    parser.add_argument("--serve", action="store_true", help=f"Lance le serveur compatible Groq ({LOCAL_LLM_URL})")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    if args.serve:
+        import uvicorn
+
+        uvicorn.run(create_server_app(first_token_delay=args.first_token_delay, token_delay=args.token_delay,
+                                      prompt_token_delay=args.prompt_token_delay),
+                    host=args.host, port=args.port)
+        raise SystemExit(0)
+
+    agent = LocalStandInAgent("Financial Analysis Agent",
+                              first_token_delay=args.first_token_delay, token_delay=args.token_delay,
+                              prompt_token_delay=args.prompt_token_delay)
+    prompt = "Résumé AAPL\nPrix début : 150.0\nPrix fin : 180.5\nVolatilité : 0.0123"
+    t0 = time.perf_counter()
+    first = None
+    for chunk in agent.run(prompt, stream=True):
+        if first is None:
+            first = time.perf_counter() - t0
+        print(chunk.content, end="", flush=True)
+    print(f"\n\n1er token : {first:.3f}s | total : {time.perf_counter() - t0:.3f}s")
@@ -0,0 +1,220 @@
+import argparse
+import itertools
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+
+from train_model import (
+    CHUNK_SIZE,
+    DATA_DIR,
+    MODEL_DIR,
+    TrainingMatrices,
+    _csv_paths,
+    build_training_matrices,
+)
+
+REPORT_PATH = f"{MODEL_DIR}/cv_report.json"
+
+DEFAULT_GRID = {
+    "n_estimators": [50, 100],
+    "max_depth": [8, 16, None],
+    "min_samples_leaf": [1, 20],
+}
+
+
+# ---------------------------------------------------------------------
+# Découpage walk-forward
+# ---------------------------------------------------------------------
+
+def walk_forward_folds(dates: np.ndarray, n_folds: int = 4, gap_days: int = 5):
+    """
+    Plis chronologiques à fenêtre croissante sur toutes les lignes (tous tickers) :
+    le pli k apprend sur dates < cut_k - gap_days et valide sur [cut_k, cut_k+1).
+    L'écart gap_days évite que la target (cours du lendemain) d'une ligne
+    d'apprentissage tombe dans la période de validation.
+    Retourne une liste de (cut_train_end, cut_valid_start, cut_valid_end).
+    """
+    quantiles = np.linspace(0, 1, n_folds + 2)[1:]
+    cuts = np.quantile(dates.astype("datetime64[D]").astype(np.int64), quantiles)
+    cuts = cuts.astype("int64").astype("datetime64[D]")
+    gap = np.timedelta64(gap_days, "D")
+    folds = []
+    for k in range(n_folds):
+        valid_end = cuts[k + 1] if k + 1 < n_folds else np.datetime64("2262-01-01", "D")
+        folds.append((cuts[k] - gap, cuts[k], valid_end))
+    return folds
+
+
+def _load_all(matrices: TrainingMatrices):
+    """Concatène (en memmap) les splits train et test : la CV redécoupe par date."""
+    X_tr, y_tr, d_tr = matrices.load("train")
+    X_te, y_te, d_te = matrices.load("test")
+    return (X_tr, X_te), (y_tr, y_te), (d_tr, d_te)
+
+
+def _select(parts, masks, max_rows=None, seed=0):
+    idx = [np.flatnonzero(m) for m in masks]
+    total = sum(len(i) for i in idx)
+    if max_rows and total > max_rows:
+        rng = np.random.default_rng(seed)
+        keep = np.sort(rng.choice(total, size=max_rows, replace=False))
+        offsets = np.cumsum([0] + [len(i) for i in idx])
+        idx = [i[keep[(keep >= lo) & (keep < hi)] - lo]
+               for i, lo, hi in zip(idx, offsets[:-1], offsets[1:])]
+    return np.concatenate([np.asarray(p[i]) for p, i in zip(parts, idx)])
+
+
+# ---------------------------------------------------------------------
+# Évaluation d'un (config, pli) dans un worker
+# ---------------------------------------------------------------------
+
+def _measure_latency(model, X: np.ndarray, repeats: int = 100):
+    rows = X[:repeats]
+    model.predict_proba(rows[:1])
+    timings = []
+    for r in rows:
+        t0 = time.perf_counter()
+        model.predict_proba(r[None, :])
+        timings.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    model.predict_proba(X)
+    batch = time.perf_counter() - t0
+    return float(np.median(timings) * 1000), float(batch / max(len(X), 1) * 1e6)
+
+
+def _evaluate(args):
+    matrices_path, config, fold_id, fold, max_train_rows = args
+    X_parts, y_parts, d_parts = _load_all(TrainingMatrices(matrices_path))
+    train_end, valid_start, valid_end = fold
+
+    train_masks = [d < train_end for d in d_parts]
+    valid_masks = [(d >= valid_start) & (d < valid_end) for d in d_parts]
+    X_train = _select(X_parts, train_masks, max_train_rows, seed=fold_id)
+    y_train = _select(y_parts, train_masks, max_train_rows, seed=fold_id)
+    X_valid = _select(X_parts, valid_masks)
+    y_valid = _select(y_parts, valid_masks)
+
+    result = {"config": config, "fold": fold_id, "train_rows": len(y_train), "valid_rows": len(y_valid)}
+    if len(np.unique(y_train)) < 2 or not len(y_valid):
+        result["error"] = "pli vide"
+        return result
+
+    model = RandomForestClassifier(random_state=42, n_jobs=1, **config)
+    t0 = time.perf_counter()
+    model.fit(X_train, y_train)
+    result["fit_seconds"] = time.perf_counter() - t0
+    result["accuracy"] = float(accuracy_score(y_valid, model.predict(X_valid)))
+    result["model_bytes"] = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    result["single_row_ms"], result["batch_per_row_us"] = _measure_latency(model, X_valid[:2000])
+    return result
+
+
+# ---------------------------------------------------------------------
+# Recherche d'hyperparamètres
+# ---------------------------------------------------------------------
+
+def expand_grid(grid: dict) -> list:
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def pareto_front(report: pd.DataFrame, quality: str = "accuracy_mean",
+                 cost: str = "single_row_ms") -> pd.Series:
+    """Configurations non dominées : aucune autre n'est à la fois plus précise et plus rapide."""
+    q = report[quality].to_numpy()
+    c = report[cost].to_numpy()
+    dominated = ((q[None, :] >= q[:, None]) & (c[None, :] <= c[:, None])
+                 & ((q[None, :] > q[:, None]) | (c[None, :] < c[:, None]))).any(axis=1)
+    return pd.Series(~dominated, index=report.index)
+
+
+def search(tickers=None,
+           data_dir: str = DATA_DIR,
+           grid: dict = None,
+           n_folds: int = 4,
+           gap_days: int = 5,
+           max_train_rows: int = 200_000,
+           workers: int = None,
+           chunksize: int = CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Validation croisée walk-forward de toutes les configurations de la grille.
+    Les matrices de features viennent du cache de train_model (construites au
+    besoin) ; chaque (config, pli) est évalué dans un processus du pool.
+    """
+    workers = workers or os.cpu_count() or 1
+    csv_paths = _csv_paths(Path(data_dir), tickers)
+    matrices, from_cache = build_training_matrices(csv_paths, workers, chunksize)
+    print(f"Matrices de features {'lues depuis le cache' if from_cache else 'construites'} ({matrices.path})")
+
+    _, _, d_parts = _load_all(matrices)
+    folds = walk_forward_folds(np.concatenate([np.asarray(d) for d in d_parts]), n_folds, gap_days)
+    configs = expand_grid(grid or DEFAULT_GRID)
+
+    tasks = [(str(matrices.path), config, k, fold, max_train_rows)
+             for config in configs for k, fold in enumerate(folds)]
+    print(f"{len(configs)} configurations x {len(folds)} plis = {len(tasks)} évaluations ({workers} processus)")
+    if workers == 1:
+        results = [_evaluate(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_evaluate, tasks))
+
+    rows = pd.DataFrame([{**r["config"], **{k: v for k, v in r.items() if k != "config"}}
+                         for r in results])
+    rows = rows[rows.get("error").isna()] if "error" in rows.columns else rows
+    keys = list(configs[0])
+    report = (
+        rows.groupby(keys, dropna=False)
+        .agg(
+            accuracy_mean=("accuracy", "mean"),
+            accuracy_std=("accuracy", "std"),
+            fit_seconds=("fit_seconds", "mean"),
+            model_bytes=("model_bytes", "mean"),
+            single_row_ms=("single_row_ms", "mean"),
+            batch_per_row_us=("batch_per_row_us", "mean"),
+            folds=("fold", "count"),
+        )
+        .reset_index()
+    )
+    report["pareto"] = pareto_front(report)
+    return report.sort_values("accuracy_mean", ascending=False).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validation walk-forward et recherche d'hyperparamètres.")
+    parser.add_argument("--tickers", nargs="*", help="Tickers (défaut : tout data/stocks)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--folds", type=int, default=4)
+    parser.add_argument("--gap-days", type=int, default=5)
+    parser.add_argument("--max-train-rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--grid", default=None,
+                        help='Grille JSON, ex: \'{"n_estimators": [50, 100], "max_depth": [8, null]}\'')
+    parser.add_argument("--output", default=REPORT_PATH)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    report = search(
+        tickers=args.tickers or None,
+        data_dir=args.data_dir,
+        grid=json.loads(args.grid) if args.grid else None,
+        n_folds=args.folds,
+        gap_days=args.gap_days,
+        max_train_rows=args.max_train_rows,
+        workers=args.workers,
+    )
+    print(f"\nRecherche terminée en {time.perf_counter() - t0:.1f}s\n")
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(report)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    report.to_json(args.output, orient="records", indent=2)
+    print(f"\nRapport sauvegardé dans {args.output}")
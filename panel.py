@@ -0,0 +1,203 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from analysis_stock_data import load_data, slice_by_dates
+
+# ---------------------------------------------------------------------
+# Panel multi-tickers (dates x tickers)
+# ---------------------------------------------------------------------
+# Les pages de comparaison alignent une fois les séries de la sélection sur
+# l'union des dates : matrices NumPy close / volume (NaN = pas de cotation ce
+# jour-là). Performance normalisée, volumes, rendements, corrélation et
+# covariance sont calculés sur ces matrices, sans concat / pivot par ticker.
+# Corrélation et covariance : observations communes à chaque paire
+# (pairwise complete), par produits matriciels sur les masques de validité.
+
+
+def _first_valid(values: np.ndarray) -> np.ndarray:
+    """Première valeur non manquante de chaque colonne (NaN si colonne vide)."""
+    valid = ~np.isnan(values)
+    rows = valid.argmax(axis=0)
+    first = values[rows, np.arange(values.shape[1])]
+    return np.where(valid.any(axis=0), first, np.nan)
+
+
+def _pairwise_moments(x: np.ndarray, y: np.ndarray):
+    """
+    Effectifs et sommes centrées sur les lignes où x[:, i] et y[:, j] sont
+    toutes deux renseignées : n, cov, var_x, var_y (matrices i x j, non
+    normalisées par n - 1).
+    """
+    mx, my = ~np.isnan(x), ~np.isnan(y)
+    x0, y0 = np.where(mx, x, 0.0), np.where(my, y, 0.0)
+    mx, my = mx.astype(np.float64), my.astype(np.float64)
+
+    n = mx.T @ my
+    sx, sy = x0.T @ my, mx.T @ y0              # sommes de x (resp. y) sur les lignes communes
+    sxx, syy = (x0 * x0).T @ my, mx.T @ (y0 * y0)
+    sxy = x0.T @ y0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+    return n, cov, var_x, var_y
+
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sommes glissantes (fenêtre `window`, lignes) par sommes cumulées. Avant la
+    1re fenêtre complète : sommes des lignes disponibles (fenêtres partielles,
+    comme pandas rolling avec min_periods).
+    """
+    cum = np.concatenate([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)])
+    out = np.empty(values.shape)
+    head = min(window - 1, len(values))
+    out[:head] = cum[1:head + 1]
+    out[head:] = cum[window:] - cum[:-window]
+    return out
+
+
+class PricePanel:
+    """
+    Cours de clôture et volumes de plusieurs tickers alignés par date.
+    close / volume : tableaux (n_dates, n_tickers), NaN quand un ticker ne
+    cote pas. Objet partagé par le cache de load_panel : ne pas le modifier.
+    """
+
+    def __init__(self, dates: np.ndarray, tickers: List[str], close: np.ndarray,
+                 volume: np.ndarray, missing: Optional[List[str]] = None):
+        self.dates = dates
+        self.tickers = list(tickers)
+        self.close = close
+        self.volume = volume
+        self.missing = list(missing or [])
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame], missing: Optional[List[str]] = None) -> "PricePanel":
+        """frames : {ticker: DataFrame trié avec Date, Close, Volume}."""
+        frames = {t: df for t, df in frames.items() if not df.empty}
+        tickers = list(frames)
+        date_arrays = [df["Date"].to_numpy(dtype="datetime64[ns]") for df in frames.values()]
+        dates = np.unique(np.concatenate(date_arrays)) if date_arrays else np.array([], dtype="datetime64[ns]")
+
+        close = np.full((len(dates), len(tickers)), np.nan)
+        volume = np.full((len(dates), len(tickers)), np.nan)
+        for j, (df, ticker_dates) in enumerate(zip(frames.values(), date_arrays)):
+            rows = dates.searchsorted(ticker_dates)
+            close[rows, j] = df["Close"].to_numpy(dtype=np.float64)
+            volume[rows, j] = df["Volume"].to_numpy(dtype=np.float64)
+        return cls(dates, tickers, close, volume, missing)
+
+    @property
+    def empty(self) -> bool:
+        return not self.tickers
+
+    def frame(self, values: np.ndarray) -> pd.DataFrame:
+        """Matrice (dates x tickers) -> DataFrame indexé par Date, une colonne par ticker."""
+        return pd.DataFrame(values, index=pd.DatetimeIndex(self.dates, name="Date"), columns=self.tickers)
+
+    def last_dates(self) -> Dict[str, pd.Timestamp]:
+        """Dernière séance cotée de chaque ticker sur la période."""
+        valid = ~np.isnan(self.close)
+        last_rows = len(self.dates) - 1 - valid[::-1].argmax(axis=0)
+        return {t: pd.Timestamp(self.dates[i]) for t, i in zip(self.tickers, last_rows)}
+
+    # --- séries ---
+
+    def normalized_performance(self) -> np.ndarray:
+        """Performance (%) depuis la première clôture de chaque ticker sur la période."""
+        first = _first_valid(self.close)
+        first = np.where(first > 0, first, np.nan)
+        return (self.close / first - 1) * 100
+
+    def returns(self) -> np.ndarray:
+        """Rendements quotidiens (NaN si l'une des deux séances manque)."""
+        out = np.full(self.close.shape, np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[1:] = self.close[1:] / self.close[:-1] - 1
+        return out
+
+    # --- statistiques ---
+
+    def correlation(self, min_periods: int = 20) -> pd.DataFrame:
+        """Corrélation des rendements quotidiens, paire par paire sur les séances communes."""
+        r = self.returns()
+        n, cov, var_x, var_y = _pairwise_moments(r, r)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.sqrt(var_x * var_y)
+        corr = np.where(n >= min_periods, np.clip(corr, -1.0, 1.0), np.nan)
+        return pd.DataFrame(corr, index=self.tickers, columns=self.tickers)
+
+    def covariance(self, min_periods: int = 20, annualize: bool = True) -> pd.DataFrame:
+        """Covariance des rendements quotidiens (annualisée sur 252 séances par défaut)."""
+        r = self.returns()
+        n, cov, _, _ = _pairwise_moments(r, r)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = cov / (n - 1)
+        cov = np.where(n >= min_periods, cov * (252 if annualize else 1), np.nan)
+        return pd.DataFrame(cov, index=self.tickers, columns=self.tickers)
+
+    def rolling_correlation(self, reference: str, window: int = 60,
+                            min_periods: Optional[int] = None) -> pd.DataFrame:
+        """
+        Corrélation glissante des rendements de chaque ticker avec ceux de
+        `reference` (fenêtre de `window` séances, séances communes seulement).
+        Les premières lignes utilisent les séances déjà disponibles : une
+        valeur est rendue dès min_periods séances communes, comme pandas
+        rolling(window, min_periods).corr.
+        """
+        min_periods = min_periods or max(window // 2, 2)
+        r = self.returns()
+        y = r[:, [self.tickers.index(reference)]]
+        both = ~np.isnan(r) & ~np.isnan(y)
+        x0 = np.where(both, r, 0.0)
+        y0 = np.where(both, y, 0.0)
+
+        n = _window_sums(both.astype(np.float64), window)
+        sx, sy = _window_sums(x0, window), _window_sums(y0, window)
+        sxx, syy, sxy = _window_sums(x0 * x0, window), _window_sums(y0 * y0, window), _window_sums(x0 * y0, window)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = sxy - sx * sy / n
+            corr = cov / np.sqrt((sxx - sx * sx / n) * (syy - sy * sy / n))
+        corr = np.where(n >= min_periods, np.clip(corr, -1.0, 1.0), np.nan)
+        return self.frame(corr).drop(columns=[reference])
+
+    def summary(self) -> pd.DataFrame:
+        """Une ligne par ticker : période, clôtures, performance, volatilité, volume moyen."""
+        valid = ~np.isnan(self.close)
+        first_rows = valid.argmax(axis=0)
+        last_rows = len(self.dates) - 1 - valid[::-1].argmax(axis=0)
+        cols = np.arange(len(self.tickers))
+        perf = self.normalized_performance()
+        with np.errstate(invalid="ignore"):
+            volatility = np.nanstd(self.returns(), axis=0, ddof=1) * np.sqrt(252) * 100
+        return pd.DataFrame({
+            "Début": pd.DatetimeIndex(self.dates[first_rows]).date,
+            "Fin": pd.DatetimeIndex(self.dates[last_rows]).date,
+            "Séances": valid.sum(axis=0),
+            "Clôture début": self.close[first_rows, cols],
+            "Clôture fin": self.close[last_rows, cols],
+            "Performance (%)": perf[last_rows, cols],
+            "Volatilité annualisée (%)": volatility,
+            "Volume moyen": np.nanmean(self.volume, axis=0),
+        }, index=pd.Index(self.tickers, name="Ticker"))
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def load_panel(tickers: Sequence[str], start_date=None, end_date=None) -> PricePanel:
+    """
+    Panel de la sélection (tickers dans l'ordre donné, tuple pour le cache),
+    construit une fois par (sélection, période). Tickers sans données sur la
+    période : panel.missing.
+    """
+    frames, missing = {}, []
+    for ticker in tickers:
+        df = slice_by_dates(load_data(ticker)[["Date", "Close", "Volume"]], start_date, end_date)
+        if df.empty:
+            missing.append(ticker)
+        else:
+            frames[ticker] = df
+    return PricePanel.from_frames(frames, missing)
@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+# ---------------------------------------------------------------------
+# Client de l'API de prédiction (tableau de bord)
+# ---------------------------------------------------------------------
+# - une session requests partagée : connexions HTTP gardées ouvertes (pool)
+# - cache court des résultats, clé = payload de features (même ticker, même
+#   dernière séance -> même payload) ; les erreurs ne sont pas mises en cache
+# - plusieurs tickers à l'écran : un seul POST /predict/batch pour ceux qui
+#   ne sont pas en cache
+# Les erreurs sont renvoyées comme avant : {"error": ..., "details": ...}.
+
+PREDICTION_API_URL = os.getenv("PREDICTION_API_URL", "http://localhost:8000")
+PREDICTION_API_TIMEOUT = float(os.getenv("PREDICTION_API_TIMEOUT", "5"))
+PREDICTION_CACHE_TTL = int(os.getenv("PREDICTION_CACHE_TTL", "300"))
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "256"))
+PREDICTION_POOL_SIZE = int(os.getenv("PREDICTION_POOL_SIZE", "8"))
+
+
+def _error(error: str, details: str = "") -> dict:
+    return {"error": error, "details": details}
+
+
+class PredictionClient:
+    def __init__(self, base_url: str = PREDICTION_API_URL, timeout: float = PREDICTION_API_TIMEOUT,
+                 ttl: float = PREDICTION_CACHE_TTL, max_entries: int = PREDICTION_CACHE_MAX_ENTRIES,
+                 pool_size: int = PREDICTION_POOL_SIZE, session: requests.Session = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.ttl = ttl
+        self.max_entries = max_entries
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = self.misses = self.requests = 0
+
+    # --- cache ---
+
+    @staticmethod
+    def _key(features: dict) -> str:
+        return json.dumps(features, sort_keys=True)
+
+    def _get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def _put(self, key: str, result: dict):
+        if "error" in result or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits,
+                    "misses": self.misses, "requests": self.requests}
+
+    # --- appels à l'API ---
+
+    def _post(self, path: str, payload):
+        """POST JSON ; renvoie (réponse décodée, None) ou (None, erreur)."""
+        with self._lock:
+            self.requests += 1
+        try:
+            response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        except Exception as e:
+            return None, _error("Connection error", str(e))
+        if response.status_code != 200:
+            return None, _error(f"Status {response.status_code}", response.text)
+        try:
+            return response.json(), None
+        except ValueError as e:
+            return None, _error("Invalid response", f"{e}: {response.text[:200]}")
+
+    def predict(self, features: dict) -> dict:
+        """POST /predict, sauf si le même payload a été prédit il y a moins de ttl secondes."""
+        key = self._key(features)
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+        result, error = self._post("/predict", features)
+        if error is not None:
+            return error
+        self._put(key, result)
+        return result
+
+    def predict_many(self, payloads: Dict[str, dict]) -> Dict[str, dict]:
+        """
+        Prédictions de plusieurs tickers ({ticker: features}) : résultats en
+        cache, puis un seul aller-retour (/predict/batch, ou /predict s'il
+        n'en manque qu'un) pour les autres.
+        """
+        results, missing = {}, {}
+        for ticker, features in payloads.items():
+            cached = self._get(self._key(features))
+            if cached is not None:
+                results[ticker] = cached
+            else:
+                missing[ticker] = features
+
+        if len(missing) == 1:
+            (ticker, features), = missing.items()
+            result, error = self._post("/predict", features)
+            results[ticker] = error if error is not None else result
+            if error is None:
+                self._put(self._key(features), result)
+        elif missing:
+            body, error = self._post("/predict/batch", list(missing.values()))
+            predictions = body.get("predictions") if error is None and isinstance(body, dict) else None
+            if error is None and (not isinstance(predictions, list) or len(predictions) != len(missing)):
+                count = len(predictions) if isinstance(predictions, list) else "absentes"
+                error = _error("Invalid response", f"{count} prédictions pour {len(missing)} tickers")
+            for i, (ticker, features) in enumerate(missing.items()):
+                if error is not None:
+                    results[ticker] = error
+                    continue
+                results[ticker] = predictions[i]
+                self._put(self._key(features), predictions[i])
+
+        return {ticker: results.get(ticker, _error("Missing prediction")) for ticker in payloads}
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_prediction_client() -> PredictionClient:
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = PredictionClient()
+        return _default_client
+
+
+# ---------------------------------------------------------------------
+# Helpers tableau de bord
+# ---------------------------------------------------------------------
+
+def feature_payloads(last_dates: Dict[str, pd.Timestamp]) -> Dict[str, dict]:
+    """
+    Payload /predict de chaque ticker à sa dernière séance affichée
+    ({ticker: date}, ex. PricePanel.last_dates()) : mêmes features qu'à
+    l'entraînement, calculées sur l'historique brut.
+    """
+    from analysis_stock_data import load_data, slice_by_dates
+    from app.features import WARMUP_ROWS, latest_feature_payload
+
+    payloads = {}
+    for ticker, last_date in last_dates.items():
+        history = slice_by_dates(load_data(ticker), None, last_date)
+        payloads[ticker] = latest_feature_payload(history.tail(WARMUP_ROWS))
+    return payloads
+
+
+def predictions_frame(results: Dict[str, dict]) -> pd.DataFrame:
+    """Tableau Ticker / probabilité de hausse / risque (erreurs en clair)."""
+    rows = []
+    for ticker, result in results.items():
+        if "error" in result:
+            rows.append({"Ticker": ticker, "Probabilité de hausse": None,
+                         "Risque": f"Erreur : {result['error']}"})
+        else:
+            rows.append({"Ticker": ticker, "Probabilité de hausse": result.get("churn_probability"),
+                         "Risque": result.get("risk_level", "Unknown")})
+    return pd.DataFrame(rows, columns=["Ticker", "Probabilité de hausse", "Risque"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prédictions de l'API pour plusieurs tickers.")
+    parser.add_argument("tickers", nargs="+", help="Tickers (ex: AAPL MSFT)")
+    parser.add_argument("--url", default=PREDICTION_API_URL)
+    parser.add_argument("--repeat", type=int, default=2, help="Nombre de passes (les suivantes : cache)")
+    args = parser.parse_args()
+
+    from analysis_stock_data import read_stock_csv
+
+    client = PredictionClient(args.url)
+    payloads = feature_payloads({t: read_stock_csv(t)["Date"].iloc[-1] for t in args.tickers})
+    for i in range(args.repeat):
+        t0 = time.perf_counter()
+        results = client.predict_many(payloads)
+        print(f"passe {i + 1} : {(time.perf_counter() - t0) * 1000:.1f} ms")
+    print(predictions_frame(results).to_string(index=False))
+    print(client.stats())
@@ -0,0 +1,165 @@
+import os
+import re
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from analysis_stock_data import generate_text_summary
+
+# ---------------------------------------------------------------------
+# Prompts de l'analyse quantitative et budget de tokens
+# ---------------------------------------------------------------------
+# Deux modes :
+# - "full"    : résumé rédigé (generate_text_summary) + consignes détaillées
+#               (prompt historique, inchangé)
+# - "compact" : lignes clé=valeur, précision réglable, indicateurs RSI / MA /
+#               score en option, consignes courtes (rôle et instructions de
+#               l'agent compris : COMPACT_ROLE / COMPACT_INSTRUCTIONS)
+# Le budget porte sur le message envoyé + les consignes de l'agent (rôle,
+# instructions) : les sections optionnelles sont retirées tant qu'il est
+# dépassé, puis PromptBudgetExceeded est levée. Il s'applique aussi au prompt
+# de l'agent d'actualités (build_news_prompt ; hors résultats de recherche,
+# inconnus avant l'appel).
+
+PROMPT_MODE = os.getenv("PROMPT_MODE", "full")
+PROMPT_PRECISION = int(os.getenv("PROMPT_PRECISION", "2"))
+PROMPT_INDICATORS = os.getenv("PROMPT_INDICATORS", "1").lower() in ("1", "true", "yes")
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "0"))  # 0 = sans limite
+
+# Nombres par groupes de 3 chiffres, mots par morceaux de 4 caractères,
+# ponctuation à l'unité : approximation du BPE de Llama 3 (à ~10 % près sur
+# ces prompts), sans dépendance au tokenizer.
+_TOKEN_RE = re.compile(r"\d{1,3}|[^\W\d_]{1,4}|[^\w\s]")
+
+COMPACT_ROLE = "Analyste financier prudent. Données : lignes clé=valeur."
+COMPACT_INSTRUCTIONS = [
+    "Français, paragraphes courts, pour débutant.",
+    "Uniquement les chiffres fournis ; aucune promesse de gain.",
+]
+
+
+class PromptBudgetExceeded(ValueError):
+    """Le prompt minimal dépasse le budget de tokens."""
+
+
+def count_tokens(text: str) -> int:
+    """Estimation du nombre de tokens d'un texte."""
+    return len(_TOKEN_RE.findall(text or ""))
+
+
+def agent_overhead_tokens(agent) -> int:
+    """Tokens envoyés à chaque appel en plus du message : rôle + instructions."""
+    if agent is None:
+        return 0
+    instructions = getattr(agent, "instructions", None) or []
+    return count_tokens(getattr(agent, "role", None) or "") + sum(count_tokens(i) for i in instructions)
+
+
+# ---------------------------------------------------------------------
+# Construction des prompts
+# ---------------------------------------------------------------------
+
+def full_prompt(ticker: str, base_text: str) -> str:
+    return (
+        f"Voici un résumé quantitatif pour l'action {ticker} :\n\n"
+        f"{base_text}\n\n"
+        "À partir de ce résumé, rédige une analyse structurée :\n"
+        "- explique la tendance générale du cours sur la période,\n"
+        "- commente les niveaux minimum, maximum et le prix moyen,\n"
+        "- interprète la volatilité moyenne,\n"
+        "- donne quelques points de vigilance pour un investisseur prudent.\n"
+    )
+
+
+def news_prompt(ticker: str, mode: str = "full") -> str:
+    if mode == "compact":
+        return (f"Actualités financières récentes de {ticker} (DuckDuckGo) : "
+                "3 à 5 points en français, titres et liens.")
+    return (
+        f"Tu dois rechercher des actualités financières récentes sur l'entreprise "
+        f"liée au ticker {ticker} en utilisant DuckDuckGo.\n\n"
+        "Concentre-toi sur les actualités les plus récentes, idéalement de la "
+        "semaine ou du mois en cours.\n"
+        "Donne une synthèse en français avec 3 à 5 points, et cite les titres "
+        "et liens des articles importants si possible.\n"
+    )
+
+
+def _fmt(value, precision: int) -> str:
+    if value is None or pd.isna(value):
+        return "na"
+    return f"{value:.{precision}f}"
+
+
+def compact_sections(ticker: str, summary: dict, df: Optional[pd.DataFrame] = None,
+                     precision: int = 2, indicators: bool = True) -> List[Tuple[str, str, bool]]:
+    """Sections (nom, texte, obligatoire) du prompt compact, de la plus à la moins importante."""
+    p = precision
+    sections = [
+        ("header", f"{ticker} {summary['first_date'].date()}..{summary['last_date'].date()}", True),
+        ("prices", f"close={_fmt(summary['start_price'], p)}->{_fmt(summary['end_price'], p)} "
+                   f"min={_fmt(summary['min_price'], p)} max={_fmt(summary['max_price'], p)} "
+                   f"mean={_fmt(summary['mean_price'], p)}", True),
+    ]
+    if summary.get("volatility_30d_mean") is not None:
+        sections.append(("volatility", f"vol30={_fmt(summary['volatility_30d_mean'], p + 2)}", False))
+    if indicators:
+        if df is not None and not df.empty:
+            last = df.iloc[-1]
+            sections.append(("indicators", f"rsi14={_fmt(last.get('RSI_14'), 1)} "
+                                           f"ma20={_fmt(last.get('MA_short_20'), p)} "
+                                           f"ma50={_fmt(last.get('MA_long_50'), p)}", False))
+        if summary.get("technical_score") is not None:
+            sections.append(("score", f"score={summary['technical_score']:+d} (-2..+2)", False))
+    sections.append(("task", "Analyse en français : tendance, min/max/moyenne, volatilité, "
+                             "vigilance. Pas d'invention.", True))
+    return sections
+
+
+def build_quant_prompt(ticker: str, summary: dict, df: Optional[pd.DataFrame] = None,
+                       mode: str = None, precision: int = None, indicators: bool = None,
+                       budget: int = None, agent=None, base_text: str = None) -> Tuple[str, int]:
+    """
+    Prompt de l'analyse quantitative et son nombre de tokens (consignes de
+    l'agent comprises). Les paramètres absents prennent les valeurs PROMPT_*.
+    base_text : résumé rédigé déjà calculé (mode full).
+    """
+    mode = mode or PROMPT_MODE
+    precision = PROMPT_PRECISION if precision is None else precision
+    indicators = PROMPT_INDICATORS if indicators is None else indicators
+    budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+    overhead = agent_overhead_tokens(agent)
+
+    if mode == "full" or not summary:
+        prompt = full_prompt(ticker, base_text or generate_text_summary(ticker, summary))
+        tokens = overhead + count_tokens(prompt)
+        if budget and tokens > budget:
+            raise PromptBudgetExceeded(f"{tokens} tokens pour un budget de {budget} (mode full)")
+        return prompt, tokens
+
+    if mode != "compact":
+        raise ValueError(f"Mode de prompt inconnu : {mode}")
+
+    sections = compact_sections(ticker, summary, df, precision, indicators)
+    while True:
+        prompt = "\n".join(text for _, text, _ in sections)
+        tokens = overhead + count_tokens(prompt)
+        if not budget or tokens <= budget:
+            return prompt, tokens
+        optional = [i for i, (_, _, required) in enumerate(sections) if not required]
+        if not optional:
+            raise PromptBudgetExceeded(f"{tokens} tokens pour un budget de {budget} (prompt minimal)")
+        del sections[optional[-1]]
+
+
+def build_news_prompt(ticker: str, mode: str = None, budget: int = None, agent=None) -> Tuple[str, int]:
+    """Prompt de l'agent d'actualités et son nombre de tokens (consignes comprises)."""
+    mode = mode or PROMPT_MODE
+    budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+    if mode not in ("full", "compact"):
+        raise ValueError(f"Mode de prompt inconnu : {mode}")
+    prompt = news_prompt(ticker, mode)
+    tokens = agent_overhead_tokens(agent) + count_tokens(prompt)
+    if budget and tokens > budget:
+        raise PromptBudgetExceeded(f"{tokens} tokens pour un budget de {budget} (actualités, mode {mode})")
+    return prompt, tokens
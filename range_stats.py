@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+
+# ---------------------------------------------------------------------
+# Structures précalculées pour les statistiques sur une plage de dates
+# ---------------------------------------------------------------------
+# - sommes préfixes (avec compte des valeurs non manquantes) pour les moyennes
+# - sparse tables pour min / max : construction O(n log n), requête O(1)
+# Aucune requête ne découpe le DataFrame.
+
+def _prefix_sums(values: np.ndarray):
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    return sums, counts
+
+
+def _sparse_table(values: np.ndarray, op) -> np.ndarray:
+    """table[k, i] = op(values[i : i + 2**k]) (les cases hors limites sont ignorées)."""
+    n = values.shape[0]
+    levels = max(1, int(np.floor(np.log2(n))) + 1) if n else 1
+    table = np.empty((levels, n), dtype=np.float64)
+    table[0] = values
+    for k in range(1, levels):
+        half = 1 << (k - 1)
+        table[k, : n - half] = op(table[k - 1, : n - half], table[k - 1, half:])
+        table[k, n - half:] = table[k - 1, n - half:]
+    return table
+
+
+class RangeStats:
+    """
+    Résumé d'un ticker (mêmes clés que summarize_stock) pour n'importe quelle
+    fenêtre [start, end], en temps constant après un précalcul O(n log n).
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.dates = df["Date"].to_numpy(dtype="datetime64[ns]")
+        self.close = df["Close"].to_numpy(dtype=np.float64)
+        self._close_sum, self._close_count = _prefix_sums(self.close)
+
+        if "Volatility_30d" in df.columns:
+            vol = df["Volatility_30d"].to_numpy(dtype=np.float64)
+            self._vol_sum, self._vol_count = _prefix_sums(vol)
+        else:
+            self._vol_sum = self._vol_count = None
+
+        # NaN ignorés comme dans pandas (skipna) : +inf pour le min, -inf pour le max
+        self._min_table = _sparse_table(np.where(np.isnan(self.close), np.inf, self.close), np.minimum)
+        self._max_table = _sparse_table(np.where(np.isnan(self.close), -np.inf, self.close), np.maximum)
+
+    def __len__(self):
+        return self.dates.shape[0]
+
+    # -----------------------------------------------------------------
+    # Requêtes vectorisées
+    # -----------------------------------------------------------------
+
+    def bounds(self, starts, ends):
+        """Indices [lo, hi) des fenêtres (recherche dichotomique sur les dates)."""
+        starts = pd.to_datetime(pd.Series(starts, dtype="object")).to_numpy(dtype="datetime64[ns]")
+        ends = pd.to_datetime(pd.Series(ends, dtype="object")).to_numpy(dtype="datetime64[ns]")
+        lo = np.where(np.isnat(starts), 0, self.dates.searchsorted(starts, side="left"))
+        hi = np.where(np.isnat(ends), len(self), self.dates.searchsorted(ends, side="right"))
+        return lo, np.maximum(hi, lo)
+
+    def _range_extreme(self, table, op, lo, hi):
+        length = np.maximum(hi - lo, 1)
+        k = np.floor(np.log2(length)).astype(np.int64)
+        right = np.maximum(hi - (1 << k), 0)
+        return op(table[k, np.minimum(lo, len(self) - 1)], table[k, right])
+
+    def summarize_many(self, starts, ends) -> pd.DataFrame:
+        """Résumés de plusieurs fenêtres en une passe (une ligne par fenêtre)."""
+        lo, hi = self.bounds(starts, ends)
+        n_rows = hi - lo
+        empty = n_rows == 0
+        first = np.minimum(lo, max(len(self) - 1, 0))
+        last = np.maximum(hi - 1, 0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            count = self._close_count[hi] - self._close_count[lo]
+            mean_price = (self._close_sum[hi] - self._close_sum[lo]) / count
+            if self._vol_sum is not None:
+                vol_count = self._vol_count[hi] - self._vol_count[lo]
+                vol_mean = (self._vol_sum[hi] - self._vol_sum[lo]) / vol_count
+            else:
+                vol_mean = np.full(lo.shape, np.nan)
+
+        if len(self):
+            min_price = self._range_extreme(self._min_table, np.minimum, lo, hi)
+            max_price = self._range_extreme(self._max_table, np.maximum, lo, hi)
+            min_price[~np.isfinite(min_price)] = np.nan
+            max_price[~np.isfinite(max_price)] = np.nan
+            first_date, last_date = self.dates[first], self.dates[last]
+            start_price, end_price = self.close[first], self.close[last]
+        else:
+            min_price = max_price = start_price = end_price = np.full(lo.shape, np.nan)
+            first_date = last_date = np.full(lo.shape, np.datetime64("NaT"), dtype="datetime64[ns]")
+
+        out = pd.DataFrame({
+            "n_rows": n_rows,
+            "first_date": first_date,
+            "last_date": last_date,
+            "start_price": start_price,
+            "end_price": end_price,
+            "min_price": min_price,
+            "max_price": max_price,
+            "mean_price": mean_price,
+            "volatility_30d_mean": vol_mean,
+        })
+        out.loc[empty, out.columns[1:]] = np.nan
+        return out
+
+    def summary(self, start_date=None, end_date=None) -> dict:
+        """Équivalent de summarize_stock sur la fenêtre, sans découper le DataFrame."""
+        row = self.summarize_many([start_date], [end_date]).iloc[0]
+        if row["n_rows"] == 0:
+            return {}
+
+        vol_mean = row["volatility_30d_mean"]
+        return {
+            "first_date": row["first_date"],
+            "last_date": row["last_date"],
+            "start_price": row["start_price"],
+            "end_price": row["end_price"],
+            "min_price": row["min_price"],
+            "max_price": row["max_price"],
+            "mean_price": row["mean_price"],
+            "volatility_30d_mean": vol_mean if self._vol_sum is not None else None,
+        }
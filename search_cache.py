@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from phi.tools.duckduckgo import DuckDuckGo
+
+# ---------------------------------------------------------------------
+# Cache des recherches web (sous l'outil DuckDuckGo des agents)
+# ---------------------------------------------------------------------
+# - clé : type de recherche + requête normalisée + nombre de résultats
+# - durée de vie courte (les actualités changent), taille bornée (LRU)
+# - résultats dédoublonnés par URL normalisée
+# - requêtes identiques simultanées : une seule requête réseau, les autres
+#   attendent son résultat
+
+SEARCH_TTL = int(os.getenv("SEARCH_CACHE_TTL", "900"))
+SEARCH_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "512"))
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "ddg")  # "fake" : backend local, sans réseau
+SEARCH_FAKE_DELAY = float(os.getenv("SEARCH_FAKE_DELAY", "0.2"))
+TRACKING_PARAMS = re.compile(r"^(utm_|fbclid$|gclid$|mc_|ref$|ncid$|guccounter$)")
+
+
+def normalize_query(query: str) -> str:
+    """Minuscules, Unicode NFKC, ponctuation retirée, mots uniques triés."""
+    text = unicodedata.normalize("NFKC", query).lower()
+    tokens = re.findall(r"[\w$.&-]+", text)
+    tokens = {t.strip(".-") for t in tokens} - {""}
+    return " ".join(sorted(tokens))
+
+
+def normalize_url(url: str) -> str:
+    """URL canonique : schéma / hôte en minuscules, sans www, fragment ni paramètres de suivi."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not TRACKING_PARAMS.match(k.lower())])
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower() or "https", host, path, query, ""))
+
+
+def dedupe_results(results: List[dict], limit: int) -> List[dict]:
+    """Garde le premier résultat de chaque URL (champ href pour le web, url pour les actualités)."""
+    seen = set()
+    unique = []
+    for item in results or []:
+        url = item.get("href") or item.get("url")
+        key = normalize_url(url) if url else json.dumps(item, sort_keys=True)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(item)
+        if len(unique) >= limit:
+            break
+    return unique
+
+
+class SearchCache:
+    def __init__(self, ttl: float = SEARCH_TTL, max_entries: int = SEARCH_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._inflight: Dict[tuple, Future] = {}
+        self.hits = self.misses = self.coalesced = 0
+
+    def get_or_fetch(self, key: tuple, fetch: Callable[[], List[dict]]) -> List[dict]:
+        """Résultat en cache, sinon fetch() — un seul appel à la fois par clé."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+
+        try:
+            results = fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            del self._inflight[key]
+        future.set_result(results)
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits,
+                    "misses": self.misses, "coalesced": self.coalesced}
+
+
+# ---------------------------------------------------------------------
+# Backends de recherche
+# ---------------------------------------------------------------------
+
+class DDGSBackend:
+    """Recherche réelle via duckduckgo_search (mêmes paramètres que l'outil phi)."""
+
+    def __init__(self, headers=None, proxy=None, proxies=None, timeout=10, verify_ssl=True):
+        self.kwargs = dict(headers=headers, proxy=proxy, proxies=proxies, timeout=timeout, verify=verify_ssl)
+
+    def text(self, query: str, max_results: int) -> List[dict]:
+        from duckduckgo_search import DDGS
+        return DDGS(**self.kwargs).text(keywords=query, max_results=max_results)
+
+    def news(self, query: str, max_results: int) -> List[dict]:
+        from duckduckgo_search import DDGS
+        return DDGS(**self.kwargs).news(keywords=query, max_results=max_results)
+
+
+class FakeSearchBackend:
+    """
+    Backend local déterministe pour les tests : délai configurable, compteur
+    d'appels, et doublons d'URL (www, paramètres utm) pour vérifier la déduplication.
+    """
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _results(self, query: str, max_results: int, url_field: str) -> List[dict]:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        slug = re.sub(r"\W+", "-", query.lower()).strip("-")
+        out = []
+        for i in range(max_results):
+            base = f"https://news.example.com/{slug}/{i // 2}"
+            url = base if i % 2 == 0 else base.replace("https://", "https://www.") + "/?utm_source=ddg"
+            out.append({"title": f"{query} #{i // 2}", url_field: url, "body": f"Résumé {i // 2}"})
+        return out
+
+    def text(self, query: str, max_results: int) -> List[dict]:
+        return self._results(query, max_results, "href")
+
+    def news(self, query: str, max_results: int) -> List[dict]:
+        return self._results(query, max_results, "url")
+
+
+# ---------------------------------------------------------------------
+# Outil phi avec cache
+# ---------------------------------------------------------------------
+
+_shared_cache = SearchCache()
+
+
+class CachedDuckDuckGo(DuckDuckGo):
+    """DuckDuckGo de phi avec cache TTL, déduplication d'URL et requêtes simultanées regroupées."""
+
+    def __init__(self, backend=None, cache: Optional[SearchCache] = None, **kwargs):
+        super().__init__(**kwargs)
+        if backend is None and SEARCH_BACKEND == "fake":
+            backend = FakeSearchBackend(SEARCH_FAKE_DELAY)
+        self.backend = backend or DDGSBackend(self.headers, self.proxy, self.proxies,
+                                              self.timeout, self.verify_ssl)
+        self.cache = cache or _shared_cache
+
+    def _search(self, kind: str, query: str, max_results: int) -> str:
+        if self.modifier:
+            query = f"{self.modifier} {query}"
+        limit = self.fixed_max_results or max_results
+        key = (kind, normalize_query(query), limit)
+        fetch = getattr(self.backend, kind)
+        # quelques résultats de plus pour compenser les doublons retirés
+        results = self.cache.get_or_fetch(key, lambda: dedupe_results(fetch(query, limit + 3), limit))
+        return json.dumps(results, indent=2)
+
+    def duckduckgo_search(self, query: str, max_results: int = 5) -> str:
+        """Use this function to search DuckDuckGo for a query.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The result from DuckDuckGo.
+        """
+        return self._search("text", query, max_results)
+
+    def duckduckgo_news(self, query: str, max_results: int = 5) -> str:
+        """Use this function to get the latest news from DuckDuckGo.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The latest news from DuckDuckGo.
+        """
+        return self._search("news", query, max_results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Démonstration du cache de recherche (backend local).")
+    parser.add_argument("--clients", type=int, default=20, help="Requêtes simultanées identiques")
+    parser.add_argument("--delay", type=float, default=0.5, help="Latence simulée du backend (s)")
+    args = parser.parse_args()
+
+    backend = FakeSearchBackend(delay=args.delay)
+    tool = CachedDuckDuckGo(backend=backend, cache=SearchCache(ttl=60), fixed_max_results=3)
+    queries = ["AAPL stock news", "  aapl  STOCK news ", "news AAPL stock"]
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        answers = list(pool.map(lambda i: tool.duckduckgo_news(queries[i % len(queries)]), range(args.clients)))
+    print(f"{args.clients} requêtes simultanées en {time.perf_counter() - t0:.2f}s, "
+          f"appels au backend : {backend.calls}")
+
+    t0 = time.perf_counter()
+    tool.duckduckgo_news("AAPL stock news")
+    print(f"Requête suivante (cache) : {(time.perf_counter() - t0) * 1000:.2f} ms")
+    print(f"Statistiques : {tool.cache.stats()}")
+    print(f"Résultats dédoublonnés : {[r['url'] for r in json.loads(answers[0])]}")
@@ -1,17 +1,30 @@
 import streamlit as st
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 import pandas as pd
-import requests
 import json
 
-from analysis_stock_data import get_stock_with_indicators
+from analysis_stock_data import load_data, slice_by_dates
+from app.features import WARMUP_ROWS, latest_feature_payload
 from financial_agent import (
+    AGENT_TIMEOUT,
+    PREDICT_TIMEOUT,
     get_base_summary,
     financial_agent,
+    iter_task_events,
+    submit_streaming_tasks,
     web_news_agent,
 )
-from compare_stocks_app import show_comparison_page
+from compare_stocks_app import render_correlation_section, show_comparison_page
+from downsample import ChartRecorder
+from llm_cache import NEWS_TTL, QUANT_TTL, cached_stream
+from panel import load_panel
+from prediction_client import feature_payloads, get_prediction_client, predictions_frame
+from prompt_budget import PromptBudgetExceeded, build_news_prompt, build_quant_prompt
 
 
 @st.cache_data
@@ -153,17 +166,103 @@ def parse_date_or_none(s: str):
 
 
 def get_api_prediction(features: dict):
-    """Appelle l'API locale pour prédire le mouvement."""
-    url = "http://localhost:8000/predict"
-    try:
-        response = requests.post(url, json=features, timeout=5)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return {"error": f"Status {response.status_code}", "details": response.text}
-    except Exception as e:
-        return {"error": "Connection error", "details": str(e)}
+    """Appelle l'API locale pour prédire le mouvement (session partagée, cache court)."""
+    return get_prediction_client().predict(features)
+
+
+STREAM_REFRESH_SECONDS = 0.05
+
+
+def render_stream_metrics(run) -> str:
+    """Légende des temps de réponse d'un agent (1er fragment, total)."""
+    if run is None or run.first_token_seconds is None:
+        return ""
+    source = " · cache" if run.cached else ""
+    return f"⏱️ 1er fragment : {run.first_token_seconds:.2f} s · total : {run.total_seconds:.2f} s{source}"
+
 
+def render_prediction(pred_res: dict):
+    """Affiche le résultat de /predict (dans le conteneur courant)."""
+    if "error" in pred_res:
+        st.warning(f"API non disponible : {pred_res['error']} - {pred_res.get('details', '')}")
+        return
+
+    col_p1, col_p2 = st.columns(2)
+    prob = pred_res.get("churn_probability", 0.0)
+    risk = pred_res.get("risk_level", "Unknown")
+
+    with col_p1:
+        st.metric("Probabilité de Hausse (Demain)", f"{prob:.1%}")
+    with col_p2:
+        st.metric("Niveau de Risque", risk)
+
+    drift = pred_res.get("drift_warning", False)
+    if drift:
+        st.warning("⚠️ Attention : Dérive de données détectée (Drift) !")
+
+
+
+# ---------------------------------------------------------------------
+# Mémoïsation des analyses complètes
+# ---------------------------------------------------------------------
+# Streamlit relance tout le script à chaque interaction : le résultat d'une
+# analyse (données, résumé, textes des agents, prédiction) est gardé, par
+# (ticker, début, fin), dans la session (réaffichage après un clic sur un
+# autre widget) et dans un cache partagé borné (autres sessions, nouveau clic
+# sur « Lancer »). Durée de vie : celle des actualités.
+
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "32"))
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", str(NEWS_TTL)))
+
+
+class AnalysisStore:
+    """LRU borné avec durée de vie, partagé entre les sessions (valeurs en lecture seule)."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, value: dict):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+@st.cache_resource(show_spinner=False)
+def get_analysis_store() -> AnalysisStore:
+    return AnalysisStore(ANALYSIS_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_TTL)
+
+
+def render_agent_result(slot, name: str, result: dict):
+    """Texte final d'un agent (ou son erreur) dans son emplacement."""
+    if result.get("error") is not None:
+        if name == "quant":
+            slot.error(f"Erreur lors de l'analyse IA : {result['error']}")
+        else:
+            slot.warning("Indisponible (limite API ou réseau).")
+        return
+    with slot.container():
+        if name == "quant":
+            st.info(result["content"])
+        else:
+            st.markdown(result["content"])
+        if result.get("caption"):
+            st.caption(result["caption"])
 
 
 # ---------------------------------------------------------------------
@@ -222,44 +321,71 @@ if not ticker:
 
 st.title(f"Analyse Financière : {ticker}")
 
+start_date = parse_date_or_none(start_input)
+end_date = parse_date_or_none(end_input)
+analysis_key = (ticker, start_date, end_date)
+
+# Résultat déjà calculé : cache partagé sur « Lancer », sinon celui de la session
+memo = None
 if lancer:
-    start_date = parse_date_or_none(start_input)
-    end_date = parse_date_or_none(end_input)
+    memo = get_analysis_store().get(analysis_key)
+    if memo is not None:
+        st.session_state["analysis_key"] = analysis_key
+        st.session_state["analysis"] = memo
+elif st.session_state.get("analysis_key") == analysis_key:
+    memo = st.session_state.get("analysis")
+live = lancer and memo is None
+
+if live or memo is not None:
+    # graphiques sous-échantillonnés à la largeur d'affichage (downsample.py)
+    charts = ChartRecorder()
+
+    if live:
+        with st.spinner(f"Analyse de {ticker} en cours..."):
+            df_with_ind, base_text, summary_dict = get_base_summary(
+                ticker, start_date, end_date, warmup=True
+            )
+    else:
+        df_with_ind, summary_dict = memo["df"], memo["summary"]
 
-    with st.spinner(f"Analyse de {ticker} en cours..."):
-        df_with_ind, base_text, summary_dict = get_base_summary(
-            ticker, start_date, end_date
-        )
-        tech_text = summary_dict.get("technical_text")
+    tech_text = summary_dict.get("technical_text")
 
-        if tech_text:
-            st.markdown("### ⚙️ Synthèse des signaux techniques")
-            st.info(tech_text)
+    if tech_text:
+        st.markdown("### ⚙️ Synthèse des signaux techniques")
+        st.info(tech_text)
 
 
-        if not summary_dict and df_with_ind.empty:
-            st.error(f"Aucune donnée trouvée pour {ticker} sur la période demandée.")
-            st.stop()
+    if not summary_dict and df_with_ind.empty:
+        st.error(f"Aucune donnée trouvée pour {ticker} sur la période demandée.")
+        st.stop()
 
-        price_prompt = (
-            f"Voici un résumé pour {ticker}:\n{base_text}\n"
-            "Rédige une analyse financière structurée (Tendance, Risques, Opportunités)."
-        )
-        try:
-            price_run = financial_agent.run(price_prompt)
-            quant_analysis = price_run.content
-        except Exception as e:
-            quant_analysis = f"Erreur lors de l'analyse IA : {str(e)}"
-
-        news_prompt = (
-            f"Trouve les dernières actualités financières importantes pour {ticker}. "
-            "Résume en 3 points clés avec titres."
-        )
+    handles, events = {}, None
+    if live:
+
+        # Les deux prompts passent par prompt_budget (PROMPT_MODE, PROMPT_TOKEN_BUDGET)
         try:
-            news_run = web_news_agent.run(news_prompt)
-            news_content = news_run.content
-        except Exception:
-            news_content = "Indisponible (limite API ou réseau)."
+            price_prompt, _ = build_quant_prompt(ticker, summary_dict, df_with_ind,
+                                                 agent=financial_agent, base_text=base_text)
+            news_prompt, _ = build_news_prompt(ticker, agent=web_news_agent)
+        except PromptBudgetExceeded as e:
+            st.error(f"Prompt trop long pour le budget de tokens (PROMPT_TOKEN_BUDGET) : {e}")
+            st.stop()
+
+        # Les deux agents et /predict sont des attentes réseau indépendantes :
+        # on les lance tous maintenant ; le texte des agents est affiché au fil
+        # de la génération et /predict dès sa réponse (voir la fin de la page)
+        streams = {
+            "quant": lambda: cached_stream(financial_agent, price_prompt, ttl=QUANT_TTL),
+            "news": lambda: cached_stream(web_news_agent, news_prompt, ttl=NEWS_TTL),
+        }
+        tasks = {}
+        if not df_with_ind.empty:
+            # Mêmes features qu'à l'entraînement (app.features), calculées sur
+            # l'historique brut précédant la dernière ligne de la période
+            history = slice_by_dates(load_data(ticker), None, df_with_ind["Date"].iloc[-1])
+            api_payload = latest_feature_payload(history.tail(WARMUP_ROWS))
+            tasks["predict"] = lambda: get_api_prediction(api_payload)
+        handles, events = submit_streaming_tasks(streams, tasks)
 
     # Indicateurs clés
     st.markdown("### 📊 Indicateurs Clés")
@@ -299,53 +425,15 @@ if lancer:
     # --- SECTION PREDICTION API ---
     st.markdown("### 🔮 Prédiction IA (Modèle Local)")
 
-    # Préparation des données pour l'API (dernière ligne connue du dataset, pas forcément aujourd'hui)
-    if not df_with_ind.empty:
-        last_row = df_with_ind.iloc[-1]
-        
-        # Fallback pour Adj Close si absent
-        adj_close_val = last_row["Close"]
-        if "Adj Close" in df_with_ind.columns:
-            adj_close_val = last_row["Adj Close"]
-        elif "Adj_Close" in df_with_ind.columns:
-            adj_close_val = last_row["Adj_Close"]
-
-        # Helper pour nettoyer les NaNs (JSON standard n'aime pas NaN)
-        def clean_float(val):
-            return float(val) if pd.notna(val) else 0.0
-
-        # Construction du payload
-        api_payload = {
-            "Open": clean_float(last_row["Open"]),
-            "High": clean_float(last_row["High"]),
-            "Low": clean_float(last_row["Low"]),
-            "Close": clean_float(last_row["Close"]),
-            "Volume": int(last_row["Volume"]) if pd.notna(last_row["Volume"]) else 0,
-            "Adj_Close": clean_float(adj_close_val)
-        }
-
-        with st.spinner("Interrogation du modèle de prédiction..."):
-            pred_res = get_api_prediction(api_payload)
-        
-        if "error" in pred_res:
-            st.warning(f"API non disponible : {pred_res['error']} - {pred_res.get('details', '')}")
-
-        else:
-            # Affichage du résultat
-            col_p1, col_p2 = st.columns(2)
-            prob = pred_res.get("prediction_probability", 0.0)
-            risk = pred_res.get("risk_level", "Unknown")
-            
-            with col_p1:
-                st.metric("Probabilité de Hausse (Demain)", f"{prob:.1%}")
-            with col_p2:
-                st.metric("Niveau de Risque", risk)
-            
-            drift = pred_res.get("drift_warning", False)
-            if drift:
-                st.warning("⚠️ Attention : Dérive de données détectée (Drift) !")
+    # Prédiction sur la dernière ligne connue du dataset (pas forcément aujourd'hui)
+    predict_slot = st.empty()
+    if "predict" in handles:
+        predict_slot.info("⏳ Interrogation du modèle de prédiction...")
+    elif memo is not None and memo["prediction"] is not None:
+        with predict_slot.container():
+            render_prediction(memo["prediction"])
     else:
-        st.info("Pas assez de données pour faire une prédiction.")
+        predict_slot.info("Pas assez de données pour faire une prédiction.")
 
     st.markdown("---")
 
@@ -356,14 +444,16 @@ if lancer:
 
     with col_analysis:
         st.subheader("💡 Analyse Quantitative")
-        st.info(quant_analysis)
+        quant_slot = st.empty()
+        if live:
+            quant_slot.info("⏳ Analyse IA en cours...")
 
         st.subheader("📈 Graphiques")
         tab1, tab2 = st.tabs(["Prix", "Volume"])
         with tab1:
-            st.line_chart(df_with_ind.set_index("Date")[["Close"]])
+            charts.line(df_with_ind.set_index("Date")[["Close"]], 2 / 3, "Prix")
         with tab2:
-            st.bar_chart(df_with_ind.set_index("Date")[["Volume"]])
+            charts.bar(df_with_ind.set_index("Date")[["Volume"]], 2 / 3, "Volume")
 
     tech_text = summary_dict.get("technical_text")
     if tech_text:
@@ -372,7 +462,9 @@ if lancer:
 
     with col_news:
         st.subheader("📰 Actualités")
-        st.markdown(news_content)
+        news_slot = st.empty()
+        if live:
+            news_slot.info("⏳ Recherche d'actualités en cours...")
 
     # Comparaison locale autour du ticker sélectionné
     if compare_mode:
@@ -385,45 +477,26 @@ if lancer:
         )
 
         if multiselect_tickers:
-            tickers_to_compare = [ticker] + multiselect_tickers
-            data_dict = {}
-
-            for t in tickers_to_compare:
-                d, _ = get_stock_with_indicators(t, start_date, end_date)
-                if d.empty:
-                    st.warning(f"⚠️ Données insuffisantes pour {t} (ignoré).")
-                    continue
-                d = d.rename(columns={"Date": "Date", "Close": "Close", "Volume": "Volume"})
-                d["Ticker"] = t
-                data_dict[t] = d.sort_values("Date")
-
-            valid_tickers = list(data_dict.keys())
+            # Séries alignées par date, construites une fois par (sélection, période)
+            panel = load_panel(tuple([ticker] + multiselect_tickers), start_date, end_date)
+            for t in panel.missing:
+                st.warning(f"⚠️ Données insuffisantes pour {t} (ignoré).")
 
-            if not valid_tickers:
+            if panel.empty:
                 st.error("Aucune donnée valide pour la comparaison.")
             else:
                 st.subheader("Performance Relative (%)")
-                perf_dfs = []
-                for t in valid_tickers:
-                    df_t = data_dict[t].copy()
-                    first_close = df_t["Close"].iloc[0]
-                    if first_close > 0:
-                        df_t["Performance"] = ((df_t["Close"] / first_close) - 1) * 100
-                        perf_dfs.append(df_t[["Date", "Ticker", "Performance"]])
-
-                if perf_dfs:
-                    perf_all = pd.concat(perf_dfs)
-                    perf_pivot = perf_all.pivot_table(
-                        index="Date", columns="Ticker", values="Performance"
-                    )
-                    st.line_chart(perf_pivot)
-
-                with st.expander("Voir les données brutes"):
-                    cols = st.columns(len(valid_tickers))
-                    for idx, t in enumerate(valid_tickers):
-                        with cols[idx]:
-                            st.caption(t)
-                            st.dataframe(data_dict[t].head())
+                charts.line(panel.frame(panel.normalized_performance()), 1.0, "Performance relative")
+
+                render_correlation_section(panel, charts, key="compare_mode")
+
+                # Prédictions de tous les tickers comparés : un seul appel /predict/batch
+                st.subheader("🔮 Prédictions du modèle")
+                predictions = get_prediction_client().predict_many(feature_payloads(panel.last_dates()))
+                st.dataframe(predictions_frame(predictions), use_container_width=True, hide_index=True)
+
+                with st.expander("Voir le résumé par ticker"):
+                    st.dataframe(panel.summary(), use_container_width=True)
         # 3bis. Indicateurs techniques (si disponibles dans df_with_ind)
     st.markdown("---")
     st.markdown("### 📊 Indicateurs techniques")
@@ -440,9 +513,10 @@ if lancer:
             st.markdown("#### Courbes de moyennes mobiles")
             ma_cols = [c for c in ["MA_short", "MA_long"] if c in tech_cols]
             if ma_cols:
-                st.line_chart(
+                charts.line(
                     df_with_ind.set_index("Date")[["Close"] + ma_cols]
-                    .dropna()
+                    .dropna(),
+                    1 / 2, "Moyennes mobiles",
                 )
             else:
                 st.caption("Moyennes mobiles non disponibles.")
@@ -453,16 +527,14 @@ if lancer:
             rsi_cols = [c for c in ["RSI_14"] if c in tech_cols]
 
             if vol_cols:
-                st.line_chart(
-                    df_with_ind.set_index("Date")[vol_cols].dropna()
-                )
+                charts.line(df_with_ind.set_index("Date")[vol_cols].dropna(), 1 / 2, "Volatilité")
             if rsi_cols:
-                st.line_chart(
-                    df_with_ind.set_index("Date")[rsi_cols].dropna()
-                )
+                charts.line(df_with_ind.set_index("Date")[rsi_cols].dropna(), 1 / 2, "RSI")
             if not vol_cols and not rsi_cols:
                 st.caption("Aucun indicateur de volatilité ou RSI disponible.")
 
+    charts.show_report()
+
     st.markdown("### 📥 Export des données")
 
     csv_bytes = _to_csv_bytes(df_with_ind)
@@ -474,3 +546,48 @@ if lancer:
         mime="text/csv",
         use_container_width=True,
     )
+
+    # Résultats des agents (en streaming) et de /predict, affichés au fur et à mesure
+    slots = {"quant": quant_slot, "news": news_slot}
+    if not live:
+        for name, slot in slots.items():
+            render_agent_result(slot, name, memo[name])
+    else:
+        timeouts = {"quant": AGENT_TIMEOUT, "news": AGENT_TIMEOUT, "predict": PREDICT_TIMEOUT}
+        texts = {"quant": "", "news": ""}
+        last_render = {"quant": 0.0, "news": 0.0}
+        results = {"quant": None, "news": None, "prediction": None}
+
+        for event in iter_task_events(handles, events, timeouts):
+            if event.name == "predict":
+                if event.error is not None:
+                    results["prediction"] = {"error": "Timeout", "details": str(event.error)}
+                else:
+                    results["prediction"] = event.value
+                with predict_slot.container():
+                    render_prediction(results["prediction"])
+                continue
+
+            slot = slots[event.name]
+            if event.kind == "delta":
+                texts[event.name] += event.value
+                # limite le nombre de rafraîchissements envoyés au navigateur
+                if event.seconds - last_render[event.name] >= STREAM_REFRESH_SECONDS:
+                    last_render[event.name] = event.seconds
+                    slot.markdown(texts[event.name] + " ▌")
+                continue
+            if event.error is not None:
+                results[event.name] = {"content": None, "caption": None, "error": str(event.error)}
+            else:
+                results[event.name] = {"content": event.value.content,
+                                       "caption": render_stream_metrics(event.value), "error": None}
+            render_agent_result(slot, event.name, results[event.name])
+
+        # Mémoïsation : la session garde toujours le dernier résultat ; le cache
+        # partagé seulement les résultats complets (sans erreur ni délai dépassé)
+        analysis = {"df": df_with_ind, "summary": summary_dict, **results}
+        st.session_state["analysis_key"] = analysis_key
+        st.session_state["analysis"] = analysis
+        prediction_ok = results["prediction"] is None or "error" not in results["prediction"]
+        if results["quant"]["error"] is None and results["news"]["error"] is None and prediction_ok:
+            get_analysis_store().put(analysis_key, analysis)
@@ -1,61 +1,540 @@
 import pandas as pd
 import numpy as np
-import joblib
+import argparse
+import json
 import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 
+from app.drift_detect import reference_histograms_from_matrix
+from app.features import (
+    FEATURE_COLUMNS,
+    WARMUP_ROWS,
+    compute_feature_frame,
+    feature_cache_key,
+)
+from app.registry import ModelRegistry, data_fingerprint
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 # Configuration
-DATA_PATH = "data/stocks/AAPL.csv"
+DATA_DIR = "data/stocks"
 MODEL_DIR = "model"
-MODEL_PATH = f"{MODEL_DIR}/finance_model.pkl"
+MANIFEST_PATH = f"{MODEL_DIR}/train_manifest.json"
+FEATURE_CACHE_DIR = f"{MODEL_DIR}/feature_cache"
+FEATURE_CACHE_KEEP = int(os.getenv("FEATURE_CACHE_KEEP", "3"))  # entrées gardées (plus récentes)
+BENCHMARK_ROWS = 1000
+
+CHUNK_SIZE = 50_000
+TEST_FRACTION = 0.2
+
+
+# ---------------------------------------------------------------------
+# Lecture d'un ticker par morceaux
+# ---------------------------------------------------------------------
+
+def iter_training_chunks(csv_path, chunksize: int = CHUNK_SIZE, since=None):
+    """
+    Lit le CSV d'un ticker par morceaux et produit (dates, X, y) avec les
+    features de app.features.
+    Target : 1 si le cours de clôture du lendemain est plus haut, 0 sinon.
+    Les WARMUP_ROWS dernières lignes de chaque morceau sont reportées sur le
+    suivant : indicateurs et target sont ainsi calculés à cheval sur deux
+    morceaux, sans jamais sortir du ticker. La toute dernière ligne (lendemain
+    inconnu) et les lignes de préchauffage (indicateurs incomplets) sont écartées.
+    Si since (filigrane) est fourni, seules les lignes postérieures sont
+    produites : les morceaux entièrement antérieurs ne servent qu'à alimenter
+    le report, sans calcul de features.
+    """
+    since = np.datetime64(since) if since is not None else None
+    carry = None
+    for chunk in pd.read_csv(csv_path, parse_dates=["Date"], chunksize=chunksize):
+        start = 0
+        if carry is not None:
+            # la dernière ligne reportée n'a pas encore été produite (target inconnue)
+            start = len(carry) - 1
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+
+        if not chunk["Date"].is_monotonic_increasing:
+            raise ValueError("Dates non triées")
+
+        if since is not None:
+            # dates triées : nombre de lignes <= since = index de la 1re nouvelle ligne
+            first_new = int((chunk["Date"].to_numpy() <= since).sum())
+            if first_new >= len(chunk) - 1:
+                # rien à produire dans ce morceau (la dernière ligne attend le suivant)
+                carry = chunk.iloc[-WARMUP_ROWS:]
+                continue
+            # on ne garde que le préchauffage nécessaire avant la 1re nouvelle ligne
+            cut = max(first_new - WARMUP_ROWS, 0)
+            if cut:
+                chunk = chunk.iloc[cut:].reset_index(drop=True)
+                start = max(start - cut, 0)
+            start = max(start, first_new - cut)
+
+        frame = compute_feature_frame(chunk)
+        next_close = frame['Close'].shift(-1)
+        body = frame.iloc[start:-1]
+        target = (next_close.iloc[start:-1] > body['Close']).astype(np.int8)
+        valid = body[FEATURE_COLUMNS].notna().all(axis=1) & next_close.iloc[start:-1].notna()
+
+        carry = chunk.iloc[-WARMUP_ROWS:]
+        yield (
+            body.loc[valid, "Date"].to_numpy(),
+            body.loc[valid, FEATURE_COLUMNS].to_numpy(dtype=np.float32),
+            target[valid].to_numpy(),
+        )
+
+
+def _prepare_ticker(args):
+    """
+    Worker : construit les lignes d'entraînement d'un ticker et les écrit
+    dans parts_dir (train = lignes les plus anciennes, test = test_fraction
+    les plus récentes). Si since est fourni, seules les lignes postérieures
+    à cette date (filigrane) sont lues jusqu'au calcul des features.
+    """
+    csv_path, parts_dir, chunksize, test_fraction, since = args
+    ticker = Path(csv_path).stem
+    info = {"ticker": ticker, "train": 0, "test": 0, "last_train_date": None, "error": None}
+    try:
+        dates, X, y = [], [], []
+        for d, X_chunk, y_chunk in iter_training_chunks(csv_path, chunksize, since):
+            dates.append(d)
+            X.append(X_chunk)
+            y.append(y_chunk)
+
+        dates = np.concatenate(dates) if dates else np.array([], dtype="datetime64[ns]")
+        if not len(dates):
+            info["error"] = "aucune nouvelle ligne" if since is not None else "aucune ligne exploitable"
+            return info
+        X, y = np.concatenate(X), np.concatenate(y)
+
+        split = int(len(y) * (1 - test_fraction))
+        out = Path(parts_dir)
+        np.save(out / f"{ticker}.train_X.npy", X[:split])
+        np.save(out / f"{ticker}.train_y.npy", y[:split])
+        np.save(out / f"{ticker}.train_dates.npy", dates[:split])
+        np.save(out / f"{ticker}.test_X.npy", X[split:])
+        np.save(out / f"{ticker}.test_y.npy", y[split:])
+        np.save(out / f"{ticker}.test_dates.npy", dates[split:])
+        info.update(train=split, test=len(y) - split)
+        if split:
+            info["last_train_date"] = str(pd.Timestamp(dates[split - 1]).date())
+        return info
+    except Exception as e:
+        info["error"] = str(e)
+        return info
 
-def train():
-    print(f"Chargement des données depuis {DATA_PATH}...")
-    if not os.path.exists(DATA_PATH):
-        print(f"Erreur: Fichier {DATA_PATH} introuvable.")
-        return
 
-    df = pd.read_csv(DATA_PATH, parse_dates=["Date"])
-    df = df.sort_values("Date")
-    
-    # Nettoyage et préparation
-    if 'Adj Close' in df.columns:
-        df.rename(columns={'Adj Close': 'Adj_Close'}, inplace=True)
-    
-    required_cols = ['Open', 'High', 'Low', 'Close', 'Volume', 'Adj_Close']
-    missing = [c for c in required_cols if c not in df.columns]
-    if missing:
-        print(f"Colonnes manquantes: {missing}")
-        # Si Adj_Close manque, on utilise Close
-        if 'Adj_Close' in missing and 'Close' in df.columns:
-             print("Utilisation de Close comme Adj_Close")
-             df['Adj_Close'] = df['Close']
-             required_cols = [c for c in required_cols if c != 'Adj_Close'] + ['Adj_Close']
+def _assemble(parts_dir: Path, tickers, counts, split: str, out_dir: Path):
+    """Concatène les morceaux de chaque ticker dans des matrices memmap sur disque."""
+    total = sum(counts[t] for t in tickers)
+    X = np.lib.format.open_memmap(out_dir / f"{split}_X.npy", mode="w+",
+                                  dtype=np.float32, shape=(total, len(FEATURE_COLUMNS)))
+    y = np.lib.format.open_memmap(out_dir / f"{split}_y.npy", mode="w+",
+                                  dtype=np.int8, shape=(total,))
+    dates = np.lib.format.open_memmap(out_dir / f"{split}_dates.npy", mode="w+",
+                                      dtype="datetime64[ns]", shape=(total,))
+    pos = 0
+    for t in tickers:
+        n = counts[t]
+        if n:
+            X[pos:pos + n] = np.load(parts_dir / f"{t}.{split}_X.npy")
+            y[pos:pos + n] = np.load(parts_dir / f"{t}.{split}_y.npy")
+            dates[pos:pos + n] = np.load(parts_dir / f"{t}.{split}_dates.npy")
+        pos += n
+    for arr in (X, y, dates):
+        arr.flush()
+
+
+class TrainingMatrices:
+    """
+    Matrices d'entraînement matérialisées en .npy dans un dossier de cache :
+    ouvertes en memmap (lecture seule), partageables entre processus.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.infos = meta["infos"]
+        self.kept = meta["kept"]
+        self.features = meta["features"]
+
+    def load(self, split: str):
+        """(X, y, dates) du split 'train' ou 'test', en memmap."""
+        return tuple(np.load(self.path / f"{split}_{name}.npy", mmap_mode="r")
+                     for name in ("X", "y", "dates"))
+
+
+def prune_feature_cache(cache_dir: str = FEATURE_CACHE_DIR, current: str = None,
+                        keep: int = FEATURE_CACHE_KEEP) -> list:
+    """
+    Supprime les entrées du cache sauf la clé courante et les `keep` plus
+    récemment utilisées (chaque nouvelle empreinte de données crée une copie
+    complète des matrices). Les constructions en cours (<clé>.xxx) sont ignorées.
+    Retourne les clés supprimées.
+    """
+    cache_dir = Path(cache_dir)
+    if not cache_dir.is_dir():
+        return []
+    entries = sorted((p for p in cache_dir.iterdir()
+                      if p.is_dir() and "." not in p.name and (p / "meta.json").exists()),
+                     key=lambda p: p.stat().st_mtime, reverse=True)
+    kept = {p.name for p in entries[:max(keep, 1)]}
+    if current:
+        kept.add(current)
+    removed = []
+    for p in entries:
+        if p.name not in kept:
+            shutil.rmtree(p, ignore_errors=True)
+            removed.append(p.name)
+    return removed
+
+
+def build_training_matrices(csv_paths, workers: int, chunksize: int = CHUNK_SIZE,
+                            test_fraction: float = TEST_FRACTION, watermarks: dict = None,
+                            cache_dir: str = FEATURE_CACHE_DIR, rebuild: bool = False):
+    """
+    Préparation parallèle de tous les tickers (un ticker par tâche) puis
+    assemblage en matrices memmap train/test. Le résultat est mis en cache sous
+    cache_dir/<clé> (empreinte des données + version des features) : les
+    entraînements et évaluations suivants sur les mêmes données ne reconstruisent rien.
+    Après une construction réussie, les anciennes entrées sont purgées
+    (prune_feature_cache, FEATURE_CACHE_KEEP).
+    Retourne (TrainingMatrices, depuis_le_cache).
+    """
+    watermarks = watermarks or {}
+    key = feature_cache_key(data_fingerprint(csv_paths), test_fraction=test_fraction,
+                            watermarks=watermarks)
+    target = Path(cache_dir) / key
+    if target.exists() and not rebuild:
+        os.utime(target)  # date de dernière utilisation, pour la purge
+        return TrainingMatrices(target), True
+
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    work_dir = Path(tempfile.mkdtemp(prefix=f"{key}.", dir=cache_dir))
+    try:
+        parts_dir = work_dir / "parts"
+        parts_dir.mkdir()
+
+        tasks = [(str(p), str(parts_dir), chunksize, test_fraction, watermarks.get(Path(p).stem))
+                 for p in csv_paths]
+        if workers == 1:
+            results = [_prepare_ticker(t) for t in tasks]
         else:
-            return
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_prepare_ticker, tasks,
+                                            chunksize=max(1, len(tasks) // (workers * 4))))
+
+        infos = {r["ticker"]: r for r in results}
+        kept = [r["ticker"] for r in results if r["error"] is None]
+        _assemble(parts_dir, kept, {t: infos[t]["train"] for t in kept}, "train", work_dir)
+        _assemble(parts_dir, kept, {t: infos[t]["test"] for t in kept}, "test", work_dir)
+        shutil.rmtree(parts_dir)
+
+        with open(work_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"infos": infos, "kept": kept, "features": FEATURE_COLUMNS}, f, indent=2)
+        if rebuild and target.exists():
+            shutil.rmtree(target)
+        os.replace(work_dir, target)
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    removed = prune_feature_cache(cache_dir, current=key)
+    if removed:
+        print(f"Cache de features : {len(removed)} ancienne(s) entrée(s) supprimée(s)")
+    return TrainingMatrices(target), False
+
+
+def _csv_paths(data_dir: Path, tickers=None):
+    if tickers:
+        return [p for p in (data_dir / f"{t}.csv" for t in tickers) if p.exists()]
+    return sorted(data_dir.glob("*.csv"))
+
 
-    # Création de la target : 1 si le prix monte le lendemain, 0 sinon
-    df['Target'] = (df['Close'].shift(-1) > df['Close']).astype(int)
-    df = df.dropna()
+def _watermarks(infos: dict, previous: dict = None) -> dict:
+    """Dernière date apprise par ticker (filigrane de l'entraînement incrémental)."""
+    updated = dict(previous or {})
+    for t, info in infos.items():
+        if info["error"] is None and info["last_train_date"]:
+            updated[t] = info["last_train_date"]
+    return dict(sorted(updated.items()))
 
-    X = df[required_cols]
-    y = df['Target']
 
-    print(f"Entraînement sur {len(df)} lignes pour AAPL...")
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+def _benchmark_sample(X_test, X_train) -> np.ndarray:
+    source = X_test if len(X_test) else X_train
+    return np.asarray(source[:BENCHMARK_ROWS])
 
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
+
+def _peak_memory_mb():
+    """Pic de mémoire résidente (processus principal, workers) en Mo."""
+    if resource is None:
+        return None, None
+    # ru_maxrss est en Ko sous Linux
+    main = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return round(main, 1), round(children, 1)
+
+
+def _predict_in_batches(model, X, batch_size: int = 200_000) -> np.ndarray:
+    return np.concatenate([model.predict(X[i:i + batch_size])
+                           for i in range(0, len(X), batch_size)]) if len(X) else np.array([])
+
+
+# ---------------------------------------------------------------------
+# Entraînement
+# ---------------------------------------------------------------------
+
+def train(tickers=None,
+          data_dir: str = DATA_DIR,
+          workers: int = None,
+          chunksize: int = CHUNK_SIZE,
+          n_estimators: int = 100,
+          max_samples: int = 500_000,
+          max_depth: int = None,
+          min_samples_leaf: int = 1,
+          manifest_path: str = MANIFEST_PATH,
+          promote: bool = True,
+          rebuild_features: bool = False):
+    data_dir = Path(data_dir)
+    print(f"Chargement des données depuis {data_dir}...")
+    csv_paths = _csv_paths(data_dir, tickers)
+    if not csv_paths:
+        print(f"Erreur: aucun fichier CSV trouvé dans {data_dir}.")
+        return
+
+    # 1) Préparation parallèle, un ticker à la fois par worker (ou cache)
+    t0 = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    matrices, from_cache = build_training_matrices(csv_paths, workers, chunksize,
+                                                   rebuild=rebuild_features)
+    infos, kept = matrices.infos, matrices.kept
+    if not kept:
+        print("Erreur: aucun ticker exploitable.")
+        return
+    X_train, y_train, _ = matrices.load("train")
+    X_test, y_test, _ = matrices.load("test")
+    skipped = {t: i["error"] for t, i in infos.items() if i["error"] is not None}
+    train_counts = {t: infos[t]["train"] for t in kept}
+    test_counts = {t: infos[t]["test"] for t in kept}
+    prep_seconds = time.perf_counter() - t0
+    print(f"Matrices de features {'lues depuis le cache' if from_cache else 'construites'} "
+          f"({matrices.path}) en {prep_seconds:.2f}s")
+
+    # 2) Entraînement sur tous les cœurs
+    print(f"Entraînement sur {len(y_train)} lignes ({len(kept)} tickers)...")
+    t0 = time.perf_counter()
+    model = RandomForestClassifier(
+        n_estimators=n_estimators,
+        max_samples=min(max_samples, len(y_train)) if max_samples else None,
+        max_depth=max_depth,
+        min_samples_leaf=min_samples_leaf,
+        n_jobs=-1,
+        random_state=42,
+    )
     model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - t0
 
-    acc = accuracy_score(y_test, model.predict(X_test))
+    acc = accuracy_score(y_test, _predict_in_batches(model, X_test)) if len(y_test) else float("nan")
     print(f"Précision du modèle sur test set: {acc:.2f}")
 
-    # Sauvegarde
-    os.makedirs(MODEL_DIR, exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
-    print(f"Modèle sauvegardé dans {MODEL_PATH}")
+    # Service : prédictions ligne par ligne, un seul thread évite le surcoût joblib
+    model.set_params(n_jobs=1)
+
+    # Sauvegarde dans le registre (les filigranes permettent l'incrémental :
+    # les lignes de test récentes seront apprises au prochain incrément)
+    params = {"n_estimators": n_estimators, "max_samples": max_samples,
+              "max_depth": max_depth, "min_samples_leaf": min_samples_leaf,
+              "workers": workers, "chunksize": chunksize}
+    registry = ModelRegistry()
+    version = registry.register(
+        model,
+        features=FEATURE_COLUMNS,
+        data_fingerprint=data_fingerprint([data_dir / f"{t}.csv" for t in kept]),
+        accuracy=acc,
+        benchmark_sample=_benchmark_sample(X_test, X_train),
+        params=params,
+        extra={"mode": "full", "watermarks": _watermarks(infos)},
+        reference_profile=reference_histograms_from_matrix(X_train, FEATURE_COLUMNS),
+        promote=promote,
+    )
+    print(f"Modèle enregistré : version {version}"
+          f"{' (active)' if promote else ''} dans {registry.root}")
+
+    peak_main, peak_workers = _peak_memory_mb()
+    manifest = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "model_version": version,
+        "features": FEATURE_COLUMNS,
+        "n_tickers": len(kept),
+        "rows_per_ticker": {t: {"train": train_counts[t], "test": test_counts[t]} for t in kept},
+        "skipped_tickers": skipped,
+        "train_rows": int(len(y_train)),
+        "test_rows": int(len(y_test)),
+        "accuracy": acc,
+        "prep_seconds": round(prep_seconds, 3),
+        "features_from_cache": from_cache,
+        "fit_seconds": round(fit_seconds, 3),
+        "peak_memory_mb": {"main": peak_main, "workers": peak_workers},
+        "params": params,
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Manifeste écrit dans {manifest_path}")
+    return model
+
+
+# ---------------------------------------------------------------------
+# Entraînement incrémental
+# ---------------------------------------------------------------------
+
+def train_incremental(tickers=None,
+                      data_dir: str = DATA_DIR,
+                      workers: int = None,
+                      chunksize: int = CHUNK_SIZE,
+                      new_trees: int = 20,
+                      base_version: str = None,
+                      promote: bool = False):
+    """
+    Ré-entraînement à partir des seules lignes postérieures au filigrane de
+    chaque ticker : on ajoute new_trees arbres (warm_start) appris sur les
+    nouvelles barres, on compare l'ancien et le nouveau modèle sur les barres
+    les plus récentes, et on enregistre une nouvelle version.
+    Le modèle de base est la version active du registre (ou base_version).
+    """
+    registry = ModelRegistry()
+    base_version = base_version or registry.active_version()
+    if base_version is None:
+        print("Erreur: registre vide, lancer d'abord un entraînement complet.")
+        return
+    base_meta = registry.metadata(base_version)
+    watermarks = base_meta.get("watermarks")
+    if not watermarks:
+        print(f"Erreur: la version {base_version} n'a pas de filigranes, lancer un entraînement complet.")
+        return
+
+    if base_meta["features"] != FEATURE_COLUMNS:
+        print(f"Erreur: la version {base_version} utilise d'autres features, lancer un entraînement complet.")
+        return
+
+    data_dir = Path(data_dir)
+    csv_paths = _csv_paths(data_dir, tickers)
+
+    t0 = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    matrices, _ = build_training_matrices(csv_paths, workers, chunksize, watermarks=watermarks)
+    infos, kept = matrices.infos, matrices.kept
+    X_new, y_new, _ = matrices.load("train")
+    X_eval, y_eval, _ = matrices.load("test")
+    prep_seconds = time.perf_counter() - t0
+
+    if len(np.unique(y_new)) < 2:
+        print("Pas assez de nouvelles lignes pour un ré-entraînement incrémental.")
+        return
+
+    previous, _ = registry.load(base_version)
+    model, _ = registry.load(base_version)
+    model.set_params(warm_start=True, n_jobs=-1,
+                     n_estimators=previous.n_estimators + new_trees)
+    if getattr(model, "max_samples", None):
+        model.set_params(max_samples=min(model.max_samples, len(y_new)))
+
+    print(f"Ré-entraînement incrémental sur {len(y_new)} nouvelles lignes ({len(kept)} tickers)...")
+    t0 = time.perf_counter()
+    model.fit(X_new, y_new)
+    fit_seconds = time.perf_counter() - t0
+
+    if len(y_eval):
+        previous_acc = accuracy_score(y_eval, _predict_in_batches(previous, X_eval))
+        new_acc = accuracy_score(y_eval, _predict_in_batches(model, X_eval))
+    else:
+        previous_acc = new_acc = float("nan")
+    print(f"Précision ancien modèle: {previous_acc:.3f} | nouveau modèle: {new_acc:.3f}")
+
+    comparison = {
+        "previous_version": base_version,
+        "new_rows": int(len(y_new)),
+        "eval_rows": int(len(y_eval)),
+        "rows_per_ticker": {t: {"train": infos[t]["train"], "eval": infos[t]["test"]} for t in kept},
+        "previous_accuracy": previous_acc,
+        "new_accuracy": new_acc,
+        "previous_n_estimators": int(previous.n_estimators),
+        "new_n_estimators": int(model.n_estimators),
+        "prep_seconds": round(prep_seconds, 3),
+        "fit_seconds": round(fit_seconds, 3),
+    }
+
+    model.set_params(warm_start=False, n_jobs=1)
+    version = registry.register(
+        model,
+        features=base_meta["features"],
+        data_fingerprint=data_fingerprint([data_dir / f"{t}.csv" for t in kept]),
+        accuracy=new_acc,
+        benchmark_sample=_benchmark_sample(X_eval, X_new),
+        params={**base_meta.get("params", {}), "n_estimators": int(model.n_estimators)},
+        extra={"mode": "incremental", "comparison": comparison,
+               "watermarks": _watermarks(infos, watermarks)},
+        # les nouvelles barres sont peu nombreuses : la référence reste celle du modèle de base
+        reference_profile=registry.load_reference(base_version),
+        promote=promote,
+    )
+    print(f"Nouvelle version enregistrée : {version}{' (active)' if promote else ''}")
+    return model
+
 
 if __name__ == "__main__":
-    train()
+    parser = argparse.ArgumentParser(description="Entraînement multi-tickers du modèle de prédiction.")
+    parser.add_argument("--tickers", nargs="*", help="Tickers à utiliser (défaut : tout data/stocks)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="Processus de préparation")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="Lignes lues par morceau")
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=None,
+                        help="Profondeur maximale des arbres (voir model_selection.py)")
+    parser.add_argument("--min-samples-leaf", type=int, default=1)
+    parser.add_argument("--max-samples", type=int, default=500_000,
+                        help="Échantillon bootstrap par arbre (borne la mémoire)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="N'apprend que les lignes postérieures aux filigranes")
+    parser.add_argument("--new-trees", type=int, default=20,
+                        help="Arbres ajoutés en mode incrémental")
+    parser.add_argument("--promote", action="store_true",
+                        help="Active la nouvelle version incrémentale dans le registre")
+    parser.add_argument("--no-promote", action="store_true",
+                        help="N'active pas la version issue d'un entraînement complet")
+    parser.add_argument("--rebuild-features", action="store_true",
+                        help="Ignore le cache des matrices de features")
+    args = parser.parse_args()
+
+    if args.incremental:
+        train_incremental(
+            tickers=args.tickers or None,
+            data_dir=args.data_dir,
+            workers=args.workers,
+            chunksize=args.chunksize,
+            new_trees=args.new_trees,
+            promote=args.promote,
+        )
+    else:
+        train(
+            tickers=args.tickers or None,
+            data_dir=args.data_dir,
+            workers=args.workers,
+            chunksize=args.chunksize,
+            n_estimators=args.n_estimators,
+            max_samples=args.max_samples,
+            max_depth=args.max_depth,
+            min_samples_leaf=args.min_samples_leaf,
+            promote=not args.no_promote,
+            rebuild_features=args.rebuild_features,
+        )